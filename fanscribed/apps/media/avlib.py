@@ -1,10 +1,17 @@
 """Functions for controlling and inspecting avconv."""
 
 from decimal import Decimal
-from subprocess import call, check_output
+from hashlib import sha1
+from multiprocessing.pool import ThreadPool
+import mmap
+import os
+from subprocess import PIPE, Popen, call, check_output
 import sys
 
 from django.conf import settings
+from django.core.cache import cache
+
+from . import mp3frames
 
 
 if sys.platform == 'linux2':
@@ -39,9 +46,57 @@ elif sys.platform == 'darwin':
 QUANTIZE_EXPONENT = Decimal('0.01')
 
 
+class MediaConversionError(Exception):
+    """avconv failed to convert media."""
+
+
+# Seconds of media converted on either side of each chunk, then dropped.
+CHUNK_OVERLAP = Decimal(1)
+
+# Lengths measured by avprobe are cached by content, so a file is only
+# probed once.
+LENGTH_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+HASH_CHUNK_SIZE = 1048576
+
+
+def _length_cache_key(data):
+    digest = sha1()
+    for start in xrange(0, len(data), HASH_CHUNK_SIZE):
+        digest.update(data[start:start + HASH_CHUNK_SIZE])
+    return 'media-length:{}'.format(digest.hexdigest())
+
+
 def media_length(filename):
     """
-    Use avconv to determine the length of the media.
+    Determine the length of the media.
+
+    MP3 files are measured from their headers; anything else is left to
+    avprobe. Only files needing avprobe are hashed, to look up its result.
+
+    :param filename: Filename of media to inspect.
+    :return: Length, in seconds of the media.
+    """
+    if not os.path.getsize(filename):
+        return avprobe_media_length(filename)
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            seconds = mp3frames.duration(data)
+            if seconds is not None:
+                return Decimal(seconds).quantize(QUANTIZE_EXPONENT)
+            key = _length_cache_key(data)
+            duration = cache.get(key)
+            if duration is None:
+                duration = avprobe_media_length(filename)
+                cache.set(key, duration, LENGTH_CACHE_TIMEOUT)
+            return duration
+        finally:
+            data.close()
+
+
+def avprobe_media_length(filename):
+    """
+    Use avprobe to determine the length of the media.
 
     :param filename: Filename of media to inspect.
     :return: Length, in seconds of the media.
@@ -76,3 +131,137 @@ def convert(raw_file, processed_file, avconv_settings):
         + [processed_file]
     )
     return call(args)
+
+
+def start_convert(processed_file, avconv_settings):
+    """
+    Start converting media written to the stdin of the returned process.
+
+    :param processed_file: Full path of processed file to write.
+    :param avconv_settings: List of strings of command-line options.
+    :return: The avconv Popen object; close its stdin and wait for it.
+    """
+    args = (
+        [AVCONV_PATH]
+        + AVCONV_ARGS
+        + ['pipe:0']
+        + list(avconv_settings)
+        + [processed_file]
+    )
+    return Popen(args, stdin=PIPE)
+
+
+def convert_segment(raw_file, processed_file, avconv_settings, start, length):
+    """
+    Convert part of a raw file to a processed file.
+
+    :param start: Start time in seconds.
+    :param length: Length in seconds.
+    :return: Exit code of avconv.
+    """
+    args = (
+        [AVCONV_PATH]
+        + ['-ss', str(start)]
+        + AVCONV_ARGS
+        + [raw_file]
+        + ['-t', str(length)]
+        + list(avconv_settings)
+        + [processed_file]
+    )
+    return call(args)
+
+
+def plan_chunks(length, chunk_length, overlap=CHUNK_OVERLAP):
+    """
+    Split media into chunks to convert separately.
+
+    Each chunk is converted with `overlap` extra seconds on either side,
+    so that the encoder's delay and padding fall outside the part kept.
+
+    :param length: Length in seconds of the media.
+    :param chunk_length: Length in seconds of each chunk.
+    :return: List of (start, end, segment_start, segment_length) of each
+        chunk: the part of the media it covers, then the part to convert.
+    """
+    length, chunk_length = Decimal(length), Decimal(chunk_length)
+    overlap = Decimal(overlap)
+    chunks = []
+    start = Decimal(0)
+    while start < length:
+        end = min(start + chunk_length, length)
+        segment_start = max(start - overlap, Decimal(0))
+        segment_end = min(end + overlap, length)
+        chunks.append((start, end, segment_start, segment_end - segment_start))
+        start = end
+    return chunks
+
+
+def join_chunks(chunk_files, chunks, out_file):
+    """
+    Write the frames of converted chunks that cover each chunk's own part.
+
+    Frames are placed by their time in the whole media, and taken until
+    the time written reaches the chunk's end, so neither the overlap nor
+    rounding to whole frames adds up across joins. Tags and info frames
+    are left out, so the result is a plain run of frames.
+
+    :param chunk_files: Filename of each converted chunk.
+    :param chunks: As returned by `plan_chunks`.
+    :param out_file: File object to write to.
+    """
+    written = 0.0
+    for number, (chunk_file, chunk) in enumerate(zip(chunk_files, chunks)):
+        start, end, segment_start, segment_length = chunk
+        is_last = (number == len(chunks) - 1)
+        index = mp3frames.FrameIndex.from_file(chunk_file)
+        times = list(index.times) + [index.duration]
+
+        # Skip frames with more than half their length before `written`.
+        first = 0
+        while (first < len(index.times)
+               and float(segment_start) + (times[first] + times[first + 1]) / 2 < written):
+            first += 1
+        last = first
+        while last < len(index.times) and (is_last or written < float(end)):
+            written += times[last + 1] - times[last]
+            last += 1
+
+        with open(chunk_file, 'rb') as in_file:
+            in_file.seek(index.offsets[first])
+            out_file.write(in_file.read(index.offsets[last] - index.offsets[first]))
+
+
+def convert_chunked(raw_file, processed_file, avconv_settings, length,
+                    chunk_length, processes):
+    """
+    Convert a raw MP3 file in chunks, several at once, then join them.
+
+    :param length: Length in seconds of the raw file.
+    :param chunk_length: Length in seconds of each chunk.
+    :param processes: How many avconv processes to run at once.
+    :raises MediaConversionError: If avconv fails on any chunk.
+    """
+    chunks = plan_chunks(length, chunk_length)
+    chunk_files = ['{}_{}'.format(processed_file, number)
+                   for number in xrange(len(chunks))]
+
+    def convert_job(job):
+        chunk_file, (start, end, segment_start, segment_length) = job
+        return convert_segment(
+            raw_file, chunk_file, avconv_settings, segment_start, segment_length)
+
+    pool = ThreadPool(processes)
+    try:
+        codes = pool.map(convert_job, zip(chunk_files, chunks))
+        failed = [code for code in codes if code != 0]
+        if failed:
+            raise MediaConversionError(
+                'avconv exited with {} converting a chunk'.format(failed[0]))
+        with open(processed_file, 'wb') as out_file:
+            join_chunks(chunk_files, chunks, out_file)
+    finally:
+        pool.close()
+        pool.join()
+        for chunk_file in chunk_files:
+            if os.path.exists(chunk_file):
+                os.unlink(chunk_file)
@@ -0,0 +1,286 @@
+"""A size-bounded cache of media files on local disk.
+
+Files are stored under settings.MEDIA_CACHE_PATH, named by the SHA-1 of
+their storage name. An index file records the size of each entry, along
+with miss and eviction counts, so that the cache never needs to stat its
+whole directory. When the total size exceeds settings.MEDIA_CACHE_MAX_BYTES,
+the least-recently-used entries are evicted.
+
+Hits never rewrite the index: a hit touches the entry's file, whose
+modification time is its last use, and appends to a log of hits.
+An entry in use holds a shared lock on its file, and is not evicted
+until it is released.
+
+Only one process on a host downloads a given file at a time; others
+missing the same file wait for that download instead of starting their own.
+"""
+
+import logging
+log = logging.getLogger(__name__)
+
+from contextlib import contextmanager
+import errno
+import fcntl
+from hashlib import sha1
+import json
+import os
+import random
+from shutil import move
+
+from django.conf import settings
+from unipath import Path
+
+
+CHUNK_SIZE = 262144
+INDEX_FILENAME = 'index.json'
+LOCK_FILENAME = 'index.lock'
+HITS_FILENAME = 'hits.log'
+
+
+def _empty_index():
+    return dict(entries={}, hits=0, misses=0, evictions=0)
+
+
+def _is_pinned(f):
+    """Return True if another process holds a lock on the open file f."""
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return True
+        raise
+    return False
+
+
+class MediaCache(object):
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = Path(path or settings.MEDIA_CACHE_PATH).absolute()
+        if max_bytes is None:
+            max_bytes = settings.MEDIA_CACHE_MAX_BYTES
+        self.max_bytes = max_bytes
+
+    # --
+
+    @contextmanager
+    def _flock(self, name):
+        """Hold an exclusive lock on the named file in the cache directory."""
+        if not self.path.exists():
+            try:
+                os.makedirs(self.path)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        with open(self.path.child(name), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked_index(self):
+        """Yield the index while holding its lock, then save it."""
+        with self._flock(LOCK_FILENAME):
+            index = self._read_index()
+            index['hits'] += self._take_hits()
+            yield index
+            self._write_index(index)
+
+    def _fetch_lock_name(self, key):
+        # Keys share a fixed set of lock files, which are never removed:
+        # a lock file unlinked while held would let a second process lock
+        # a new file of the same name and fetch alongside the first.
+        return 'fetch_{}.lock'.format(key[:2])
+
+    def _read_index(self):
+        try:
+            with open(self.path.child(INDEX_FILENAME)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            # Missing or damaged; start from what is on disk.
+            return self._scan()
+
+    def _scan(self):
+        """Build an index from the files in the cache directory."""
+        index = _empty_index()
+        for name in os.listdir(self.path):
+            if '.' in name or '_' in name:
+                # Not an entry, or an unfinished download.
+                continue
+            index['entries'][name] = dict(
+                size=os.path.getsize(self.path.child(name)))
+        return index
+
+    def _write_index(self, index):
+        index_path = self.path.child(INDEX_FILENAME)
+        temp_path = '{}_{}'.format(index_path, os.getpid())
+        with open(temp_path, 'w') as f:
+            json.dump(index, f)
+        os.rename(temp_path, index_path)
+
+    def _evict(self, index, keep):
+        """Remove least-recently-used entries until within budget.
+
+        Entries in use are skipped.
+        """
+        entries = index['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        if total <= self.max_bytes:
+            return
+        used = {}
+        for key in entries.keys():
+            try:
+                used[key] = os.path.getmtime(self.path.child(key))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+                # Removed from under us; forget it.
+                total -= entries.pop(key)['size']
+        for key in sorted(used, key=used.get):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path = self.path.child(key)
+            with open(path, 'rb') as f:
+                if _is_pinned(f):
+                    log.info('media cache IN USE %s', key)
+                    continue
+                os.unlink(path)
+            total -= entries.pop(key)['size']
+            index['evictions'] += 1
+            log.info('media cache EVICTED %s', key)
+
+    # --
+
+    @contextmanager
+    def using(self, fieldfile):
+        """Yield a local path to the contents of fieldfile.
+
+        The file is fetched as needed, and is not evicted until the block
+        exits.
+        """
+        key = sha1(fieldfile.name).hexdigest()
+        path = self.path.child(key)
+
+        pin = self._pin(path)
+        if pin is not None:
+            log.info('media cache HIT %s', key)
+        else:
+            with self._flock(self._fetch_lock_name(key)):
+                # Another process may have fetched it while we waited.
+                pin = self._pin(path)
+                if pin is not None:
+                    log.info('media cache HIT %s (after waiting)', key)
+                else:
+                    with self._locked_index() as index:
+                        index['misses'] += 1
+                    log.info('media cache MISS %s', key)
+                    self._fetch(fieldfile, path)
+                    pin = self._pin(path, hit=False)
+                    self._add(key, path)
+        with pin:
+            yield path
+
+    def open(self, fieldfile):
+        """Return an open file of the contents of fieldfile.
+
+        The file stays readable even if its entry is later evicted.
+        """
+        with self.using(fieldfile) as path:
+            return open(path, 'rb')
+
+    def store(self, name, local_path):
+        """Move a local file into the cache as the contents of storage `name`.
+
+        Returns the cached path.
+        """
+        key = sha1(name).hexdigest()
+        path = self.path.child(key)
+        with self._flock(self._fetch_lock_name(key)):
+            temp_path = '{}_{}'.format(path, random.randint(10000, 99999))
+            move(local_path, temp_path)
+            os.rename(temp_path, path)
+            self._add(key, path)
+        return path
+
+    def _add(self, key, path):
+        with self._locked_index() as index:
+            index['entries'][key] = dict(size=os.path.getsize(path))
+            self._evict(index, keep=key)
+        log.info('media cache STORED %s', key)
+
+    def _pin(self, path, hit=True):
+        """Return the entry's file, held open with a shared lock, if cached.
+
+        Counts a hit and marks the entry as used.
+        """
+        try:
+            f = open(path, 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                # Evicted, or replaced, while we waited for the lock.
+                raise OSError(errno.ENOENT, 'evicted', path)
+        except OSError as e:
+            f.close()
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        os.utime(path, None)
+        if hit:
+            self._count_hit()
+        return f
+
+    def _count_hit(self):
+        fd = os.open(self.path.child(HITS_FILENAME),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, '.')
+        finally:
+            os.close(fd)
+
+    def _take_hits(self):
+        """Return and clear the hits logged since the index was last written."""
+        hits_path = self.path.child(HITS_FILENAME)
+        taken_path = '{}_{}'.format(hits_path, os.getpid())
+        try:
+            os.rename(hits_path, taken_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return 0
+        hits = os.path.getsize(taken_path)
+        os.unlink(taken_path)
+        return hits
+
+    def _fetch(self, fieldfile, path):
+        # Start out with a temp file, to avoid one process clobbering another.
+        temp_path = '{}_{}'.format(path, random.randint(10000, 99999))
+
+        fieldfile.open()
+        with open(temp_path, 'wb') as out_file, fieldfile as in_file:
+            chunk = in_file.read(CHUNK_SIZE)
+            while chunk != '':
+                out_file.write(chunk)
+                chunk = in_file.read(CHUNK_SIZE)
+
+        os.rename(temp_path, path)
+
+    def stats(self):
+        """Return a dict of entry count, bytes used, budget, and counters."""
+        with self._locked_index() as index:
+            entries = index['entries']
+            return dict(
+                entries=len(entries),
+                bytes=sum(entry['size'] for entry in entries.values()),
+                max_bytes=self.max_bytes,
+                hits=index['hits'],
+                misses=index['misses'],
+                evictions=index['evictions'],
+            )
@@ -0,0 +1,41 @@
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+
+    args = '[<filename> ...] [<repeat>]'
+    help = ("Compare measuring media length from MP3 headers with avprobe, "
+            "using the test media by default")
+
+    def handle(self, *args, **options):
+
+        from ... import avlib, mp3frames
+        from ...tests.base import CONVERTED_NOAGENDA_MEDIA_PATH, RAW_NOAGENDA_MEDIA_PATH
+
+        args = list(args)
+        repeat = int(args.pop()) if args and args[-1].isdigit() else 5
+        filenames = args or [RAW_NOAGENDA_MEDIA_PATH, CONVERTED_NOAGENDA_MEDIA_PATH]
+
+        def headers(filename):
+            with open(filename, 'rb') as f:
+                return mp3frames.duration(f.read())
+
+        for filename in filenames:
+            self.stdout.write(filename)
+            for name, measure in [
+                ('headers', headers),
+                ('avprobe', avlib.avprobe_media_length),
+            ]:
+                try:
+                    started = default_timer()
+                    for _ in xrange(repeat):
+                        length = measure(filename)
+                    elapsed = (default_timer() - started) / repeat
+                except OSError as e:
+                    self.stderr.write(u'  {name}: failed, {e}'.format(**locals()))
+                    continue
+                self.stdout.write(
+                    u'  {name}: {length} seconds, measured in {elapsed:.4f}s'
+                    .format(**locals()))
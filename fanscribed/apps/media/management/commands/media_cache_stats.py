@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+
+    help = "Show usage and hit, miss, and eviction counts of the media cache"
+
+    def handle(self, *args, **options):
+
+        from ...cache import MediaCache
+
+        stats = MediaCache().stats()
+        self.stdout.write(
+            u'{entries} entries, {bytes} of {max_bytes} bytes; '
+            u'{hits} hits, {misses} misses, {evictions} evictions'
+            .format(**stats))
@@ -0,0 +1,345 @@
+"""Index the frames of an MP3 file, to slice it by byte offsets.
+
+An MPEG audio file is a sequence of independently-framed chunks, each
+starting with a four-byte header that gives its length and duration.
+Indexing a file once lets any (start, end) slice be cut by copying the
+bytes of whole frames, with no subprocess. The same headers give the
+duration of a file.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import os
+import struct
+import sys
+
+
+# Bitrates in kbit/s, by (version is MPEG-1, layer), indexed by header bits.
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates in Hz, by version bits.
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+# Layer bits to layer number.
+_LAYERS = {3: 1, 2: 2, 1: 3}
+
+# Data is taken to be MP3 if this many frames follow one another within
+# the first SYNC_SEARCH_BYTES after any ID3v2 tag.
+SYNC_FRAMES = 4
+SYNC_SEARCH_BYTES = 65536
+
+# Files are indexed a block of this many bytes at a time.
+READ_SIZE = 262144
+
+# Longer than any frame, so a frame and the header of the next always fit.
+MAX_FRAME_LENGTH = 4096
+
+# Frame count and duration, at the start of a dumped FrameIndex.
+_DUMP_HEADER = '<Id'
+
+
+class FrameHeader(object):
+
+    def __init__(self, length, samples, sample_rate, is_mpeg1, is_mono):
+        self.length = length
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.is_mpeg1 = is_mpeg1
+        self.is_mono = is_mono
+
+    @property
+    def duration(self):
+        return float(self.samples) / self.sample_rate
+
+
+def parse_header(data, offset=0):
+    """Return the FrameHeader at data[offset:], or None if there is none."""
+    if len(data) < offset + 4:
+        return None
+    header, = struct.unpack_from('>I', data, offset)
+    if header & 0xffe00000 != 0xffe00000:
+        return None
+    version_bits = (header >> 19) & 3
+    layer_bits = (header >> 17) & 3
+    bitrate_bits = (header >> 12) & 15
+    sample_rate_bits = (header >> 10) & 3
+    padding = (header >> 9) & 1
+    is_mono = ((header >> 6) & 3) == 3
+    if (version_bits == 1 or layer_bits == 0
+        or bitrate_bits in (0, 15) or sample_rate_bits == 3
+        ):
+        # Reserved, or free format, which we never produce.
+        return None
+
+    is_mpeg1 = (version_bits == 3)
+    layer = _LAYERS[layer_bits]
+    bitrate = _BITRATES[(is_mpeg1, layer)][bitrate_bits] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_bits]
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or is_mpeg1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+    return FrameHeader(length, samples, sample_rate, is_mpeg1, is_mono)
+
+
+def _id3v2_length(data):
+    """Return the length of a leading ID3v2 tag, or 0."""
+    if len(data) < 10 or data[:3] != 'ID3':
+        return 0
+    size = 0
+    for byte in bytearray(data[6:10]):
+        size = (size << 7) | (byte & 0x7f)
+    footer = 10 if ord(data[5]) & 0x10 else 0
+    return 10 + size + footer
+
+
+def _xing_offset(offset, header):
+    if header.is_mpeg1:
+        side_info = 17 if header.is_mono else 32
+    else:
+        side_info = 9 if header.is_mono else 17
+    return offset + 4 + side_info
+
+
+def _is_info_frame(data, offset, header):
+    """Return True if the frame holds a Xing, Info, or VBRI tag."""
+    tag_offset = _xing_offset(offset, header)
+    return (data[tag_offset:tag_offset + 4] in ('Xing', 'Info')
+            or data[offset + 36:offset + 40] == 'VBRI')
+
+
+def _info_frame_count(data, offset, header):
+    """Return the audio frame count given by a Xing, Info, or VBRI tag, or None.
+
+    Returns None as well if the tag is cut short.
+    """
+    frame_end = min(offset + header.length, len(data))
+    tag_offset = _xing_offset(offset, header)
+    if data[tag_offset:tag_offset + 4] in ('Xing', 'Info'):
+        if frame_end >= tag_offset + 12:
+            flags, = struct.unpack_from('>I', data, tag_offset + 4)
+            if flags & 1:
+                frames, = struct.unpack_from('>I', data, tag_offset + 8)
+                return frames
+    elif data[offset + 36:offset + 40] == 'VBRI' and frame_end >= offset + 54:
+        frames, = struct.unpack_from('>I', data, offset + 50)
+        return frames
+    return None
+
+
+class _StreamReader(object):
+    """Forward-only random access to data arriving as a series of chunks.
+
+    Only the unread part of the current chunk is held in memory.
+    """
+
+    def __init__(self, chunks, data=''):
+        self._chunks = iter(chunks)
+        self._data = data
+        # Position of _data[0] in the whole stream.
+        self._base = 0
+
+    def _read_to(self, offset, end):
+        """Hold data up to end, or all that is left, forgetting that before offset."""
+        while self._base + len(self._data) < end:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            drop = min(offset - self._base, len(self._data))
+            self._data = self._data[drop:] + chunk
+            self._base += drop
+
+    def read_at(self, offset, length):
+        """Return up to length bytes from offset; none before it can be read again."""
+        self._read_to(offset, offset + length)
+        start = offset - self._base
+        return self._data[start:start + length]
+
+    def find(self, char, offset):
+        """Return the offset of the next char at or after offset, or -1."""
+        while True:
+            found = self._data.find(char, max(offset - self._base, 0))
+            if found != -1:
+                return self._base + found
+            end = self._base + len(self._data)
+            self._read_to(end, end + 1)
+            if self._base + len(self._data) == end:
+                return -1
+
+
+class FrameIndex(object):
+    """Byte offsets and start times of each audio frame of an MP3 file.
+
+    `offsets` has one more item than `times`: the byte just past the
+    last frame.
+    """
+
+    def __init__(self, offsets, times, duration):
+        self.offsets = offsets
+        self.times = times
+        self.duration = duration
+
+    @classmethod
+    def from_data(cls, data):
+        return cls._from_reader(_StreamReader([], data))
+
+    @classmethod
+    def from_file(cls, filename):
+        """Index a file, reading it a block at a time."""
+        with open(filename, 'rb') as f:
+            return cls.from_chunks(iter(lambda: f.read(READ_SIZE), ''))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Index MP3 data given as an iterable of strings."""
+        return cls._from_reader(_StreamReader(chunks))
+
+    @classmethod
+    def _from_reader(cls, reader):
+        offsets = array('L')
+        times = array('d')
+        offset = end = _id3v2_length(reader.read_at(0, 10))
+        time = 0.0
+        first = True
+        while True:
+            data = reader.read_at(offset, MAX_FRAME_LENGTH)
+            if len(data) < 4:
+                break
+            header = parse_header(data)
+            if header is None or header.length > len(data):
+                # Skip junk (or a trailing tag) up to the next possible frame.
+                offset = reader.find('\xff', offset + 1)
+                if offset == -1:
+                    break
+                continue
+            if not (first and _is_info_frame(data, 0, header)):
+                # (An encoder's leading info frame holds no audio.)
+                offsets.append(offset)
+                times.append(time)
+                time += header.duration
+            first = False
+            offset += header.length
+            end = offset
+        offsets.append(end)
+        return cls(offsets, times, time)
+
+    def dumps(self):
+        """Return the index as a string, to be read back with `loads`."""
+        offsets = array('I', self.offsets)
+        times = array('d', self.times)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            times.byteswap()
+        return (struct.pack(_DUMP_HEADER, len(times), self.duration)
+                + offsets.tostring() + times.tostring())
+
+    @classmethod
+    def loads(cls, data):
+        count, duration = struct.unpack_from(_DUMP_HEADER, data)
+        times_offset = struct.calcsize(_DUMP_HEADER) + 4 * (count + 1)
+        offsets = array('I')
+        offsets.fromstring(data[struct.calcsize(_DUMP_HEADER):times_offset])
+        times = array('d')
+        times.fromstring(data[times_offset:])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            times.byteswap()
+        return cls(offsets, times, duration)
+
+    def byte_range(self, start, end):
+        """Return (first_byte, end_byte) of the whole frames covering start to end."""
+        if start < 0:
+            raise ValueError('start must be positive')
+        if end <= start:
+            raise ValueError('end must be after start')
+        first = max(bisect_right(self.times, float(start)) - 1, 0)
+        last = bisect_left(self.times, float(end))
+        return self.offsets[first], self.offsets[last]
+
+
+def _first_frame(data):
+    """Return the offset and header of the first of a run of frames, or None."""
+    start = _id3v2_length(data)
+    offset = data.find('\xff', start, start + SYNC_SEARCH_BYTES)
+    while offset != -1:
+        header = parse_header(data, offset)
+        if header is not None:
+            following, run = offset + header.length, 1
+            while run < SYNC_FRAMES:
+                next_header = parse_header(data, following)
+                if next_header is None:
+                    break
+                following += next_header.length
+                run += 1
+            if run == SYNC_FRAMES or following == len(data):
+                return offset, header
+        offset = data.find('\xff', offset + 1, start + SYNC_SEARCH_BYTES)
+    return None
+
+
+def duration(data):
+    """Return the duration in seconds of MP3 data, or None if it is not MP3.
+
+    Uses the frame count of a Xing, Info, or VBRI tag if there is one, and
+    otherwise adds up the duration of every frame.
+    """
+    first = _first_frame(data)
+    if first is None:
+        return None
+    offset, header = first
+    frames = _info_frame_count(data, offset, header)
+    if frames is not None:
+        return float(frames * header.samples) / header.sample_rate
+    return FrameIndex.from_data(data).duration
+
+
+# Indexes of recently-sliced files, keyed by (filename, size, inode),
+# or by the storage name of a dumped index. Not by mtime, which the media
+# cache updates each time it hands out a file.
+_index_cache = {}
+INDEX_CACHE_SIZE = 8
+
+
+def _cached_index(key, load):
+    index = _index_cache.get(key)
+    if index is None:
+        if len(_index_cache) >= INDEX_CACHE_SIZE:
+            _index_cache.clear()
+        index = _index_cache[key] = load()
+    return index
+
+
+def frame_index(filename):
+    """Return the FrameIndex of a file, reusing a recent one if unchanged."""
+    stat = os.stat(filename)
+    return _cached_index(
+        (filename, stat.st_size, stat.st_ino),
+        lambda: FrameIndex.from_file(filename))
+
+
+def stored_frame_index(fieldfile):
+    """Return the FrameIndex dumped to a stored file, reusing a recent one."""
+    def load():
+        fieldfile.open('rb')
+        try:
+            return FrameIndex.loads(fieldfile.read())
+        finally:
+            fieldfile.close()
+    return _cached_index(('stored', fieldfile.name), load)
+
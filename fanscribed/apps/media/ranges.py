@@ -0,0 +1,114 @@
+"""Serve part of a stored file over HTTP, honouring Range requests.
+
+Only the bytes sent are read from storage: a local file is read from its
+path, and any other is fetched from its URL with a Range request.
+
+Only single byte ranges are supported; a request for several ranges gets
+the whole content, which RFC 7233 allows.
+"""
+
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+import requests
+
+
+CHUNK_SIZE = 65536
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, length):
+    """Return (first, last) byte positions requested by a Range header.
+
+    Returns None when the whole content should be sent: there is no
+    header, or it is one we ignore. Raises ValueError if the range lies
+    beyond the end of the content.
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # The final `last` bytes.
+        suffix = int(last)
+        if suffix == 0 or length == 0:
+            raise ValueError('range not satisfiable')
+        return max(length - suffix, 0), length - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= length:
+        raise ValueError('range not satisfiable')
+    return first, min(int(last or length - 1), length - 1)
+
+
+def _read_local(path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _read_remote(url, offset, length):
+    if url.startswith('//'):
+        url = 'https:' + url
+    response = requests.get(
+        url,
+        headers=dict(Range='bytes={}-{}'.format(offset, offset + length - 1)),
+        stream=True,
+    )
+    response.raise_for_status()
+    if response.status_code != 206:
+        response.close()
+        raise IOError('{url} ignored the Range header'.format(**locals()))
+    for chunk in response.iter_content(CHUNK_SIZE):
+        yield chunk
+
+
+def read_stored(fieldfile, offset, length):
+    """Return an iterator over `length` bytes of a stored file from `offset`."""
+    try:
+        path = fieldfile.storage.path(fieldfile.name)
+    except NotImplementedError:
+        # Not on local disk.
+        return _read_remote(fieldfile.url, offset, length)
+    return _read_local(path, offset, length)
+
+
+def stored_range_response(request, fieldfile, first_byte, end_byte,
+                          content_type='application/octet-stream'):
+    """Stream bytes first_byte to end_byte of a stored file as a whole resource.
+
+    Positions in a Range header are relative to first_byte.
+    """
+    length = end_byte - first_byte
+    try:
+        requested = parse_range(request.META.get('HTTP_RANGE'), length)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(length)
+        return response
+
+    if requested is None:
+        first, last = 0, length - 1
+        status = 200
+    else:
+        first, last = requested
+        status = 206
+    response = StreamingHttpResponse(
+        read_stored(fieldfile, first_byte + first, last - first + 1),
+        content_type=content_type,
+        status=status,
+    )
+    if status == 206:
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, length)
+    response['Content-Length'] = last - first + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -1,8 +1,34 @@
+from decimal import Decimal
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+
 from django.test import TestCase
 
-from ..avlib import media_length
+from .. import avlib, mp3frames
+from ..avlib import media_length, plan_chunks
+
+from .base import CONVERTED_NOAGENDA_MEDIA_PATH, RAW_NOAGENDA_MEDIA_PATH
+
+
+# Frames added before and after the audio by the stub encoder below.
+DELAY_FRAMES = 2
+PADDING_FRAMES = 1
+
 
-from .base import CONVERTED_NOAGENDA_MEDIA_PATH
+def stub_convert_segment(raw_file, processed_file, avconv_settings, start, length):
+    """Copy whole frames, adding silence-like delay and padding frames as LAME does."""
+    index = mp3frames.frame_index(raw_file)
+    first_byte, end_byte = index.byte_range(start, start + length)
+    frame_length = index.offsets[1] - index.offsets[0]
+    with open(raw_file, 'rb') as in_file:
+        in_file.seek(index.offsets[0])
+        frame = in_file.read(frame_length)
+        in_file.seek(first_byte)
+        data = in_file.read(end_byte - first_byte)
+    with open(processed_file, 'wb') as out_file:
+        out_file.write(frame * DELAY_FRAMES + data + frame * PADDING_FRAMES)
+    return 0
 
 
 class AvlibTestCase(TestCase):
@@ -11,3 +37,65 @@ class AvlibTestCase(TestCase):
         expected_length = 5 * 60  # 5 minutes.
         length = float(media_length(CONVERTED_NOAGENDA_MEDIA_PATH))
         self.assertAlmostEqual(length, expected_length, delta=0.2)
+
+    def test_raw_media_length(self):
+        expected_length = 5 * 60  # 5 minutes.
+        length = float(media_length(RAW_NOAGENDA_MEDIA_PATH))
+        self.assertAlmostEqual(length, expected_length, delta=0.2)
+        # Measured again from its headers.
+        self.assertEqual(float(media_length(RAW_NOAGENDA_MEDIA_PATH)), length)
+
+    def test_mp3_is_measured_without_hashing(self):
+        def fail(data):
+            self.fail('hashed an MP3 file')
+        length_cache_key = avlib._length_cache_key
+        avlib._length_cache_key = fail
+        try:
+            media_length(RAW_NOAGENDA_MEDIA_PATH)
+        finally:
+            avlib._length_cache_key = length_cache_key
+
+
+class ChunkedConversionTestCase(TestCase):
+
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.convert_segment = avlib.convert_segment
+        avlib.convert_segment = stub_convert_segment
+
+    def tearDown(self):
+        avlib.convert_segment = self.convert_segment
+        rmtree(self.tempdir)
+
+    def test_plan_chunks(self):
+        self.assertEqual(plan_chunks(150, 60, overlap=1), [
+            (0, 60, 0, 61),
+            (60, 120, 59, 62),
+            (120, 150, 119, 31),
+        ])
+        self.assertEqual(plan_chunks(60, 60, overlap=1), [(0, 60, 0, 60)])
+
+    def test_joins_add_no_delay_or_padding(self):
+        whole_path = os.path.join(self.tempdir, 'whole.mp3')
+        stub_convert_segment(
+            CONVERTED_NOAGENDA_MEDIA_PATH, whole_path, [], Decimal(0), Decimal(300))
+        whole = mp3frames.FrameIndex.from_file(whole_path)
+
+        chunked_path = os.path.join(self.tempdir, 'chunked.mp3')
+        avlib.convert_chunked(
+            CONVERTED_NOAGENDA_MEDIA_PATH, chunked_path, [], 300, 60, 2)
+        chunked = mp3frames.FrameIndex.from_file(chunked_path)
+
+        # Within a frame of converting it whole, however many joins.
+        frame_duration = whole.times[1]
+        self.assertAlmostEqual(chunked.duration, whole.duration, delta=frame_duration)
+        # Chunk files are removed.
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ['chunked.mp3', 'whole.mp3'])
+
+    def test_failed_chunk_raises(self):
+        avlib.convert_segment = lambda *args: 1
+        with self.assertRaises(avlib.MediaConversionError):
+            avlib.convert_chunked(
+                CONVERTED_NOAGENDA_MEDIA_PATH,
+                os.path.join(self.tempdir, 'chunked.mp3'), [], 300, 60, 2)
+        self.assertEqual(os.listdir(self.tempdir), [])
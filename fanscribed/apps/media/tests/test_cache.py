@@ -0,0 +1,142 @@
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+import threading
+import time
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from ..cache import MediaCache
+
+
+class MediaCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tempdir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def media(self, name, size=100):
+        return ContentFile('x' * size, name=name)
+
+    def get(self, cache, fieldfile):
+        with cache.using(fieldfile) as path:
+            return path
+
+    def test_hit_and_miss(self):
+        cache = MediaCache(self.tempdir, max_bytes=1000)
+        path = self.get(cache, self.media('a.mp3'))
+        self.assertEqual(open(path).read(), 'x' * 100)
+        self.assertEqual(self.get(cache, self.media('a.mp3')), path)
+
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 100)
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_store_local_file(self):
+        cache = MediaCache(self.tempdir, max_bytes=1000)
+        download_dir = mkdtemp()
+        self.addCleanup(rmtree, download_dir)
+        local_path = os.path.join(download_dir, 'download')
+        with open(local_path, 'wb') as f:
+            f.write('y' * 100)
+        path = cache.store('a.mp3', local_path)
+        self.assertFalse(os.path.exists(local_path))
+
+        # Found without fetching.
+        self.assertEqual(self.get(cache, self.media('a.mp3')), path)
+        self.assertEqual(open(path).read(), 'y' * 100)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 0))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = MediaCache(self.tempdir, max_bytes=250)
+        a = self.get(cache, self.media('a.mp3'))
+        b = self.get(cache, self.media('b.mp3'))
+        time.sleep(0.01)
+        self.get(cache, self.media('a.mp3'))
+        c = self.get(cache, self.media('c.mp3'))
+
+        self.assertTrue(os.path.exists(a))
+        self.assertFalse(os.path.exists(b))
+        self.assertTrue(os.path.exists(c))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_index_is_rebuilt_from_existing_files(self):
+        cache = MediaCache(self.tempdir, max_bytes=1000)
+        self.get(cache, self.media('a.mp3'))
+        os.unlink(os.path.join(self.tempdir, 'index.json'))
+
+        stats = MediaCache(self.tempdir, max_bytes=1000).stats()
+        self.assertEqual((stats['entries'], stats['bytes']), (1, 100))
+
+    def test_concurrent_misses_download_once(self):
+        opened = []
+
+        class CountingContentFile(ContentFile):
+            def open(self, mode=None):
+                opened.append(self.name)
+                time.sleep(0.05)
+                return super(CountingContentFile, self).open(mode)
+
+        cache = MediaCache(self.tempdir, max_bytes=1000)
+        paths = []
+        threads = [
+            threading.Thread(target=lambda: paths.append(
+                self.get(cache, CountingContentFile('x' * 100, name='a.mp3'))))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(len(set(paths)), 1)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (3, 1))
+
+    def test_eviction_keeps_fetch_lock_files(self):
+        cache = MediaCache(self.tempdir, max_bytes=150)
+        self.get(cache, self.media('a.mp3'))
+        locks = sorted(name for name in os.listdir(self.tempdir)
+                       if name.endswith('.lock'))
+        self.get(cache, self.media('b.mp3'))
+
+        self.assertEqual(cache.stats()['evictions'], 1)
+        for name in locks:
+            self.assertTrue(os.path.exists(os.path.join(self.tempdir, name)))
+
+    def test_entries_in_use_are_not_evicted(self):
+        cache = MediaCache(self.tempdir, max_bytes=150)
+        with cache.using(self.media('a.mp3')) as a:
+            b = self.get(cache, self.media('b.mp3'))
+            self.assertTrue(os.path.exists(a))
+        self.assertEqual(cache.stats()['evictions'], 0)
+
+        c = self.get(cache, self.media('c.mp3'))
+        self.assertFalse(os.path.exists(a))
+        self.assertFalse(os.path.exists(b))
+        self.assertTrue(os.path.exists(c))
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_open_file_survives_eviction(self):
+        cache = MediaCache(self.tempdir, max_bytes=150)
+        f = cache.open(self.media('a.mp3'))
+        self.get(cache, self.media('b.mp3'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        with f:
+            self.assertEqual(f.read(), 'x' * 100)
+
+    def test_hits_do_not_rewrite_index(self):
+        cache = MediaCache(self.tempdir, max_bytes=1000)
+        self.get(cache, self.media('a.mp3'))
+        index_path = os.path.join(self.tempdir, 'index.json')
+        written = os.stat(index_path).st_ino
+        self.get(cache, self.media('a.mp3'))
+        self.get(cache, self.media('a.mp3'))
+        self.assertEqual(os.stat(index_path).st_ino, written)
+        self.assertEqual(cache.stats()['hits'], 2)
@@ -0,0 +1,74 @@
+import os
+
+from django.test import TestCase
+
+from ..mp3frames import (
+    FrameIndex, _info_frame_count, duration, parse_header)
+
+from .base import CONVERTED_NOAGENDA_MEDIA_PATH, RAW_NOAGENDA_MEDIA_PATH
+
+
+class Mp3FramesTestCase(TestCase):
+
+    def setUp(self):
+        self.index = FrameIndex.from_file(CONVERTED_NOAGENDA_MEDIA_PATH)
+
+    def test_index_covers_whole_file(self):
+        expected_length = 5 * 60  # 5 minutes.
+        self.assertAlmostEqual(self.index.duration, expected_length, delta=0.2)
+        self.assertEqual(len(self.index.offsets), len(self.index.times) + 1)
+        self.assertEqual(self.index.offsets[-1],
+                         os.path.getsize(CONVERTED_NOAGENDA_MEDIA_PATH))
+
+    def test_slice(self):
+        first_byte, end_byte = self.index.byte_range(66.6, 77.7)
+        with open(CONVERTED_NOAGENDA_MEDIA_PATH, 'rb') as f:
+            f.seek(first_byte)
+            data = f.read(end_byte - first_byte)
+        slice_index = FrameIndex.from_data(data)
+        expected_length = 77.7 - 66.6
+        # Whole frames are kept, so allow one frame at each end.
+        self.assertAlmostEqual(slice_index.duration, expected_length, delta=0.06)
+        self.assertIsNotNone(parse_header(data[:4]))
+
+    def test_slice_bounds(self):
+        with self.assertRaises(ValueError):
+            self.index.byte_range(-1, 5)
+        with self.assertRaises(ValueError):
+            self.index.byte_range(5, 5)
+
+    def test_duration(self):
+        expected_length = 5 * 60  # 5 minutes.
+        for path in [RAW_NOAGENDA_MEDIA_PATH, CONVERTED_NOAGENDA_MEDIA_PATH]:
+            with open(path, 'rb') as f:
+                self.assertAlmostEqual(duration(f.read()), expected_length, delta=0.2)
+
+    def test_duration_of_other_data(self):
+        self.assertIsNone(duration(''))
+        self.assertIsNone(duration('\x00' * 10000))
+        with open(__file__, 'rb') as f:
+            self.assertIsNone(duration(f.read()))
+
+    def test_index_from_small_chunks(self):
+        with open(CONVERTED_NOAGENDA_MEDIA_PATH, 'rb') as f:
+            data = f.read()
+        data = 'junk' + data[:50000] + 'more junk' + data[50000:]
+        whole = FrameIndex.from_data(data)
+        chunked = FrameIndex.from_chunks(
+            data[i:i + 1000] for i in xrange(0, len(data), 1000))
+        self.assertEqual(list(chunked.offsets), list(whole.offsets))
+        self.assertEqual(list(chunked.times), list(whole.times))
+
+    def test_dumped_index(self):
+        loaded = FrameIndex.loads(self.index.dumps())
+        self.assertEqual(list(loaded.offsets), list(self.index.offsets))
+        self.assertEqual(list(loaded.times), list(self.index.times))
+        self.assertEqual(loaded.duration, self.index.duration)
+
+    def test_truncated_info_tag(self):
+        with open(CONVERTED_NOAGENDA_MEDIA_PATH, 'rb') as f:
+            header_data = f.read(4)
+        header = parse_header(header_data)
+        # The tag's flags and frame count are cut off.
+        data = header_data + '\x00' * 17 + 'Info\x00\x00'
+        self.assertIsNone(_info_frame_count(data, 0, header))
@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase
+
+from ..ranges import parse_range
+
+
+class ParseRangeTestCase(SimpleTestCase):
+
+    def test_whole_content(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+        self.assertIsNone(parse_range('lines=0-9', 100))
+        self.assertIsNone(parse_range('bytes=9-0', 100))
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-200', 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        self.assertRaises(ValueError, parse_range, 'bytes=100-', 100)
+        self.assertRaises(ValueError, parse_range, 'bytes=-0', 100)
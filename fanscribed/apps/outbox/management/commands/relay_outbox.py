@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+
+    help = "Send pending outbox messages to the Celery broker, forever"
+
+    def handle(self, *args, **options):
+
+        from ...models import OutboxMessage
+
+        batch_size = settings.OUTBOX_BATCH_SIZE
+        interval = settings.OUTBOX_RELAY_MIN_INTERVAL
+        while True:
+            sent = OutboxMessage.objects.relay(batch_size)
+            if sent:
+                interval = settings.OUTBOX_RELAY_MIN_INTERVAL
+            if sent < batch_size:
+                # Caught up; wait for more, less often while idle.
+                time.sleep(interval)
+                if not sent:
+                    interval = min(
+                        interval * 2, settings.OUTBOX_RELAY_MAX_INTERVAL)
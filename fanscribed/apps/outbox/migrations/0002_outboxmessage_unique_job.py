@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def merge_duplicate_jobs(apps, schema_editor):
+    OutboxMessage = apps.get_model('outbox', 'OutboxMessage')
+    seen = set()
+    duplicates = []
+    for message in OutboxMessage.objects.order_by('id'):
+        job = (message.task_name, message.object_pk)
+        if job in seen:
+            duplicates.append(message.pk)
+        else:
+            seen.add(job)
+    OutboxMessage.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='enqueues',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(merge_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='outboxmessage',
+            unique_together=set([('task_name', 'object_pk')]),
+        ),
+    ]
@@ -0,0 +1,80 @@
+"""Celery jobs queued in the same database transaction as their cause.
+
+Models enqueue jobs with `OutboxMessage.objects.enqueue`, which only writes
+a row. The `relay_outbox` command sends pending rows to the broker in
+batches, so a slow broker never holds up a web request, and a job whose
+transaction is rolled back is never sent.
+
+Each task and object has at most one pending row. Enqueueing it again
+counts another enqueue on that row, and the relay only deletes rows whose
+count is unchanged since it read them, so a job enqueued while its row is
+being sent is sent again.
+"""
+
+import logging
+log = logging.getLogger(__name__)
+
+from celery import current_app
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+
+
+class OutboxMessageManager(models.Manager):
+
+    def enqueue(self, task, pk):
+        """Call `task` with `pk` once the current transaction is committed.
+
+        Calls it right away when Celery runs tasks eagerly.
+        """
+        if current_app.conf.CELERY_ALWAYS_EAGER:
+            task.delay(pk)
+            return
+        pending = self.filter(task_name=task.name, object_pk=pk)
+        if pending.update(enqueues=F('enqueues') + 1):
+            return
+        try:
+            with transaction.atomic():
+                self.create(task_name=task.name, object_pk=pk)
+        except IntegrityError:
+            # Created by another transaction since we looked.
+            pending.update(enqueues=F('enqueues') + 1)
+
+    def relay(self, batch_size=None):
+        """Send a batch of pending jobs to the broker; return how many rows."""
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        messages = list(self.order_by('id')[:batch_size])
+        if not messages:
+            return 0
+
+        with current_app.producer_or_acquire() as producer:
+            for message in messages:
+                current_app.send_task(
+                    message.task_name, args=[message.object_pk],
+                    producer=producer)
+
+        # Rows enqueued again since they were read stay for the next batch.
+        sent = Q()
+        for message in messages:
+            sent |= Q(pk=message.pk, enqueues=message.enqueues)
+        self.filter(sent).delete()
+        log.info('outbox RELAYED %d jobs', len(messages))
+        return len(messages)
+
+
+class OutboxMessage(models.Model):
+    """A Celery job waiting to be sent to the broker."""
+
+    task_name = models.CharField(max_length=255)
+    object_pk = models.IntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+    # Times the job was enqueued since it was last sent.
+    enqueues = models.PositiveIntegerField(default=1)
+
+    objects = OutboxMessageManager()
+
+    class Meta:
+        unique_together = [('task_name', 'object_pk')]
+
+    def __unicode__(self):
+        return u'{self.task_name}({self.object_pk})'.format(**locals())
@@ -0,0 +1,63 @@
+from celery import current_app
+from django.db import transaction
+from django.test import TestCase
+
+from ...podcasts.tasks import fetch_rss
+from ...transcripts.tasks import process_clean_task
+from ..models import OutboxMessage
+
+
+class OutboxTestCase(TestCase):
+
+    def setUp(self):
+        self.was_eager = current_app.conf.CELERY_ALWAYS_EAGER
+        current_app.conf.CELERY_ALWAYS_EAGER = False
+        self.sent = []
+        self.send_task = current_app.send_task
+        current_app.send_task = lambda name, args, **kwargs: self.sent.append((name, args))
+
+    def tearDown(self):
+        current_app.conf.CELERY_ALWAYS_EAGER = self.was_eager
+        current_app.send_task = self.send_task
+
+    def test_enqueue_is_rolled_back_with_transaction(self):
+        try:
+            with transaction.atomic():
+                OutboxMessage.objects.enqueue(fetch_rss, 1)
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        OutboxMessage.objects.enqueue(fetch_rss, 2)
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list('task_name', 'object_pk')),
+            [(fetch_rss.name, 2)])
+
+    def test_pending_jobs_are_merged(self):
+        OutboxMessage.objects.enqueue(fetch_rss, 1)
+        OutboxMessage.objects.enqueue(process_clean_task, 1)
+        OutboxMessage.objects.enqueue(fetch_rss, 1)
+        OutboxMessage.objects.enqueue(fetch_rss, 2)
+
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+        self.assertEqual(OutboxMessage.objects.relay(batch_size=2), 2)
+        self.assertEqual(self.sent, [
+            (fetch_rss.name, [1]),
+            (process_clean_task.name, [1]),
+        ])
+        self.assertEqual(OutboxMessage.objects.relay(batch_size=2), 1)
+        self.assertEqual(self.sent[2:], [(fetch_rss.name, [2])])
+        self.assertEqual(OutboxMessage.objects.relay(batch_size=2), 0)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_job_enqueued_while_sending_is_sent_again(self):
+        def send_task(name, args, **kwargs):
+            self.sent.append((name, args))
+            if len(self.sent) == 1:
+                OutboxMessage.objects.enqueue(fetch_rss, 1)
+        current_app.send_task = send_task
+        OutboxMessage.objects.enqueue(fetch_rss, 1)
+
+        self.assertEqual(OutboxMessage.objects.relay(), 1)
+        self.assertEqual(OutboxMessage.objects.relay(), 1)
+        self.assertEqual(self.sent, [(fetch_rss.name, [1])] * 2)
+        self.assertFalse(OutboxMessage.objects.exists())
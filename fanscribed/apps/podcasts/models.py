@@ -11,6 +11,7 @@ from django_fsm.signals import post_transition
 from django_fsm.db.fields import FSMField, transition
 import feedparser
 
+from ..outbox.models import OutboxMessage
 from . import tasks
 
 
@@ -182,7 +183,7 @@ def fetch_when_rssfetch_started(instance, target, **kwargs):
     :type instance: RssFetch
     """
     if target == 'fetching':
-        tasks.fetch_rss.delay(instance.pk)
+        OutboxMessage.objects.enqueue(tasks.fetch_rss, instance.pk)
 
 
 def datetime_from_feedparser(entry):
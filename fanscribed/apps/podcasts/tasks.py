@@ -1,8 +1,6 @@
-import os
 from uuid import uuid4
 
 from celery.app import shared_task
-from django.core.files import File
 import requests
 
 
@@ -23,6 +21,7 @@ def fetch_rss(rss_fetch_pk):
 def fetch_episode_raw_media(episode_pk):
 
     from ..transcripts.models import TranscriptMedia
+    from ..transcripts.tasks import ingest_transcript_media
     from .models import Episode
 
     episode = Episode.objects.get(pk=episode_pk)
@@ -35,18 +34,11 @@ def fetch_episode_raw_media(episode_pk):
         is_full_length=True,
     )
 
-    # Stream MP3, then save it.
+    # Stream MP3, processing it into our normalized format as it arrives,
+    # then save it.
     uuid = uuid4().hex
     raw_path = '{transcript.id}_raw_{uuid}.mp3'.format(**locals())
     response = requests.get(episode.media_url, stream=True)
-    raw_file = os.tmpfile()
-    for chunk in response.iter_content(262144):
-        raw_file.write(chunk)
-    raw_file.seek(0)
 
     print 'Saving {episode.media_url} to {raw_path}'.format(**locals())
-    media.file.save(raw_path, File(raw_file))
-    raw_file.close()
-
-    # Now process it into our normalized format.
-    media.create_processed_task()
+    ingest_transcript_media(media, raw_path, response.iter_content(262144))
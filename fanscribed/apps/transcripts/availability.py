@@ -0,0 +1,268 @@
+"""Redis index of the fragments, stitches, and sentences available for tasks.
+
+Each transcript has one sorted set per (task_type, is_review) pair holding
+the ids of the objects a task of that kind could be created for.
+
+Objects are scored so that the index has the same order as their model:
+fragments and stitches by id, since they are created in transcript order,
+and sentences by the start of their first fragment, then their sequence.
+
+The indexes are kept in sync by signal receivers in `models`, and are
+rebuilt from the database when missing. Rows changed with
+`QuerySet.update()` must be passed to `update_all`, and rows deleted
+without signals to `remove_all`. Changes made inside a transaction should
+be wrapped in `deferred`, so the index only ever shows what was committed.
+
+The index holds no per-user rules. Candidates read from it are checked
+against the caller's queryset, which applies those rules; after a few
+windows of rejected candidates, the queryset itself is asked instead.
+"""
+
+import logging
+log = logging.getLogger(__name__)
+
+from contextlib import contextmanager
+import threading
+
+from django_redis import get_redis_connection
+
+
+# Number of candidate ids to read from the front of an index at a time.
+CANDIDATE_WINDOW = 20
+
+# Windows of candidates to check before querying the database instead.
+MAX_CANDIDATE_WINDOWS = 3
+
+# Sentences of one fragment are scored apart by their sequence,
+# so each fragment start is worth this many sequences.
+SEQUENCES_PER_FRAGMENT = 1000
+
+# Model related to each task type, by name.
+INDEXED_MODEL = {
+    # task_type: model_name,
+    'transcribe': 'TranscriptFragment',
+    'stitch': 'TranscriptStitch',
+    'clean': 'Sentence',
+    'boundary': 'Sentence',
+    'speaker': 'Sentence',
+}
+
+# Field values an object must have to be available for a task.
+AVAILABLE_WHEN = {
+    # (task_type, is_review): {field_name: value},
+    ('transcribe', False): dict(state='empty', lock_state='unlocked'),
+    ('transcribe', True): dict(state='transcribed', lock_state='unlocked'),
+    ('stitch', False): dict(state='unstitched', lock_state='unlocked'),
+    ('stitch', True): dict(state='stitched', lock_state='unlocked'),
+    ('clean', False): dict(state='completed', clean_state='untouched'),
+    ('clean', True): dict(state='completed', clean_state='edited'),
+    ('boundary', False): dict(state='completed', boundary_state='untouched'),
+    ('boundary', True): dict(state='completed', boundary_state='edited'),
+    ('speaker', False): dict(state='completed', speaker_state='untouched'),
+    ('speaker', True): dict(state='completed', speaker_state='edited'),
+}
+
+# Objects changed while updates are deferred, by thread.
+_deferred = threading.local()
+
+
+def _conn():
+    return get_redis_connection('default')
+
+
+def _index_key(transcript_id, task_type, is_review):
+    return 'avail:{}:{}:{}'.format(
+        transcript_id, task_type, 'review' if is_review else 'edit')
+
+
+def _built_key(transcript_id):
+    return 'avail:{}:built'.format(transcript_id)
+
+
+def _sentence_score(tf_start, tf_sequence):
+    return float(int(tf_start * 100) * SEQUENCES_PER_FRAGMENT + tf_sequence)
+
+
+def _score(instance):
+    if instance._meta.model_name == 'sentence':
+        return _sentence_score(instance.tf_start.start, instance.tf_sequence)
+    else:
+        return instance.id
+
+
+def _task_types_for(model):
+    model_name = model._meta.object_name
+    return [task_type for task_type, name in INDEXED_MODEL.items()
+            if name == model_name]
+
+
+def _is_available(instance, task_type, is_review):
+    required = AVAILABLE_WHEN[(task_type, is_review)]
+    return all(getattr(instance, field) == value
+               for field, value in required.items())
+
+
+def _update(pipe, instance):
+    for task_type in _task_types_for(type(instance)):
+        for is_review in [False, True]:
+            key = _index_key(instance.transcript_id, task_type, is_review)
+            if _is_available(instance, task_type, is_review):
+                pipe.zadd(key, _score(instance), instance.id)
+            else:
+                pipe.zrem(key, instance.id)
+
+
+def _remove(pipe, model, transcript_id, id):
+    for task_type in _task_types_for(model):
+        for is_review in [False, True]:
+            pipe.zrem(_index_key(transcript_id, task_type, is_review), id)
+
+
+def _defer(instances):
+    """Record instances for a deferred update; return False if not deferring."""
+    pending = getattr(_deferred, 'pending', None)
+    if pending is None:
+        return False
+    for instance in instances:
+        pending[(type(instance), instance.id)] = instance.transcript_id
+    return True
+
+
+def update(instance):
+    """Add `instance` to, or remove it from, each index it belongs in."""
+    update_all([instance])
+
+
+def update_all(instances):
+    """Update the indexes for each of `instances`, in one round trip."""
+    instances = list(instances)
+    if _defer(instances):
+        return
+    pipe = _conn().pipeline(transaction=False)
+    for instance in instances:
+        _update(pipe, instance)
+    pipe.execute()
+
+
+def remove(instance):
+    """Remove `instance` from every index it may be in."""
+    remove_all([instance])
+
+
+def remove_all(instances):
+    """Remove each of `instances` from every index, in one round trip."""
+    instances = list(instances)
+    if _defer(instances):
+        return
+    pipe = _conn().pipeline(transaction=False)
+    for instance in instances:
+        _remove(pipe, type(instance), instance.transcript_id, instance.id)
+    pipe.execute()
+
+
+@contextmanager
+def deferred():
+    """Hold back index updates until the block exits.
+
+    The objects changed in the block are then read back from the database,
+    so the index follows what was committed, or what a rollback restored.
+    Wrap it around `transaction.atomic()`.
+    """
+    if getattr(_deferred, 'pending', None) is not None:
+        # Already deferring, in an outer block.
+        yield
+        return
+    pending = _deferred.pending = {}
+    try:
+        yield
+    finally:
+        _deferred.pending = None
+        _flush(pending)
+
+
+def _flush(pending):
+    by_model = {}
+    for (model, id), transcript_id in pending.items():
+        by_model.setdefault(model, {})[id] = transcript_id
+    pipe = _conn().pipeline(transaction=False)
+    for model, transcript_ids in by_model.items():
+        queryset = model.objects.all()
+        if model._meta.model_name == 'sentence':
+            queryset = queryset.select_related('tf_start')
+        found = queryset.in_bulk(list(transcript_ids))
+        for id, transcript_id in transcript_ids.items():
+            if id in found:
+                _update(pipe, found[id])
+            else:
+                _remove(pipe, model, transcript_id, id)
+    pipe.execute()
+
+
+def rebuild(transcript):
+    """Rebuild all of the transcript's indexes from the database."""
+    managers = {
+        'TranscriptFragment': transcript.fragments,
+        'TranscriptStitch': transcript.stitches,
+        'Sentence': transcript.sentences,
+    }
+    pipe = _conn().pipeline(transaction=True)
+    for (task_type, is_review), required in AVAILABLE_WHEN.items():
+        key = _index_key(transcript.id, task_type, is_review)
+        pipe.delete(key)
+        manager = managers[INDEXED_MODEL[task_type]]
+        if INDEXED_MODEL[task_type] == 'Sentence':
+            rows = manager.filter(**required).values_list(
+                'id', 'tf_start__start', 'tf_sequence')
+            args = []
+            for id, tf_start, tf_sequence in rows:
+                args.extend([_sentence_score(tf_start, tf_sequence), id])
+        else:
+            ids = manager.filter(**required).values_list('id', flat=True)
+            args = []
+            for id in ids:
+                args.extend([id, id])
+        if args:
+            pipe.zadd(key, *args)
+    pipe.set(_built_key(transcript.id), 1)
+    pipe.execute()
+    log.info('rebuilt availability index for transcript %s', transcript.id)
+
+
+def _ensure_built(conn, transcript):
+    if not conn.exists(_built_key(transcript.id)):
+        rebuild(transcript)
+
+
+def count(transcript, task_type, is_review):
+    """Return the number of objects available for a task."""
+    conn = _conn()
+    _ensure_built(conn, transcript)
+    return conn.zcard(_index_key(transcript.id, task_type, is_review))
+
+
+def first_available(queryset, transcript, task_type, is_review):
+    """Return the first indexed object that is also found in `queryset`.
+
+    `queryset` applies the exact availability rules (including teamwork
+    exclusions), so stale or excluded index entries are skipped. If the
+    first MAX_CANDIDATE_WINDOWS windows are all skipped, returns the first
+    object of `queryset` itself. Returns None if nothing is available.
+    """
+    conn = _conn()
+    _ensure_built(conn, transcript)
+    key = _index_key(transcript.id, task_type, is_review)
+    for window in xrange(MAX_CANDIDATE_WINDOWS):
+        start = window * CANDIDATE_WINDOW
+        ids = [int(id) for id in
+               conn.zrange(key, start, start + CANDIDATE_WINDOW - 1)]
+        if not ids:
+            return None
+        found = queryset.in_bulk(ids)
+        for id in ids:
+            if id in found:
+                return found[id]
+        if len(ids) < CANDIDATE_WINDOW:
+            return None
+    log.info('availability index for transcript %s exhausted; querying',
+             transcript.id)
+    return queryset.first()
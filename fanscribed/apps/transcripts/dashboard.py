@@ -0,0 +1,102 @@
+"""Aggregate counts for the staff view of a transcript's work."""
+
+from django.core.cache import cache
+from django.db.models import Count
+
+
+# How long to keep a computed dashboard for one transcript version.
+CACHE_TIMEOUT = 600
+
+TASK_STATES = ['presented', 'valid', 'invalid']
+FRAGMENT_STATES = ['empty', 'transcribed', 'reviewed']
+STITCH_STATES = ['notready', 'unstitched', 'stitched', 'reviewed']
+SENTENCE_STATES = ['empty', 'partial', 'completed']
+LOCK_STATES = ['locked', 'unlocked']
+
+
+def _version_key(transcript_id):
+    return 'transcript-version:{}'.format(transcript_id)
+
+
+def touch(transcript_id):
+    """Mark the transcript's cached dashboard as stale."""
+    key = _version_key(transcript_id)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr.
+            cache.add(key, 1, timeout=None)
+
+
+def _grouped_counts(queryset, fields):
+    """Return {(value, ...): count} grouped by `fields`, in one query."""
+    rows = queryset.order_by().values(*fields).annotate(n=Count('id'))
+    return dict(
+        (tuple(row[field] for field in fields), row['n'])
+        for row in rows
+    )
+
+
+def _summarize(counts, states, lock_states=None):
+    """Summarize counts keyed by (state,) or (state, lock_state)."""
+    summary = dict(total=sum(counts.values()))
+    for state in states:
+        summary[state] = sum(
+            n for key, n in counts.items() if key[0] == state)
+    for lock_state in lock_states or []:
+        summary[lock_state] = sum(
+            n for key, n in counts.items() if key[1] == lock_state)
+    return summary
+
+
+class TranscriptDashboard(object):
+    """Counts of task, fragment, stitch, and sentence states of a transcript.
+
+    Everything is computed with one GROUP BY query per table and cached
+    until the transcript's version is bumped by `touch`.
+    """
+
+    def __init__(self, transcript):
+        self.transcript = transcript
+
+    def _cache_key(self):
+        version = cache.get(_version_key(self.transcript.id), 0)
+        return 'transcript-dashboard:{}:{}'.format(self.transcript.id, version)
+
+    def data(self):
+        key = self._cache_key()
+        data = cache.get(key)
+        if data is None:
+            data = self.compute()
+            cache.set(key, data, CACHE_TIMEOUT)
+        return data
+
+    def compute(self):
+        from .models import TASK_MODEL
+
+        transcript = self.transcript
+        tasks = {}
+        for task_type, model_class in TASK_MODEL.items():
+            counts = _grouped_counts(
+                model_class.objects.filter(transcript=transcript), ['state'])
+            tasks[task_type] = _summarize(counts, TASK_STATES)
+
+        fragments = _summarize(
+            _grouped_counts(transcript.fragments.all(), ['state', 'lock_state']),
+            FRAGMENT_STATES, LOCK_STATES)
+        stitches = _summarize(
+            _grouped_counts(transcript.stitches.all(), ['state', 'lock_state']),
+            STITCH_STATES, LOCK_STATES)
+        sentences = _summarize(
+            _grouped_counts(transcript.sentences.all(), ['state']),
+            SENTENCE_STATES)
+
+        return dict(
+            tasks=tasks,
+            fragments=fragments,
+            stitches=stitches,
+            sentences=sentences,
+            review_cycles_saved=transcript.progress_counts.review_cycles_saved,
+            tasks_expired=transcript.progress_counts.tasks_expired,
+        )
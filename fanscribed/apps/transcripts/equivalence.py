@@ -0,0 +1,76 @@
+"""Decide whether a review left a text effectively unchanged.
+
+The checker is set by settings.TRANSCRIPT_REVIEW_EQUIVALENCE, the dotted
+path of a function taking (previous_text, latest_text) and returning True
+when the two should be considered the same.
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .overlap import normify
+
+
+def _within_distance(a, b, limit):
+    """Return True if the edit distance between a and b is at most limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if limit == 0:
+        return a == b
+    infinity = limit + 1
+    previous = [j if j <= limit else infinity for j in xrange(len(b) + 1)]
+    for i in xrange(1, len(a) + 1):
+        current = [i if i <= limit else infinity]
+        for j in xrange(1, len(b) + 1):
+            if abs(i - j) > limit:
+                current.append(infinity)
+            else:
+                current.append(min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (a[i - 1] != b[j - 1]),
+                    infinity,
+                ))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def normalized(previous, latest):
+    """Compare line by line, ignoring case, punctuation and spacing.
+
+    Each pair of normalized lines may differ by up to
+    settings.TRANSCRIPT_REVIEW_TOLERANCE edits per character.
+    """
+    previous_lines = [normify(line) for line in previous.splitlines() if line.strip()]
+    latest_lines = [normify(line) for line in latest.splitlines() if line.strip()]
+    if len(previous_lines) != len(latest_lines):
+        return False
+    for a, b in zip(previous_lines, latest_lines):
+        limit = int(max(len(a), len(b)) * settings.TRANSCRIPT_REVIEW_TOLERANCE)
+        if not _within_distance(a, b, limit):
+            return False
+    return True
+
+
+def equivalent(previous, latest):
+    """Return True if the configured checker finds the texts the same."""
+    checker = import_string(settings.TRANSCRIPT_REVIEW_EQUIVALENCE)
+    return checker(previous, latest)
+
+
+def review_converged(transcript, previous, latest):
+    """Return True if a review left the text effectively unchanged.
+
+    Reviews that only converge thanks to the checker are counted in the
+    transcript's progress as review cycles saved.
+    """
+    from .models import TranscriptProgress
+
+    if previous.strip() == latest.strip():
+        return True
+    if equivalent(previous, latest):
+        TranscriptProgress.objects.adjust(transcript.id, review_cycles_saved=1)
+        return True
+    return False
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+
+    args = '[<transcript-id> ...]'
+    help = "Recount transcript progress counters to repair drift"
+
+    def handle(self, *args, **options):
+
+        from ...models import Transcript
+
+        transcripts = Transcript.objects.all()
+        if args:
+            try:
+                ids = [int(arg) for arg in args]
+            except ValueError:
+                raise CommandError('Transcript IDs must be integers.')
+            transcripts = transcripts.filter(id__in=ids)
+
+        for transcript in transcripts:
+            transcript.progress_counts.rebuild()
+            if options['verbosity']:
+                self.stdout.write(
+                    u'Rebuilt progress for {}: {}'.format(
+                        transcript.id, transcript.stats))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptProgress',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('fragments_total', models.IntegerField(default=0)),
+                ('fragments_transcribed', models.IntegerField(default=0)),
+                ('fragments_reviewed', models.IntegerField(default=0)),
+                ('stitches_total', models.IntegerField(default=0)),
+                ('stitches_stitched', models.IntegerField(default=0)),
+                ('stitches_reviewed', models.IntegerField(default=0)),
+                ('sentences_total', models.IntegerField(default=0)),
+                ('sentences_clean_edited', models.IntegerField(default=0)),
+                ('sentences_clean_reviewed', models.IntegerField(default=0)),
+                ('sentences_boundary_edited', models.IntegerField(default=0)),
+                ('sentences_boundary_reviewed', models.IntegerField(default=0)),
+                ('sentences_speaker_edited', models.IntegerField(default=0)),
+                ('sentences_speaker_reviewed', models.IntegerField(default=0)),
+                ('transcript', models.OneToOneField(related_name='progress', to='transcripts.Transcript')),
+            ],
+        ),
+    ]
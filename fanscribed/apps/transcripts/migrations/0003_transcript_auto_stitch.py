@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0002_transcriptprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcript',
+            name='auto_stitch',
+            field=models.BooleanField(default=False, help_text=b'Stitch confidently-overlapping fragments without people, when the auto_stitch switch is on.'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0003_transcript_auto_stitch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptprogress',
+            name='review_cycles_saved',
+            field=models.IntegerField(default=0),
+        ),
+    ]
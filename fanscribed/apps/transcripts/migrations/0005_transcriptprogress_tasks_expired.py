@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0004_transcriptprogress_review_cycles_saved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptprogress',
+            name='tasks_expired',
+            field=models.IntegerField(default=0),
+        ),
+    ]
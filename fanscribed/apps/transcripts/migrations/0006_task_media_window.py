@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+TASK_MODELS = [
+    'TranscribeTask', 'StitchTask', 'CleanTask', 'BoundaryTask', 'SpeakerTask']
+
+
+def copy_media_windows(apps, schema_editor):
+    for model_name in TASK_MODELS:
+        model = apps.get_model('transcripts', model_name)
+        for task in model.objects.filter(media__isnull=False).select_related('media'):
+            model.objects.filter(pk=task.pk).update(
+                media_start=task.media.start, media_end=task.media.end)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0005_transcriptprogress_tasks_expired'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boundarytask',
+            name='media_end',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='boundarytask',
+            name='media_start',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='cleantask',
+            name='media_end',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='cleantask',
+            name='media_start',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='speakertask',
+            name='media_end',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='speakertask',
+            name='media_start',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='stitchtask',
+            name='media_end',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='stitchtask',
+            name='media_start',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='transcribetask',
+            name='media_end',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='transcribetask',
+            name='media_start',
+            field=models.DecimalField(null=True, max_digits=8, decimal_places=2, blank=True),
+        ),
+        migrations.AddField(
+            model_name='transcriptmedia',
+            name='frames',
+            field=models.FileField(help_text=b'Frame index of processed full-length media.', max_length=1024, upload_to=b'transcripts', blank=True),
+        ),
+        migrations.RunPython(copy_media_windows, migrations.RunPython.noop),
+    ]
@@ -1,27 +1,30 @@
 import logging
 log = logging.getLogger(__name__)
 
+from collections import Counter, defaultdict
 import datetime
 from decimal import Decimal
-import re
-import unicodedata
 
 from allauth.account.signals import user_signed_up
 from django.conf import settings
 from django.contrib.auth.models import Group
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.text import slugify
 from django.utils.timezone import utc
 from django_fsm.db.fields import FSMField, transition
 from django_fsm.signals import pre_transition, post_transition
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 from django_redis import get_redis_connection
-from waffle import flag_is_active
+from waffle import flag_is_active, switch_is_active
 
 from ... import locks
+from ..outbox.models import OutboxMessage
+from . import availability, dashboard, equivalence, overlap
 
 
 # ================================================================
@@ -42,6 +45,52 @@ class SentenceManager(models.Manager):
     def completed(self):
         return self.filter(state='completed')
 
+    def complete(self, completions):
+        """Complete partial sentences, saving only the fields that change.
+
+        `completions` is a list of (sentence, text, start, end).
+        """
+        revisions = []
+        for sentence, text, start, end in completions:
+            sentence.complete(text, start, end)
+            sentence.save(update_fields=[
+                'state', 'latest_text', 'latest_start', 'latest_end'])
+            revisions.append(SentenceRevision(
+                sentence=sentence,
+                sequence=1,
+                text=text,
+            ))
+        SentenceRevision.objects.bulk_create(revisions)
+
+    def delete_uncompleted(self, sentence_ids):
+        """Delete sentences that are not completed, in a fixed number of queries.
+
+        Such sentences have no revisions, boundaries, or tasks, so only
+        their fragment rows go with them. No signals are sent; progress and
+        availability are updated once for all of them instead. Callers
+        touch the transcript's dashboard.
+        """
+        sentences = list(self.filter(id__in=sentence_ids))
+        if not sentences:
+            return 0
+        deltas = defaultdict(Counter)
+        for sentence in sentences:
+            counts = deltas[sentence.transcript_id]
+            counts['sentences_total'] -= 1
+            for name in _sentence_state_counters(sentence.tracker.current()):
+                counts[name] -= 1
+        ids = [sentence.id for sentence in sentences]
+        for through in [self.model.fragments.through,
+                        self.model.fragment_candidates.through]:
+            rows = through.objects.filter(sentence__in=ids)
+            rows._raw_delete(rows.db)
+        deleted = self.filter(id__in=ids)
+        deleted._raw_delete(deleted.db)
+        for transcript_id, counts in deltas.items():
+            TranscriptProgress.objects.adjust(transcript_id, **counts)
+        availability.remove_all(sentences)
+        return len(sentences)
+
     def clean_edited(self):
         return self.filter(clean_state='edited')
 
@@ -61,6 +110,10 @@ class SentenceManager(models.Manager):
         return self.filter(speaker_state='reviewed')
 
 
+# Sentence task states that are counted in TranscriptProgress.
+TRACKED_SENTENCE_STATES = ['clean_state', 'boundary_state', 'speaker_state']
+
+
 class Sentence(models.Model):
     """A sentence made from sentence fragments.
 
@@ -124,6 +177,8 @@ class Sentence(models.Model):
 
     objects = SentenceManager()
 
+    tracker = FieldTracker(fields=TRACKED_SENTENCE_STATES)
+
     def __unicode__(self):
         return u'{self.state} sentence'.format(**locals())
 
@@ -151,21 +206,13 @@ class Sentence(models.Model):
         self.fragments.add(*candidates)
         self.fragment_candidates.remove(*candidates)
 
-    @transition(state, 'partial', 'completed', save=True)
-    def complete(self):
+    @transition(state, 'partial', 'completed')
+    def complete(self, text, start, end):
         # Set initial latest text and (latest_start, latest_end).
-        self.revisions.create(
-            sequence=1,
-            text=self.text,
-        )
-        starts = set()
-        ends = set()
-        for fragment in self.fragments.all():
-            transcript_fragment = fragment.revision.fragment
-            starts.add(transcript_fragment.start)
-            ends.add(transcript_fragment.end)
-        self.latest_start = min(starts)
-        self.latest_end = max(ends)
+        # Saved, along with the first revision, by `SentenceManager.complete`.
+        self.latest_text = text
+        self.latest_start = start
+        self.latest_end = end
 
     # --
 
@@ -187,6 +234,7 @@ class Sentence(models.Model):
             instance=self,
             lockname=self._clean_lockname,
             lockid_field='clean_lock_id',
+            ltime=settings.TRANSCRIPT_TASK_LEASES['clean'],
         )
 
     def unlock_clean(self):
@@ -203,6 +251,7 @@ class Sentence(models.Model):
             instance=self,
             lockname=self._boundary_lockname,
             lockid_field='boundary_lock_id',
+            ltime=settings.TRANSCRIPT_TASK_LEASES['boundary'],
         )
 
     def unlock_boundary(self):
@@ -219,6 +268,7 @@ class Sentence(models.Model):
             instance=self,
             lockname=self._speaker_lockname,
             lockid_field='speaker_lock_id',
+            ltime=settings.TRANSCRIPT_TASK_LEASES['speaker'],
         )
 
     def unlock_speaker(self):
@@ -230,6 +280,58 @@ class Sentence(models.Model):
         )
 
 
+# Sentence task states are unprotected fields changed by saving,
+# so keep the availability index in sync on every save.
+@receiver(post_save, sender=Sentence)
+def update_sentence_availability(instance, raw, **kwargs):
+    if not raw:
+        availability.update(instance)
+
+
+@receiver(post_delete, sender=Sentence)
+def remove_sentence_availability(instance, **kwargs):
+    availability.remove(instance)
+
+
+def _sentence_state_counters(values):
+    """Return TranscriptProgress counter names for a sentence's states."""
+    counters = []
+    for field in TRACKED_SENTENCE_STATES:
+        state = values[field]
+        if state in ('edited', 'reviewed'):
+            counters.append('sentences_{}_{}'.format(
+                field.split('_')[0], state))
+    return counters
+
+
+@receiver(post_save, sender=Sentence)
+def count_sentence_progress(instance, created, raw, **kwargs):
+    if raw:
+        return
+    deltas = {}
+    current = instance.tracker.current()
+    if created:
+        deltas['sentences_total'] = 1
+    else:
+        previous = dict((field, instance.tracker.previous(field))
+                        for field in TRACKED_SENTENCE_STATES)
+        for name in _sentence_state_counters(previous):
+            deltas[name] = deltas.get(name, 0) - 1
+    for name in _sentence_state_counters(current):
+        deltas[name] = deltas.get(name, 0) + 1
+    deltas = dict((name, delta) for name, delta in deltas.items() if delta)
+    if deltas:
+        TranscriptProgress.objects.adjust(instance.transcript_id, **deltas)
+
+
+@receiver(post_delete, sender=Sentence)
+def uncount_sentence_progress(instance, **kwargs):
+    deltas = dict(sentences_total=-1)
+    for name in _sentence_state_counters(instance.tracker.current()):
+        deltas[name] = -1
+    TranscriptProgress.objects.adjust(instance.transcript_id, **deltas)
+
+
 # ---------------------
 
 
@@ -371,6 +473,10 @@ class Transcript(TimeStampedModel):
     created_by = models.ForeignKey('auth.User', blank=True, null=True)
     contributors = models.ManyToManyField(
         'auth.User', related_name='contributed_to_transcripts')
+    auto_stitch = models.BooleanField(
+        default=False,
+        help_text='Stitch confidently-overlapping fragments without people, '
+                  'when the auto_stitch switch is on.')
 
     objects = TranscriptManager()
 
@@ -401,6 +507,7 @@ class Transcript(TimeStampedModel):
     def _create_fragments(self):
         start = Decimal('0')
         previous = None
+        fragments_total = stitches_total = 0
         while start < self.length:
 
             # Find the end of the current fragment.
@@ -417,16 +524,48 @@ class Transcript(TimeStampedModel):
                 # stitched_left=True if start == Decimal('0') else False,
                 # stitched_right=True if end == self.length else False,
             )
+            fragments_total += 1
 
             if previous is not None:
                 self.stitches.create(
                     left=previous,
                     right=current,
                 )
+                stitches_total += 1
 
             start = end
             previous = current
 
+        TranscriptProgress.objects.adjust(
+            self.id,
+            fragments_total=fragments_total,
+            stitches_total=stitches_total,
+        )
+
+    def media_window(self, start, end):
+        """Return the media (start, end) of a task covering start to end."""
+        # Apply overlap.
+        start = start - settings.TRANSCRIPT_FRAGMENT_OVERLAP
+        end = end + settings.TRANSCRIPT_FRAGMENT_OVERLAP
+
+        # Correct for out of bounds.
+        start = max(Decimal('0.00'), start)
+        end = min(self.length, end)
+        return start, end
+
+    def media_windows(self):
+        """Return the media (start, end) of every transcribe and stitch task.
+
+        They are in the order tasks are expected to be assigned: a stitch
+        becomes available after the fragment to its right.
+        """
+        windows = []
+        for fragment in self.fragments.all():
+            windows.append((fragment.end, 0, self.media_window(fragment.start, fragment.end)))
+        for stitch in self.stitches.select_related('left', 'right'):
+            windows.append((stitch.right.end, 1, self.media_window(stitch.left.start, stitch.right.end)))
+        return [window for _, _, window in sorted(windows)]
+
     @property
     def completed_sentences(self):
         return self.sentences.filter(state='completed').order_by('latest_start')
@@ -444,50 +583,142 @@ class Transcript(TimeStampedModel):
     def stats(self):
         """Return a dictionary with a percentage of completion of each phase."""
         stats = {}
+        progress = self.progress_counts
 
-        fragments_count = self.fragments.count()
-        if fragments_count == 0:
+        if progress.fragments_total == 0:
             stats.update(transcribe=0)
         else:
             stats['transcribe'] = (
-                (self.fragments.transcribed().count() + self.fragments.reviewed().count() * 2) * 100
+                (progress.fragments_transcribed + progress.fragments_reviewed * 2) * 100
                 /
-                (self.fragments.count() * 2)
+                (progress.fragments_total * 2)
             )
 
-        stitches_count = self.stitches.count()
-        if stitches_count == 0:
+        if progress.stitches_total == 0:
             stats.update(stitch=0)
         else:
             stats['stitch'] = (
-                (self.stitches.stitched().count() + self.stitches.reviewed().count() * 2) * 100
+                (progress.stitches_stitched + progress.stitches_reviewed * 2) * 100
                 /
-                (self.stitches.count() * 2)
+                (progress.stitches_total * 2)
             )
-        
-        sentence_count = self.sentences.count()
+
+        sentence_count = progress.sentences_total
         if sentence_count == 0:
             stats.update(clean=0, boundary=0, speaker=0)
         else:
             stitch_factor = stats['stitch'] * 0.01
             stats['clean'] = (
-                (self.sentences.clean_edited().count() + self.sentences.clean_reviewed().count() * 2) * 100 * stitch_factor
+                (progress.sentences_clean_edited + progress.sentences_clean_reviewed * 2) * 100 * stitch_factor
                 /
                 (sentence_count * 2)
             )
             stats['boundary'] = (
-                (self.sentences.boundary_edited().count() + self.sentences.boundary_reviewed().count() * 2) * 100 * stitch_factor
+                (progress.sentences_boundary_edited + progress.sentences_boundary_reviewed * 2) * 100 * stitch_factor
                 /
                 (sentence_count * 2)
             )
             stats['speaker'] = (
-                (self.sentences.speaker_edited().count() + self.sentences.speaker_reviewed().count() * 2) * 100 * stitch_factor
+                (progress.sentences_speaker_edited + progress.sentences_speaker_reviewed * 2) * 100 * stitch_factor
                 /
                 (sentence_count * 2)
             )
 
         return stats
 
+    @property
+    def progress_counts(self):
+        """Return this transcript's TranscriptProgress, creating it if needed."""
+        progress, created = TranscriptProgress.objects.get_or_create(
+            transcript=self)
+        if created:
+            # Transcript predates progress counting; count from scratch.
+            progress.rebuild()
+        return progress
+
+
+@receiver(post_save, sender=Transcript)
+def create_transcript_progress(instance, created, raw, **kwargs):
+    if created and not raw:
+        TranscriptProgress.objects.create(transcript=instance)
+
+
+# ---------------------
+
+
+class TranscriptProgressManager(models.Manager):
+
+    def adjust(self, transcript_id, **deltas):
+        """Atomically add each delta to the named counter."""
+        self.filter(transcript_id=transcript_id).update(**dict(
+            (name, F(name) + delta) for name, delta in deltas.items()))
+
+
+class TranscriptProgress(models.Model):
+    """Denormalized counts of the states of a transcript's parts.
+
+    Counters are adjusted as fragments, stitches, and sentences change
+    state, so that progress can be read without counting rows.
+    Use `rebuild` (or the `rebuild_transcript_progress` command)
+    to repair any drift.
+    """
+
+    transcript = models.OneToOneField('Transcript', related_name='progress')
+
+    fragments_total = models.IntegerField(default=0)
+    fragments_transcribed = models.IntegerField(default=0)
+    fragments_reviewed = models.IntegerField(default=0)
+
+    stitches_total = models.IntegerField(default=0)
+    stitches_stitched = models.IntegerField(default=0)
+    stitches_reviewed = models.IntegerField(default=0)
+
+    sentences_total = models.IntegerField(default=0)
+    sentences_clean_edited = models.IntegerField(default=0)
+    sentences_clean_reviewed = models.IntegerField(default=0)
+    sentences_boundary_edited = models.IntegerField(default=0)
+    sentences_boundary_reviewed = models.IntegerField(default=0)
+    sentences_speaker_edited = models.IntegerField(default=0)
+    sentences_speaker_reviewed = models.IntegerField(default=0)
+
+    # Reviews that only converged because of `equivalence`;
+    # not recounted by `rebuild`.
+    review_cycles_saved = models.IntegerField(default=0)
+
+    # Tasks abandoned and expired, returning their work to the pool;
+    # not recounted by `rebuild`.
+    tasks_expired = models.IntegerField(default=0)
+
+    objects = TranscriptProgressManager()
+
+    def __unicode__(self):
+        return u'Progress of {self.transcript}'.format(**locals())
+
+    def rebuild(self):
+        """Recount everything from the transcript's rows."""
+        transcript = self.transcript
+        fragments = transcript.fragments
+        stitches = transcript.stitches
+        sentences = transcript.sentences
+
+        self.fragments_total = fragments.count()
+        self.fragments_transcribed = fragments.transcribed().count()
+        self.fragments_reviewed = fragments.reviewed().count()
+
+        self.stitches_total = stitches.count()
+        self.stitches_stitched = stitches.stitched().count()
+        self.stitches_reviewed = stitches.reviewed().count()
+
+        self.sentences_total = sentences.count()
+        self.sentences_clean_edited = sentences.clean_edited().count()
+        self.sentences_clean_reviewed = sentences.clean_reviewed().count()
+        self.sentences_boundary_edited = sentences.boundary_edited().count()
+        self.sentences_boundary_reviewed = sentences.boundary_reviewed().count()
+        self.sentences_speaker_edited = sentences.speaker_edited().count()
+        self.sentences_speaker_reviewed = sentences.speaker_reviewed().count()
+
+        self.save()
+
 
 # ---------------------
 
@@ -565,6 +796,7 @@ class TranscriptFragment(models.Model):
             instance=self,
             lockname=self._lockname,
             lockid_field='lock_id',
+            ltime=settings.TRANSCRIPT_TASK_LEASES['transcribe'],
         )
 
     @transition(lock_state, 'locked', 'unlocked', save=True)
@@ -578,10 +810,14 @@ class TranscriptFragment(models.Model):
 
     @transition(state, 'empty', 'transcribed', save=True)
     def transcribe(self):
-        pass
+        TranscriptProgress.objects.adjust(
+            self.transcript_id, fragments_transcribed=1)
 
     @transition(state, 'transcribed', 'reviewed', save=True)
     def review(self):
+        TranscriptProgress.objects.adjust(
+            self.transcript_id, fragments_transcribed=-1, fragments_reviewed=1)
+
         # Ready related stitches if other fragments are transcribed.
         if self.start != Decimal(0):
             L = self.stitch_at_left
@@ -668,6 +904,7 @@ class TranscriptStitch(models.Model):
             instance=self,
             lockname=self._lockname,
             lockid_field='lock_id',
+            ltime=settings.TRANSCRIPT_TASK_LEASES['stitch'],
         )
 
     @transition(lock_state, 'locked', 'unlocked', save=True)
@@ -685,133 +922,50 @@ class TranscriptStitch(models.Model):
 
     @transition(state, 'unstitched', 'stitched', save=True)
     def stitch(self):
+        TranscriptProgress.objects.adjust(
+            self.transcript_id, stitches_stitched=1)
         self._merge_sentences()
 
     @transition(state, 'stitched', 'reviewed', save=True)
     def review(self):
+        TranscriptProgress.objects.adjust(
+            self.transcript_id, stitches_stitched=-1, stitches_reviewed=1)
         self._merge_sentences()
         self._complete_sentences()
 
     def _merge_sentences(self):
         """Merge overlapping Sentence instances."""
-        left_fragment_revision = self.left.revisions.latest()
-        right_fragment_revision = self.right.revisions.latest()
-
-        for revision in [left_fragment_revision, right_fragment_revision]:
-            deletion_candidates = []
-            for sf in revision.sentence_fragments.all():
-                sentences = sf.sentences
-                candidate_sentences = sf.candidate_sentences
-
-                # If fragment is in more than one sentence,
-                # pick the first sentence as the survivor.
-                if sentences.count() > 1:
-                    survivor = sentences.first()
-                elif candidate_sentences.count() > 1:
-                    survivor = candidate_sentences.first()
-                else:
-                    survivor = None
-
-                if survivor is not None:
-                    # Merge remaining sentences with survivor.
-                    def merge(s, o):
-                        s.fragments.add(*o.fragments.all())
-                        s.fragment_candidates.add(
-                            *o.fragment_candidates.all())
-                        o.delete()
-                    for other in sentences.all():
-                        if other != survivor:
-                            merge(survivor, other)
-                    for other in candidate_sentences.all():
-                        if other != survivor:
-                            merge(survivor, other)
-                else:
-                    # No survivor means there was only one sentence involved.
-                    pass
+        from .stitching import merge_sentences
+        merge_sentences(self)
 
     def _complete_sentences(self):
         """Complete sentences in this stitch (when they are ready)."""
+        from .stitching import complete_sentences
+        complete_sentences(self)
 
-        left_fragment_revision = self.left.revisions.latest()
-        right_fragment_revision = self.right.revisions.latest()
 
-        # Look for partial sentences in these revisions and complete them.
-        revisions_to_complete = [
-            left_fragment_revision,
-            right_fragment_revision,
-        ]
+@receiver(post_transition, sender=TranscriptStitch)
+def auto_stitch_when_ready(instance, target, **kwargs):
+    if (target == 'unstitched'
+        and instance.transcript.auto_stitch
+        and switch_is_active('auto_stitch')
+        ):
+        from .tasks import auto_stitch
+        # Sent once the stitch is committed as unstitched.
+        OutboxMessage.objects.enqueue(auto_stitch, instance.pk)
 
-        # Also look for partial sentences in adjacent reviewed stitches.
-        if self.left.start != Decimal(0):
-            stitch_at_left = TranscriptStitch.objects.get(right=self.left)
-            if stitch_at_left.state == 'reviewed':
-                revisions_to_complete.append(stitch_at_left.left.revisions.latest())
-
-        if self.right.end != self.transcript.length:
-            stitch_at_right = TranscriptStitch.objects.get(left=self.right)
-            if stitch_at_right.state == 'reviewed':
-                revisions_to_complete.append(stitch_at_right.right.revisions.latest())
-
-        # Complete sentences.
-        sentences_checked = set()
-        for revision in revisions_to_complete:
-            for candidate_sf in revision.sentence_fragments.all():
-                for sentence in candidate_sf.sentences.filter(state='partial'):
-
-                    if sentence.id in sentences_checked:
-                        # Already checked this sentence ID.
-                        continue
-
-                    sentences_checked.add(sentence.id)
-
-                    # Check partial sentence.
-
-                    if sentence.fragment_candidates.count() > 0:
-                        # The sentence is still being worked on.
-                        continue
-                    else:
-                        # Complete the sentence if all related stitches
-                        # are reviewed, AND adjacent stitches are reviewed.
-                        for other_sf in sentence.fragments.all():
-                            if True or other_sf != candidate_sf:
-                                other_tf = other_sf.revision.fragment
-                                must_be_reviewed = set()
-
-                                # Find each stitch related to the sentence
-                                # fragment, and its neighbor.
-                                try:
-                                    stitch_at_left = other_tf.stitch_at_left
-                                    must_be_reviewed.add(stitch_at_left)
-                                    left_of_left = TranscriptStitch.objects.get(
-                                        right=stitch_at_left.left)
-                                    must_be_reviewed.add(left_of_left)
-                                except TranscriptStitch.DoesNotExist:
-                                    pass
-
-                                try:
-                                    stitch_at_right = other_tf.stitch_at_right
-                                    must_be_reviewed.add(stitch_at_right)
-                                    right_of_right = TranscriptStitch.objects.get(
-                                        left=stitch_at_right.right)
-                                    must_be_reviewed.add(right_of_right)
-                                except TranscriptStitch.DoesNotExist:
-                                    pass
-
-                                # Ignore the stitch currently being reviewed.
-                                if self in must_be_reviewed:
-                                    must_be_reviewed.remove(self)
-
-                                states = [s.state for s in must_be_reviewed]
-                                if any(state != 'reviewed' for state in states):
-                                    # Not completing.
-                                    break
-                                else:
-                                    # May complete.
-                                    pass
-                        else:
-                            # All stitches involved in the sentence
-                            # are reviewed.
-                            sentence.complete()
+
+@receiver(post_save, sender=TranscriptFragment)
+@receiver(post_save, sender=TranscriptStitch)
+def add_new_fragment_or_stitch_availability(instance, created, raw, **kwargs):
+    if created and not raw:
+        availability.update(instance)
+
+
+@receiver(post_transition, sender=TranscriptFragment)
+@receiver(post_transition, sender=TranscriptStitch)
+def update_fragment_or_stitch_availability(instance, **kwargs):
+    availability.update(instance)
 
 
 # ---------------------
@@ -862,6 +1016,9 @@ class TranscriptMedia(TimeStampedModel):
     start = models.DecimalField(max_digits=8, decimal_places=2, null=True)
     end = models.DecimalField(max_digits=8, decimal_places=2, null=True)
     download_count = models.PositiveIntegerField(default=0)
+    frames = models.FileField(
+        upload_to='transcripts', max_length=1024, blank=True,
+        help_text='Frame index of processed full-length media.')
 
     class Meta:
         unique_together = (
@@ -884,12 +1041,43 @@ class TranscriptMedia(TimeStampedModel):
         Assumes that this one is raw and full-length.
         """
         from .tasks import create_processed_transcript_media
-        return create_processed_transcript_media.delay(self.pk)
+        OutboxMessage.objects.enqueue(create_processed_transcript_media, self.pk)
+
+    def index_frames_task(self):
+        """Store the frame index of this processed, full-length media."""
+        from .tasks import index_processed_media
+        OutboxMessage.objects.enqueue(index_processed_media, self.pk)
 
     def create_file_task(self):
-        """Create a file for this TranscriptMedia."""
+        """Create a file for this TranscriptMedia, unless already creating.
+
+        Moves to `creating` before queueing, so that concurrent requests for
+        the same media wait for one task. Returns True if queued, or None if
+        another request already queued it.
+        """
         from .tasks import create_transcript_media_file
-        return create_transcript_media_file.delay(self.pk)
+        if self.claim_creation():
+            OutboxMessage.objects.enqueue(create_transcript_media_file, self.pk)
+            return True
+
+    def claim_creation(self):
+        """Move to `creating` if no file is being created; return True if so.
+
+        A file still `creating` after TRANSCRIPT_MEDIA_CREATION_TIMEOUT
+        seconds is taken to have failed, and is claimed again.
+
+        The change is made in the database only, so refresh before using
+        the state of this instance.
+        """
+        utcnow = datetime.datetime.utcnow().replace(tzinfo=utc)
+        stale = utcnow - datetime.timedelta(
+            seconds=settings.TRANSCRIPT_MEDIA_CREATION_TIMEOUT)
+        claimed = TranscriptMedia.objects.filter(
+            Q(state__in=['empty', 'deleted'])
+            | Q(state='creating', modified__lt=stale),
+            pk=self.pk,
+        ).update(state='creating', modified=utcnow)
+        return bool(claimed)
 
     def record_download(self):
         self.download_count += 1
@@ -991,20 +1179,24 @@ def assign_next_transcript_task(transcript, user, requested_task_type, request=N
             continue
 
         # Permission granted; try to create this type of task.
+        # create_next finds what is available itself, so one lookup
+        # per type serves both the check and the creation.
         tasks = TASK_MODEL[task_type].objects
-        if tasks.can_create(user, transcript, is_review, request):
-            # Try to get this kind of task,
-            # ignoring lock failures up to 5 times.
-            for x in xrange(5):
-                try:
-                    task = tasks.create_next(user, transcript, is_review, request)
-                except locks.LockException:
-                    # Try again.
-                    continue
+        # Try to get this kind of task,
+        # ignoring lock failures up to 5 times.
+        for x in xrange(5):
+            try:
+                task = tasks.create_next(user, transcript, is_review, request)
+            except locks.LockException:
+                # Try again.
+                continue
+            else:
+                if task is not None:
+                    task.present()
+                    return task
                 else:
-                    if task is not None:
-                        task.present()
-                        return task
+                    # Nothing available to this user; try the next type.
+                    break
 
 
 def request_bypasses_teamwork(request):
@@ -1013,6 +1205,47 @@ def request_bypasses_teamwork(request):
             and flag_is_active(request, 'bypass_teamwork'))
 
 
+def _unlock_all(queryset):
+    """Unlock the locked fragments or stitches in `queryset`, in bulk.
+
+    Returns the (lockname, identifier) of each Redis lock to release.
+    """
+    held = [(instance._lockname, instance.lock_id)
+            for instance in queryset.filter(lock_state='locked')
+            if instance.lock_id]
+    queryset.update(lock_state='unlocked', lock_id=None)
+    availability.update_all(queryset)
+    return held
+
+
+def _restore_sentences(task_type, sentence_ids):
+    """Return sentences from editing or reviewing in bulk, as `_invalidate` does.
+
+    Returns the (lockname, identifier) of each Redis lock to release.
+    """
+    state_field = '{}_state'.format(task_type)
+    lockid_field = '{}_lock_id'.format(task_type)
+    lockname = '_{}_lockname'.format(task_type)
+    sentences = Sentence.objects.filter(pk__in=sentence_ids)
+
+    held = [(getattr(sentence, lockname), getattr(sentence, lockid_field))
+            for sentence in sentences
+            if getattr(sentence, lockid_field)]
+
+    sentences.filter(**{state_field: 'editing'}).update(
+        **{state_field: 'untouched', lockid_field: None})
+    reviewing = sentences.filter(**{state_field: 'reviewing'})
+    # Sentences were uncounted as edited when their review began.
+    edited = list(reviewing.order_by().values_list('transcript').annotate(Count('id')))
+    reviewing.update(**{state_field: 'edited', lockid_field: None})
+    counter = 'sentences_{}_edited'.format(task_type)
+    for transcript_id, n in edited:
+        TranscriptProgress.objects.adjust(transcript_id, **{counter: n})
+
+    availability.update_all(sentences)
+    return held
+
+
 class TaskManager(models.Manager):
 
     use_for_related_fields = True
@@ -1026,6 +1259,22 @@ class TaskManager(models.Manager):
     def invalid(self):
         return self.filter(state='invalid')
 
+    def media_fields(self, transcript, start, end):
+        """Return the fields giving a new task its audio from start to end.
+
+        A TranscriptMedia is only kept for the slice when slices are
+        persisted; otherwise the audio is streamed from the full media.
+        """
+        fields = dict(media_start=start, media_end=end)
+        if settings.TRANSCRIPT_PERSIST_MEDIA_SLICES:
+            fields['media'], created = transcript.media.get_or_create(
+                is_processed=True,
+                is_full_length=False,
+                start=start,
+                end=end,
+            )
+        return fields
+
     def can_create(self, user, transcript, is_review, request=None):
         """Can we create a new task?
 
@@ -1036,13 +1285,37 @@ class TaskManager(models.Manager):
         return False
 
     def create_next(self, user, transcript, is_review, request=None):
-        """Create and return the next new task.
+        """Create and return the next new task, or None if none is available.
 
         :ptype user: django.contrib.auth.models.User
         :ptype transcript: Transcript
         :ptype review: bool
         """
-        raise Task.DoesNotExist()
+        return None
+
+    def expire_all(self, tasks):
+        """Expire the assigned or presented `tasks`; return how many were.
+
+        The same as calling `expire` on each task, but with a few set-based
+        updates instead of a transition per task. Redis is only changed once
+        the transaction is committed.
+        """
+        utcnow = datetime.datetime.utcnow().replace(tzinfo=utc)
+        with availability.deferred(), transaction.atomic():
+            tasks = list(tasks.select_for_update().filter(
+                state__in=['assigned', 'presented']))
+            if not tasks:
+                return 0
+            self.filter(pk__in=[task.pk for task in tasks]).update(
+                state='expired', modified=utcnow)
+            held = self.model._invalidate_all(tasks)
+            expired = Counter(task.transcript_id for task in tasks)
+            for transcript_id, n in expired.items():
+                TranscriptProgress.objects.adjust(transcript_id, tasks_expired=n)
+        locks.release_each(get_redis_connection('default'), held)
+        for transcript_id in expired:
+            dashboard.touch(transcript_id)
+        return len(tasks)
 
 
 class Task(TimeStampedModel):
@@ -1079,6 +1352,11 @@ class Task(TimeStampedModel):
     state = FSMField(default='preparing', protected=True)
     assignee = models.ForeignKey('auth.User', blank=True, null=True)
     media = models.ForeignKey('TranscriptMedia', blank=True, null=True)
+    # The span of the task's audio; also kept when `media` is not.
+    media_start = models.DecimalField(
+        max_digits=8, decimal_places=2, blank=True, null=True)
+    media_end = models.DecimalField(
+        max_digits=8, decimal_places=2, blank=True, null=True)
     presented_at = models.DateTimeField(blank=True, null=True)
     validated_at = models.DateTimeField(blank=True, null=True)
 
@@ -1101,6 +1379,38 @@ class Task(TimeStampedModel):
     def lock(self):
         raise NotImplementedError()
 
+    @property
+    def lease_length(self):
+        """Seconds the task's lock lasts without a heartbeat."""
+        return settings.TRANSCRIPT_TASK_LEASES[self.TASK_TYPE]
+
+    # Name of the related object whose lock the task holds.
+    LEASED_OBJECT = None
+
+    def _leased_lock(self):
+        """Return (instance, lockname, lockid_field) of the task's lock."""
+        raise NotImplementedError()
+
+    def renew_lease(self):
+        """Extend the task's lock; return False if it was already lost."""
+        instance, lockname, lockid_field = self._leased_lock()
+        return locks.renew_model_lock(
+            conn=get_redis_connection('default'),
+            instance=instance,
+            lockname=lockname,
+            lockid_field=lockid_field,
+            ltime=self.lease_length,
+        )
+
+    def holds_lease(self):
+        instance, lockname, lockid_field = self._leased_lock()
+        return locks.holds_model_lock(
+            conn=get_redis_connection('default'),
+            instance=instance,
+            lockname=lockname,
+            lockid_field=lockid_field,
+        )
+
     @transition(state, 'preparing', 'ready', save=True)
     def prepare(self):
         pass
@@ -1118,9 +1428,9 @@ class Task(TimeStampedModel):
         pass
 
     @transition(state, 'presented', 'submitted', save=True)
-    def submit(self):
-        if not settings.TESTING:
-            self._submit()
+    def submit(self, process=True):
+        # Processed by `process_submitted_task` once saved as submitted.
+        self._process_on_submit = process and not settings.TESTING
 
     def _submit(self):
         raise NotImplementedError()
@@ -1148,6 +1458,15 @@ class Task(TimeStampedModel):
     def _invalidate(self):
         raise NotImplementedError()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        """Do what `_invalidate` does for each of `tasks`, in bulk.
+
+        Returns the (lockname, identifier) of each Redis lock to release
+        once the changes are committed.
+        """
+        raise NotImplementedError()
+
 
 # ---------------------
 
@@ -1171,21 +1490,22 @@ class TranscribeTaskManager(TaskManager):
 
         return fragments
 
+    def _first_available(self, user, transcript, is_review, request=None):
+        return availability.first_available(
+            self._available_fragments(user, transcript, is_review, request),
+            transcript, self.model.TASK_TYPE, is_review)
+
     def can_create(self, user, transcript, is_review, request=None):
-        return bool(self._available_fragments(user, transcript, is_review, request).count())
+        # Also checked against the teamwork rules of `_available_fragments`.
+        return self._first_available(
+            user, transcript, is_review, request) is not None
 
     def create_next(self, user, transcript, is_review, request=None):
-        fragment = self._available_fragments(user, transcript, is_review, request).first()
+        fragment = self._first_available(user, transcript, is_review, request)
         if fragment is None:
             return None
 
-        # Apply overlap.
-        start = fragment.start - settings.TRANSCRIPT_FRAGMENT_OVERLAP
-        end = fragment.end + settings.TRANSCRIPT_FRAGMENT_OVERLAP
-
-        # Correct for out of bounds.
-        start = max(Decimal('0.00'), start)
-        end = min(transcript.length, end)
+        start, end = transcript.media_window(fragment.start, fragment.end)
 
         task = transcript.transcribetask_set.create(
             is_review=is_review,
@@ -1210,14 +1530,8 @@ class TranscribeTaskManager(TaskManager):
             next = fragment.revisions.create(sequence=latest.sequence + 1,
                                              editor=user)
 
-        media, created = transcript.media.get_or_create(
-            is_processed=True,
-            is_full_length=False,
-            start=start,
-            end=end,
-        )
-
-        task.media = media
+        for name, value in self.media_fields(transcript, start, end).items():
+            setattr(task, name, value)
         task.revision = next
         task.text = text
 
@@ -1229,6 +1543,7 @@ class TranscribeTaskManager(TaskManager):
 class TranscribeTask(Task):
 
     TASK_TYPE = 'transcribe'
+    LEASED_OBJECT = 'fragment'
 
     fragment = models.ForeignKey('TranscriptFragment', blank=True, null=True)
     revision = models.ForeignKey('TranscriptFragmentRevision',
@@ -1249,12 +1564,15 @@ class TranscribeTask(Task):
     def lock(self):
         self.fragment.lock()
 
+    def _leased_lock(self):
+        return self.fragment, self.fragment._lockname, 'lock_id'
+
     def _assign_to(self):
         pass
 
     def _submit(self):
         from .tasks import process_transcribe_task
-        result = process_transcribe_task.delay(self.pk)
+        OutboxMessage.objects.enqueue(process_transcribe_task, self.pk)
 
     def _validate(self):
         self.fragment.last_editor = self.assignee
@@ -1265,6 +1583,14 @@ class TranscribeTask(Task):
         self.revision = None
         self.fragment.unlock()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        revision_ids = [task.revision_id for task in tasks if task.revision_id]
+        cls.objects.filter(pk__in=[task.pk for task in tasks]).update(revision=None)
+        TranscriptFragmentRevision.objects.filter(pk__in=revision_ids).delete()
+        return _unlock_all(TranscriptFragment.objects.filter(
+            pk__in=[task.fragment_id for task in tasks]))
+
 
 # ---------------------
 
@@ -1288,32 +1614,27 @@ class StitchTaskManager(TaskManager):
 
         return stitches
 
+    def _first_available(self, user, transcript, is_review, request=None):
+        return availability.first_available(
+            self._available_stitches(user, transcript, is_review, request),
+            transcript, self.model.TASK_TYPE, is_review)
+
     def can_create(self, user, transcript, is_review, request=None):
-        return bool(self._available_stitches(user, transcript, is_review, request).count())
+        # Also checked against the teamwork rules of `_available_stitches`.
+        return self._first_available(
+            user, transcript, is_review, request) is not None
 
     def create_next(self, user, transcript, is_review, request=None):
-        stitch = self._available_stitches(user, transcript, is_review, request).first()
+        stitch = self._first_available(user, transcript, is_review, request)
         if not stitch:
             return None
 
-        # Apply overlap.
-        start = stitch.left.start - settings.TRANSCRIPT_FRAGMENT_OVERLAP
-        end = stitch.right.end + settings.TRANSCRIPT_FRAGMENT_OVERLAP
-
-        # Correct for out of bounds.
-        start = max(Decimal('0.00'), start)
-        end = min(transcript.length, end)
+        start, end = transcript.media_window(stitch.left.start, stitch.right.end)
 
-        media, created = transcript.media.get_or_create(
-            is_processed=True,
-            is_full_length=False,
-            start=start,
-            end=end,
-        )
         task = transcript.stitchtask_set.create(
             is_review=is_review,
-            media=media,
             stitch=stitch,
+            **self.media_fields(transcript, start, end)
         )
 
         try:
@@ -1333,6 +1654,7 @@ class StitchTaskManager(TaskManager):
 class StitchTask(Task):
 
     TASK_TYPE = 'stitch'
+    LEASED_OBJECT = 'stitch'
 
     stitch = models.ForeignKey('TranscriptStitch', related_name='+')
 
@@ -1348,12 +1670,15 @@ class StitchTask(Task):
     def lock(self):
         self.stitch.lock()
 
+    def _leased_lock(self):
+        return self.stitch, self.stitch._lockname, 'lock_id'
+
     def _assign_to(self):
         pass
 
     def _submit(self):
         from .tasks import process_stitch_task
-        process_stitch_task.delay(self.pk)
+        OutboxMessage.objects.enqueue(process_stitch_task, self.pk)
 
     def _validate(self):
         self.stitch.last_editor = self.assignee
@@ -1362,6 +1687,11 @@ class StitchTask(Task):
     def _invalidate(self):
         self.stitch.unlock()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        return _unlock_all(TranscriptStitch.objects.filter(
+            pk__in=[task.stitch_id for task in tasks]))
+
     def create_pairings_from_prior_task(self):
         # Create StitchTaskPairings based on previous completed task.
         previous_completed_task = StitchTask.objects.filter(
@@ -1374,46 +1704,18 @@ class StitchTask(Task):
                 right=previous_pairing.right,
             )
 
-    def suggested_pairs(self):
-        """Return a list of suggested (left, right) sentence fragment pairs."""
-
-        suggestions = [
-            # (left_sentence_fragment_id, right_sentence_fragment_id),
-        ]
-
+    def scored_suggestions(self):
+        """Return scored suggestions for pairing sentence fragments."""
         stitch = self.stitch
-        left_sentence_fragments = stitch.left.revisions.latest().sentence_fragments.all()
-        right_sentence_fragments = stitch.right.revisions.latest().sentence_fragments.all()
-
-        def normify(text):
-            text = unicodedata.normalize('NFKD', text)
-            text = re.sub(ur'[^\w\s:\)-]', u'', text).strip().lower()
-            return re.sub(ur'[ \s]+', u' ', text)
-
-        for left_sf in left_sentence_fragments:
-            left_text = left_sf.text
-            left_norm = normify(left_text)
-            left_words = left_norm.split(' ')
-
-            for right_sf in right_sentence_fragments:
-                right_text = right_sf.text
-
-                if left_text.startswith('[m]') and right_text.startswith('[m]'):
-                    # Both start with music; suggest.
-                    suggestions.append((left_sf.id, right_sf.id))
-                    continue
-
-                right_norm = normify(right_text)
-                right_words = right_norm.split(' ')
-
-                for i in range(len(left_words)):
-                    left_partial_norm = ' '.join(left_words[i:])
-                    if right_norm.startswith(left_partial_norm):
-                        # Potential overlap of text; suggest.
-                        suggestions.append((left_sf.id, right_sf.id))
-                        break
+        return overlap.suggestions(
+            stitch.left.revisions.latest().sentence_fragments.all(),
+            stitch.right.revisions.latest().sentence_fragments.all(),
+        )
 
-        return suggestions
+    def suggested_pairs(self):
+        """Return a list of suggested (left, right) sentence fragment pairs."""
+        return [(suggestion.left, suggestion.right)
+                for suggestion in self.scored_suggestions()]
 
 
 class StitchTaskPairing(models.Model):
@@ -1454,26 +1756,27 @@ class CleanTaskManager(TaskManager):
 
         return sentences
 
+    def _first_available(self, user, transcript, is_review, request=None):
+        return availability.first_available(
+            self._available_sentences(user, transcript, is_review, request),
+            transcript, self.model.TASK_TYPE, is_review)
+
     def can_create(self, user, transcript, is_review, request=None):
-        return bool(self._available_sentences(user, transcript, is_review, request).count())
+        # Also checked against the teamwork rules of `_available_sentences`.
+        return self._first_available(
+            user, transcript, is_review, request) is not None
 
     def create_next(self, user, transcript, is_review, request=None):
-        sentence = self._available_sentences(user, transcript, is_review, request).first()
+        sentence = self._first_available(user, transcript, is_review, request)
         if sentence is None:
             return None
 
-        media, created = transcript.media.get_or_create(
-            is_processed=True,
-            is_full_length=False,
-            start=sentence.latest_start,
-            end=sentence.latest_end,
-        )
-
         task = transcript.cleantask_set.create(
             is_review=is_review,
-            media=media,
             sentence=sentence,
             text=sentence.latest_text,
+            **self.media_fields(
+                transcript, sentence.latest_start, sentence.latest_end)
         )
 
         try:
@@ -1490,6 +1793,7 @@ class CleanTaskManager(TaskManager):
 class CleanTask(Task):
 
     TASK_TYPE = 'clean'
+    LEASED_OBJECT = 'sentence'
 
     sentence = models.ForeignKey('Sentence')
     text = models.TextField()
@@ -1505,6 +1809,9 @@ class CleanTask(Task):
     def lock(self):
         self.sentence.lock_clean()
 
+    def _leased_lock(self):
+        return self.sentence, self.sentence._clean_lockname, 'clean_lock_id'
+
     def _assign_to(self):
         if not self.is_review:
             self.sentence.clean_state = 'editing'
@@ -1514,14 +1821,15 @@ class CleanTask(Task):
 
     def _submit(self):
         from .tasks import process_clean_task
-        process_clean_task.delay(self.pk)
+        OutboxMessage.objects.enqueue(process_clean_task, self.pk)
 
     def _validate(self):
         if not self.is_review:
             self.sentence.clean_state = 'edited'
         else:
             latest, previous = self.sentence.revisions.order_by('-sequence')[:2]
-            if latest.text.strip() == previous.text.strip():
+            if equivalence.review_converged(
+                    self.transcript, previous.text, latest.text):
                 self.sentence.clean_state = 'reviewed'
             else:
                 self.sentence.clean_state = 'edited'
@@ -1539,6 +1847,10 @@ class CleanTask(Task):
         self.sentence.unlock_clean()
         self.sentence.save()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        return _restore_sentences('clean', [task.sentence_id for task in tasks])
+
 
 # ---------------------
 
@@ -1563,11 +1875,18 @@ class BoundaryTaskManager(TaskManager):
         return sentences
 
 
+    def _first_available(self, user, transcript, is_review, request=None):
+        return availability.first_available(
+            self._available_sentences(user, transcript, is_review, request),
+            transcript, self.model.TASK_TYPE, is_review)
+
     def can_create(self, user, transcript, is_review, request=None):
-        return bool(self._available_sentences(user, transcript, is_review, request).count())
+        # Also checked against the teamwork rules of `_available_sentences`.
+        return self._first_available(
+            user, transcript, is_review, request) is not None
 
     def create_next(self, user, transcript, is_review, request=None):
-        sentence = self._available_sentences(user, transcript, is_review, request).first()
+        sentence = self._first_available(user, transcript, is_review, request)
         if sentence is None:
             return None
 
@@ -1616,18 +1935,12 @@ class BoundaryTaskManager(TaskManager):
             start = sentence.latest_start
             end = sentence.latest_end
 
-        media, created = transcript.media.get_or_create(
-            is_processed=True,
-            is_full_length=False,
-            start=media_start,
-            end=media_end,
-        )
         task = transcript.boundarytask_set.create(
             is_review=is_review,
-            media=media,
             sentence=sentence,
             start=start,
             end=end,
+            **self.media_fields(transcript, media_start, media_end)
         )
 
         try:
@@ -1644,6 +1957,7 @@ class BoundaryTaskManager(TaskManager):
 class BoundaryTask(Task):
 
     TASK_TYPE = 'boundary'
+    LEASED_OBJECT = 'sentence'
 
     sentence = models.ForeignKey('Sentence')
     start = models.DecimalField(max_digits=8, decimal_places=2)
@@ -1660,6 +1974,9 @@ class BoundaryTask(Task):
     def lock(self):
         self.sentence.lock_boundary()
 
+    def _leased_lock(self):
+        return self.sentence, self.sentence._boundary_lockname, 'boundary_lock_id'
+
     def _assign_to(self):
         if not self.is_review:
             self.sentence.boundary_state = 'editing'
@@ -1694,6 +2011,10 @@ class BoundaryTask(Task):
         self.sentence.unlock_boundary()
         self.sentence.save()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        return _restore_sentences('boundary', [task.sentence_id for task in tasks])
+
 
 # NOTE: Calls to _submit are normally processed as a celery task,
 # but we are interested in getting very quick feedback for new tasks
@@ -1731,27 +2052,27 @@ class SpeakerTaskManager(TaskManager):
         return sentences
 
 
+    def _first_available(self, user, transcript, is_review, request=None):
+        return availability.first_available(
+            self._available_sentences(user, transcript, is_review, request),
+            transcript, self.model.TASK_TYPE, is_review)
+
     def can_create(self, user, transcript, is_review, request=None):
-        return bool(self._available_sentences(user, transcript, is_review, request).count())
+        # Also checked against the teamwork rules of `_available_sentences`.
+        return self._first_available(
+            user, transcript, is_review, request) is not None
 
     def create_next(self, user, transcript, is_review, request=None):
-        sentence = self._available_sentences(user, transcript, is_review, request).first()
+        sentence = self._first_available(user, transcript, is_review, request)
         if sentence is None:
             return None
 
-        start = sentence.latest_start
-        media, created = transcript.media.get_or_create(
-            is_processed=True,
-            is_full_length=False,
-            start=sentence.latest_start,
-            end=sentence.latest_end,
-        )
-
         task = transcript.speakertask_set.create(
             is_review=is_review,
-            media=media,
             sentence=sentence,
             speaker=sentence.latest_speaker,
+            **self.media_fields(
+                transcript, sentence.latest_start, sentence.latest_end)
         )
 
         try:
@@ -1768,6 +2089,7 @@ class SpeakerTaskManager(TaskManager):
 class SpeakerTask(Task):
 
     TASK_TYPE = 'speaker'
+    LEASED_OBJECT = 'sentence'
 
     sentence = models.ForeignKey('Sentence')
     speaker = models.ForeignKey('Speaker', blank=True, null=True)
@@ -1784,6 +2106,9 @@ class SpeakerTask(Task):
     def lock(self):
         self.sentence.lock_speaker()
 
+    def _leased_lock(self):
+        return self.sentence, self.sentence._speaker_lockname, 'speaker_lock_id'
+
     def _assign_to(self):
         if not self.is_review:
             self.sentence.speaker_state = 'editing'
@@ -1793,7 +2118,7 @@ class SpeakerTask(Task):
 
     def _submit(self):
         from .tasks import process_speaker_task
-        process_speaker_task.delay(self.pk)
+        OutboxMessage.objects.enqueue(process_speaker_task, self.pk)
 
     def _validate(self):
         if not self.is_review:
@@ -1820,6 +2145,10 @@ class SpeakerTask(Task):
         self.sentence.unlock_speaker()
         self.sentence.save()
 
+    @classmethod
+    def _invalidate_all(cls, tasks):
+        return _restore_sentences('speaker', [task.sentence_id for task in tasks])
+
 
 # ---------------------
 
@@ -1846,6 +2175,26 @@ for _ModelClass in TASK_MODEL.values():
     receiver(pre_transition, sender=_ModelClass)(track_task_presentation_stats)
 
 
+def process_submitted_task(instance, target, **kwargs):
+    # Dispatch only after the submitted state is saved,
+    # so that the processing job never finds the task still presented.
+    if target == 'submitted' and getattr(instance, '_process_on_submit', False):
+        instance._submit()
+
+for _ModelClass in TASK_MODEL.values():
+    receiver(post_transition, sender=_ModelClass)(process_submitted_task)
+
+
+def touch_transcript_dashboard(instance, **kwargs):
+    dashboard.touch(instance.transcript_id)
+
+for _ModelClass in TASK_MODEL.values() + [TranscriptFragment, TranscriptStitch]:
+    receiver(post_transition, sender=_ModelClass)(touch_transcript_dashboard)
+for _ModelClass in TASK_MODEL.values() + [Sentence]:
+    receiver(post_delete, sender=_ModelClass)(touch_transcript_dashboard)
+receiver(post_save, sender=Sentence)(touch_transcript_dashboard)
+
+
 # ---------------------
 
 
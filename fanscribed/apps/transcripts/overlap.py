@@ -0,0 +1,183 @@
+"""Find where the end of one sentence fragment overlaps the start of another.
+
+Transcribers repeat the words at the edges of overlapping media, so a left
+fragment ending with the words a right fragment starts with is likely the
+same sentence.
+"""
+
+from collections import namedtuple
+import re
+import unicodedata
+
+from django.conf import settings
+
+
+# (left_sentence_fragment_id, right_sentence_fragment_id, confidence)
+Suggestion = namedtuple('Suggestion', ['left', 'right', 'score'])
+
+# Words at the edge of each fragment compared by the fuzzy scorer.
+FUZZY_WINDOW = 12
+# How many more words one side of an overlap may have than the other.
+FUZZY_BAND = 2
+# Overlaps shorter than this score proportionally less.
+FUZZY_MIN_WORDS = 3
+
+# Normalized words, keyed by original text.
+_words_cache = {}
+WORDS_CACHE_SIZE = 10000
+
+
+def normify(text):
+    """Return text without accents, punctuation, case, or extra spaces."""
+    text = unicodedata.normalize('NFKD', text)
+    text = re.sub(ur'[^\w\s:\)-]', u'', text).strip().lower()
+    return re.sub(ur'[ \s]+', u' ', text)
+
+
+def words(text):
+    """Return the normalized words of text."""
+    try:
+        return _words_cache[text]
+    except KeyError:
+        if len(_words_cache) >= WORDS_CACHE_SIZE:
+            _words_cache.clear()
+        result = _words_cache[text] = tuple(normify(text).split(u' '))
+        return result
+
+
+def _prefix_function(tokens):
+    """Return the KMP prefix function of a token sequence."""
+    pi = [0] * len(tokens)
+    k = 0
+    for i in xrange(1, len(tokens)):
+        while k and tokens[i] != tokens[k]:
+            k = pi[k - 1]
+        if tokens[i] == tokens[k]:
+            k += 1
+        pi[i] = k
+    return pi
+
+
+def overlap(left_words, right_words):
+    """Return how many words at the end of left start right, or 0.
+
+    The last left word only has to be the start of its right word, so
+    that a word cut off at the edge of the media still matches.
+    """
+    if not left_words or not right_words:
+        return 0
+    head, last = list(left_words[:-1]), left_words[-1]
+
+    # Matched length of each suffix of head against the start of right,
+    # walking the whole border chain, longest first.
+    sentinel = object()
+    pi = _prefix_function(list(right_words) + [sentinel] + head)
+    matched = pi[-1] if head else 0
+    while True:
+        if matched < len(right_words) and right_words[matched].startswith(last):
+            return matched + 1
+        if not matched:
+            return 0
+        matched = pi[matched - 1]
+
+
+def _char_distance(a, b):
+    """Return the Levenshtein distance between two short strings."""
+    previous = range(len(b) + 1)
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def _word_cost(a, b):
+    """Return the cost of substituting one word for another, from 0 to 1."""
+    if a == b:
+        return 0.0
+    if not a or not b:
+        return 1.0
+    if a.startswith(b) or b.startswith(a):
+        # Cut off at the edge of the media.
+        return 0.5
+    if _char_distance(a, b) <= max(1, min(len(a), len(b)) // 4):
+        # Heard or spelled slightly differently.
+        return 0.5
+    return 1.0
+
+
+def _banded_distance(left_words, right_words, band):
+    """Return the word edit distance between left and a prefix of right.
+
+    Only prefixes of right within `band` words of the length of left, and
+    alignments within `band` of the diagonal, are considered.
+    """
+    rows, columns = len(left_words), min(len(right_words), len(left_words) + band)
+    infinity = float('inf')
+    previous = [float(j) if j <= band else infinity for j in xrange(columns + 1)]
+    for i in xrange(1, rows + 1):
+        current = [float(i) if i <= band else infinity]
+        for j in xrange(1, columns + 1):
+            if abs(i - j) > band:
+                current.append(infinity)
+                continue
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + _word_cost(left_words[i - 1], right_words[j - 1]),
+            ))
+        previous = current
+    return min(previous[max(1, rows - band):] or [infinity])
+
+
+def score(left_words, right_words):
+    """Return confidence, from 0 to 1, that left ends with how right starts.
+
+    Exact overlaps of at least FUZZY_MIN_WORDS words score 1. Otherwise
+    each suffix of the end of left is compared with the start of right by
+    banded edit distance, and the best (matched words / overlap words) wins.
+    """
+    exact = overlap(left_words, right_words)
+    if exact >= FUZZY_MIN_WORDS:
+        return 1.0
+    best = float(exact) / FUZZY_MIN_WORDS
+    tail = left_words[-FUZZY_WINDOW:]
+    head = right_words[:FUZZY_WINDOW + FUZZY_BAND]
+    for length in xrange(1, len(tail) + 1):
+        distance = _banded_distance(tail[-length:], head, FUZZY_BAND)
+        confidence = (length - distance) / max(length, FUZZY_MIN_WORDS)
+        best = max(best, confidence)
+    return best
+
+
+def suggestions(left_sentence_fragments, right_sentence_fragments,
+                threshold=None):
+    """Return scored Suggestions for pairing left and right fragments.
+
+    Every exact overlap is suggested, however short. Fuzzy matches scoring
+    below `threshold` (by default,
+    settings.TRANSCRIPT_STITCH_SUGGESTION_THRESHOLD) are left out.
+    """
+    if threshold is None:
+        threshold = settings.TRANSCRIPT_STITCH_SUGGESTION_THRESHOLD
+    left = [(sf.id, sf.text, words(sf.text)) for sf in left_sentence_fragments]
+    right = [(sf.id, sf.text, words(sf.text)) for sf in right_sentence_fragments]
+
+    result = []
+    for left_id, left_text, left_words in left:
+        for right_id, right_text, right_words in right:
+            if left_text.startswith('[m]') and right_text.startswith('[m]'):
+                # Both start with music; suggest.
+                result.append(Suggestion(left_id, right_id, 1.0))
+                continue
+            confidence = score(left_words, right_words)
+            if (confidence >= threshold
+                or overlap(left_words, right_words)
+                ):
+                result.append(Suggestion(left_id, right_id, confidence))
+    return result
@@ -0,0 +1,590 @@
+"""Apply stitches to a transcript's sentences.
+
+The sentence membership of both fragment revisions is loaded in a constant
+number of queries, rearranged in memory, and the difference is written
+back with bulk inserts and deletes inside one transaction.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django_fsm.db.fields.fsmfield import TransitionNotAllowed
+
+from ... import locks
+from . import availability, dashboard, overlap
+
+
+def _latest_revision_ids(fragment_ids):
+    """Return the id of the latest revision of each fragment."""
+    from .models import TranscriptFragmentRevision
+
+    latest = {}
+    for revision_id, fragment_id, sequence in (
+            TranscriptFragmentRevision.objects.filter(
+                fragment__in=fragment_ids,
+            ).values_list('id', 'fragment', 'sequence')):
+        if sequence > latest.get(fragment_id, (0, None))[0]:
+            latest[fragment_id] = (sequence, revision_id)
+    return [revision_id for _, revision_id in latest.values()]
+
+
+def _through_rows(through, sentence_ids):
+    """Return {(sentence_id, sf_id): row_id} for the given sentences."""
+    return dict(
+        ((sentence_id, sf_id), row_id)
+        for row_id, sentence_id, sf_id in through.objects.filter(
+            sentence__in=sentence_ids,
+        ).values_list('id', 'sentence', 'sentencefragment')
+    )
+
+
+def _sort_keys(sentence_ids):
+    """Return {sentence_id: key} matching the ordering of Sentence."""
+    from .models import Sentence
+
+    return dict(
+        (sentence_id, (start, sequence, sentence_id))
+        for sentence_id, start, sequence
+        in Sentence.objects.filter(id__in=sentence_ids).values_list(
+            'id', 'tf_start__start', 'tf_sequence')
+    )
+
+
+class _Membership(object):
+    """Many-to-many rows between sentences and sentence fragments."""
+
+    def __init__(self, rows):
+        self._members = defaultdict(set)
+        self._sentences = defaultdict(set)
+        for sentence_key, sf_id in rows:
+            self.add(sentence_key, sf_id)
+
+    def add(self, sentence_key, sf_id):
+        self._members[sentence_key].add(sf_id)
+        self._sentences[sf_id].add(sentence_key)
+
+    def remove(self, sentence_key, sf_id):
+        self._members[sentence_key].discard(sf_id)
+        self._sentences[sf_id].discard(sentence_key)
+
+    def members_of(self, sentence_key):
+        return self._members[sentence_key]
+
+    def sentences_of(self, sf_id):
+        return self._sentences[sf_id]
+
+    def rows(self):
+        for sentence_key, sf_ids in self._members.items():
+            for sf_id in sf_ids:
+                yield sentence_key, sf_id
+
+
+class StitchEngine(object):
+    """Sentence membership of the two fragment revisions of a stitch.
+
+    Existing sentences are keyed by id; sentences to be created are keyed
+    by ``('new', sentence_fragment_id)``.
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.stitch = task.stitch
+        self.transcript = task.transcript
+
+    def load(self):
+        from .models import Sentence, SentenceFragment, StitchTask
+
+        left_revision = self.stitch.left.revisions.latest()
+        right_revision = self.stitch.right.revisions.latest()
+        self.right_is_at_end = (self.stitch.right.end == self.transcript.length)
+
+        self.old_pairings = set()
+        if self.task.is_review:
+            # Load prior pairings from previous task.
+            previous_completed_task = StitchTask.objects.filter(
+                state='valid',
+                stitch=self.stitch,
+            ).latest()
+            self.old_pairings = set(
+                previous_completed_task.pairings.values_list('left', 'right'))
+        self.new_pairings = set(
+            self.task.pairings.values_list('left', 'right'))
+
+        paired_ids = set()
+        for pairing in self.old_pairings | self.new_pairings:
+            paired_ids.update(pairing)
+        self.sentence_fragments = dict(
+            (sf.id, sf) for sf in SentenceFragment.objects.filter(
+                Q(revision__in=[left_revision, right_revision])
+                | Q(id__in=paired_ids)
+            ).select_related('revision__fragment')
+        )
+        self.left_sfs = self._revision_sfs(left_revision)
+        self.right_sfs = self._revision_sfs(right_revision)
+
+        # Every sentence touching these fragments, with all of its members.
+        candidate_through = Sentence.fragment_candidates.through
+        committed_through = Sentence.fragments.through
+        sentence_ids = set()
+        for through in [candidate_through, committed_through]:
+            sentence_ids.update(through.objects.filter(
+                sentencefragment__in=list(self.sentence_fragments),
+            ).values_list('sentence', flat=True))
+        self.initial_candidates = _through_rows(candidate_through, sentence_ids)
+        self.initial_committed = _through_rows(committed_through, sentence_ids)
+        self.sort_keys = _sort_keys(sentence_ids)
+        self.states = dict(Sentence.objects.filter(
+            id__in=sentence_ids).values_list('id', 'state'))
+
+        self.candidates = _Membership(self.initial_candidates)
+        self.committed = _Membership(self.initial_committed)
+        self.deleted = set()
+
+    def _revision_sfs(self, revision):
+        return sorted(
+            (sf for sf in self.sentence_fragments.values()
+             if sf.revision_id == revision.id),
+            key=lambda sf: sf.sequence,
+        )
+
+    # --
+
+    def _first(self, sentence_keys):
+        return min(sentence_keys, key=lambda key: self.sort_keys[key])
+
+    def _make_sentence(self, sf):
+        """Put the sentence fragment in a new sentence if it has none."""
+        if (self.candidates.sentences_of(sf.id)
+            or self.committed.sentences_of(sf.id)
+            ):
+            return
+        key = ('new', sf.id)
+        self.sort_keys[key] = (sf.revision.fragment.start, sf.sequence, 0)
+        self.deleted.discard(key)
+        self.candidates.add(key, sf.id)
+
+    def _add_candidate(self, sentence_key, sf_id):
+        # As Sentence.add_candidates, which only allows empty or partial
+        # sentences, and makes them partial.
+        if not isinstance(sentence_key, tuple):
+            state = self.states[sentence_key]
+            if state not in ('empty', 'partial'):
+                raise TransitionNotAllowed(
+                    "Can't add candidates to a {} sentence".format(state))
+            self.states[sentence_key] = 'partial'
+        self.candidates.add(sentence_key, sf_id)
+
+    def _remove_candidate(self, sentence_key, sf_id):
+        self.candidates.remove(sentence_key, sf_id)
+        # Delete orphaned sentences.
+        if (not self.candidates.members_of(sentence_key)
+            and not self.committed.members_of(sentence_key)
+            ):
+            self.deleted.add(sentence_key)
+
+    def apply_pairings(self):
+        """Rearrange sentence candidates according to the pairings."""
+        # Make sure every fragment has a sentence.
+        for sf in self.left_sfs:
+            self._make_sentence(sf)
+        if self.right_is_at_end:
+            # Special case when the right side is the last TranscriptFragment.
+            for sf in self.right_sfs:
+                self._make_sentence(sf)
+
+        # Add new pairings.
+        for left_id, right_id in sorted(self.new_pairings - self.old_pairings):
+            if self.candidates.sentences_of(left_id):
+                sentence = self._first(self.candidates.sentences_of(left_id))
+                self._add_candidate(sentence, right_id)
+            elif self.candidates.sentences_of(right_id):
+                sentence = self._first(self.candidates.sentences_of(right_id))
+                self._add_candidate(sentence, left_id)
+            elif self.committed.sentences_of(left_id):
+                sentence = self._first(self.committed.sentences_of(left_id))
+                self._add_candidate(sentence, right_id)
+            else:
+                sentence = self._first(self.committed.sentences_of(right_id))
+                self._add_candidate(sentence, left_id)
+
+        # Delete removed pairings.
+        for left_id, right_id in sorted(self.old_pairings - self.new_pairings):
+            for sentence in list(self.candidates.sentences_of(left_id)):
+                self._remove_candidate(sentence, right_id)
+            if self.right_is_at_end:
+                for sentence in list(self.candidates.sentences_of(right_id)):
+                    self._remove_candidate(sentence, left_id)
+            # Recreate sentences for orphaned fragments.
+            if not self.candidates.sentences_of(right_id):
+                self._make_sentence(self.sentence_fragments[right_id])
+            if not self.candidates.sentences_of(left_id):
+                self._make_sentence(self.sentence_fragments[left_id])
+
+    def commit_candidates(self):
+        """Commit the candidate sentence fragments of both revisions."""
+        for sf in self.left_sfs + self.right_sfs:
+            for sentence in list(self.candidates.sentences_of(sf.id)):
+                self.candidates.remove(sentence, sf.id)
+                self.committed.add(sentence, sf.id)
+
+    # --
+
+    def save(self):
+        """Write membership changes using bulk queries."""
+        from .models import Sentence
+
+        new_ids = self._create_sentences()
+        deleted_ids = set(
+            key for key in self.deleted if not isinstance(key, tuple))
+
+        def final_rows(membership):
+            return set(
+                (new_ids.get(key, key), sf_id)
+                for key, sf_id in membership.rows()
+                if key not in self.deleted
+            )
+
+        self._write_rows(Sentence.fragment_candidates.through,
+                         self.initial_candidates,
+                         final_rows(self.candidates),
+                         deleted_ids)
+        self._write_rows(Sentence.fragments.through,
+                         self.initial_committed,
+                         final_rows(self.committed),
+                         deleted_ids)
+
+        if deleted_ids:
+            Sentence.objects.delete_uncompleted(deleted_ids)
+
+        made_partial = [
+            key for key, state in self.states.items()
+            if state == 'partial' and key not in deleted_ids]
+        if made_partial:
+            # None can be complete; `_add_candidate` checked.
+            Sentence.objects.filter(
+                id__in=made_partial, state='empty').update(state='partial')
+
+        dashboard.touch(self.transcript.id)
+
+    def _create_sentences(self):
+        """Create new sentences; return {sentence_key: sentence_id}."""
+        from .models import Sentence
+
+        new_keys = set(
+            key for membership in [self.candidates, self.committed]
+            for key, sf_id in membership.rows()
+            if isinstance(key, tuple) and key not in self.deleted
+        )
+        # Only a few per stitch, so create them one at a time for their ids.
+        new_ids = {}
+        for key in sorted(new_keys):
+            sf = self.sentence_fragments[key[1]]
+            new_ids[key] = Sentence.objects.create(
+                transcript=self.transcript,
+                state='partial',
+                tf_start_id=sf.revision.fragment_id,
+                tf_sequence=sf.sequence,
+            ).id
+        return new_ids
+
+    @staticmethod
+    def _write_rows(through, initial, final, deleted_ids):
+        removed_row_ids = [
+            row_id for (sentence_id, sf_id), row_id in initial.items()
+            if (sentence_id, sf_id) not in final
+            and sentence_id not in deleted_ids
+        ]
+        if removed_row_ids:
+            through.objects.filter(id__in=removed_row_ids).delete()
+        added = final - set(initial)
+        if added:
+            through.objects.bulk_create([
+                through(sentence_id=sentence_id, sentencefragment_id=sf_id)
+                for sentence_id, sf_id in sorted(added)
+            ])
+
+
+def process_stitch(task):
+    """Apply a submitted stitch task and advance its stitch."""
+    with availability.deferred(), transaction.atomic():
+        engine = StitchEngine(task)
+        engine.load()
+        engine.apply_pairings()
+
+        if not task.is_review:
+            # First time.
+            engine.save()
+            task.stitch.stitch()
+
+        elif engine.old_pairings == engine.new_pairings:
+            # No changes; commit sentence candidates.
+            engine.commit_candidates()
+            engine.save()
+            task.stitch.review()
+
+        else:
+            # Changes detected; review one more time.
+            engine.save()
+
+        task.validate()
+
+
+# ---------------------
+
+
+class StitchChain(object):
+    """All stitches of a transcript, in order, loaded with one query."""
+
+    def __init__(self, transcript):
+        self.stitches = list(transcript.stitches.order_by('left__start'))
+        self._index_by_left = dict(
+            (stitch.left_id, index) for index, stitch in enumerate(self.stitches))
+        self._index_by_right = dict(
+            (stitch.right_id, index) for index, stitch in enumerate(self.stitches))
+
+    def at_left_of(self, fragment_id):
+        """Return the stitch whose right side is the fragment, if any."""
+        index = self._index_by_right.get(fragment_id)
+        return self.stitches[index] if index is not None else None
+
+    def at_right_of(self, fragment_id):
+        """Return the stitch whose left side is the fragment, if any."""
+        index = self._index_by_left.get(fragment_id)
+        return self.stitches[index] if index is not None else None
+
+    def around(self, fragment_id):
+        """Return the stitches on each side of a fragment, and their neighbors."""
+        stitches = []
+        stitch_at_left = self.at_left_of(fragment_id)
+        if stitch_at_left is not None:
+            stitches.append(stitch_at_left)
+            left_of_left = self.at_left_of(stitch_at_left.left_id)
+            if left_of_left is not None:
+                stitches.append(left_of_left)
+        stitch_at_right = self.at_right_of(fragment_id)
+        if stitch_at_right is not None:
+            stitches.append(stitch_at_right)
+            right_of_right = self.at_right_of(stitch_at_right.right_id)
+            if right_of_right is not None:
+                stitches.append(right_of_right)
+        return stitches
+
+
+def merge_sentences(stitch):
+    """Merge sentences that share a sentence fragment of the stitch.
+
+    A sentence fragment belonging to more than one sentence, or to more
+    than one candidate sentence, joins all of its sentences together.
+    Each group of joined sentences is merged into its first sentence.
+    """
+    from .models import Sentence
+
+    committed_through = Sentence.fragments.through
+    candidate_through = Sentence.fragment_candidates.through
+    revision_ids = _latest_revision_ids([stitch.left_id, stitch.right_id])
+    revision_rows = set()
+    for through in [committed_through, candidate_through]:
+        revision_rows.update(through.objects.filter(
+            sentencefragment__revision__in=revision_ids,
+        ).values_list('sentence', 'sentencefragment'))
+    if not revision_rows:
+        return
+    sentence_ids = set(sentence_id for sentence_id, _ in revision_rows)
+    revision_sf_ids = set(sf_id for _, sf_id in revision_rows)
+    committed = _through_rows(committed_through, sentence_ids)
+    candidates = _through_rows(candidate_through, sentence_ids)
+    sort_keys = _sort_keys(sentence_ids)
+
+    # Union-find over sentences; the first sentence of a group is its root.
+    parent = dict((sentence_id, sentence_id) for sentence_id in sentence_ids)
+
+    def find(sentence_id):
+        root = sentence_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[sentence_id] != root:
+            parent[sentence_id], sentence_id = root, parent[sentence_id]
+        return root
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a != b:
+            if sort_keys[b] < sort_keys[a]:
+                a, b = b, a
+            parent[b] = a
+
+    sentences_of = defaultdict(set)
+    candidate_sentences_of = defaultdict(set)
+    for sentence_id, sf_id in committed:
+        sentences_of[sf_id].add(sentence_id)
+    for sentence_id, sf_id in candidates:
+        candidate_sentences_of[sf_id].add(sentence_id)
+    for sf_id in revision_sf_ids:
+        if len(sentences_of[sf_id]) > 1 or len(candidate_sentences_of[sf_id]) > 1:
+            joined = list(sentences_of[sf_id] | candidate_sentences_of[sf_id])
+            for other in joined[1:]:
+                union(joined[0], other)
+
+    absorbed = set(
+        sentence_id for sentence_id in sentence_ids
+        if find(sentence_id) != sentence_id)
+    if not absorbed:
+        return
+
+    # Move the members of absorbed sentences to their survivors.
+    for through, rows in [(committed_through, committed),
+                          (candidate_through, candidates)]:
+        moved = set(
+            (find(sentence_id), sf_id) for sentence_id, sf_id in rows
+            if sentence_id in absorbed
+        ) - set(rows)
+        if moved:
+            through.objects.bulk_create([
+                through(sentence_id=sentence_id, sentencefragment_id=sf_id)
+                for sentence_id, sf_id in sorted(moved)
+            ])
+
+    # Rows of absorbed sentences are deleted along with them. None is
+    # completed yet, since this stitch touches each and is not reviewed.
+    Sentence.objects.delete_uncompleted(absorbed)
+    dashboard.touch(stitch.transcript_id)
+
+
+def complete_sentences(stitch):
+    """Complete partial sentences around a stitch being reviewed.
+
+    A sentence is completed once it has no candidates left and every
+    stitch touching its fragments, and their neighbors, is reviewed.
+    """
+    from .models import Sentence
+
+    chain = StitchChain(stitch.transcript)
+
+    # Look for partial sentences in both fragments, and in the far side of
+    # adjacent reviewed stitches.
+    fragment_ids = [stitch.left_id, stitch.right_id]
+    stitch_at_left = chain.at_left_of(stitch.left_id)
+    if stitch_at_left is not None and stitch_at_left.state == 'reviewed':
+        fragment_ids.append(stitch_at_left.left_id)
+    stitch_at_right = chain.at_right_of(stitch.right_id)
+    if stitch_at_right is not None and stitch_at_right.state == 'reviewed':
+        fragment_ids.append(stitch_at_right.right_id)
+
+    committed_through = Sentence.fragments.through
+    candidate_through = Sentence.fragment_candidates.through
+    sentence_ids = set(committed_through.objects.filter(
+        sentence__state='partial',
+        sentencefragment__revision__in=_latest_revision_ids(fragment_ids),
+    ).values_list('sentence', flat=True))
+    if not sentence_ids:
+        return
+    # Sentences with candidates are still being worked on.
+    sentence_ids -= set(candidate_through.objects.filter(
+        sentence__in=sentence_ids,
+    ).values_list('sentence', flat=True))
+
+    members = defaultdict(list)
+    for row in committed_through.objects.filter(
+            sentence__in=sentence_ids,
+    ).order_by(
+        'sentencefragment__revision__fragment__start',
+        'sentencefragment__sequence',
+    ).values_list(
+        'sentence',
+        'sentencefragment__text',
+        'sentencefragment__revision__fragment',
+        'sentencefragment__revision__fragment__start',
+        'sentencefragment__revision__fragment__end',
+    ):
+        members[row[0]].append(row[1:])
+
+    completions = []
+    for sentence in Sentence.objects.filter(id__in=sentence_ids):
+        # Ignore the stitch currently being reviewed.
+        must_be_reviewed = set(
+            other for _, fragment_id, _, _ in members[sentence.id]
+            for other in chain.around(fragment_id)
+            if other.id != stitch.id
+        )
+        if all(other.state == 'reviewed' for other in must_be_reviewed):
+            completions.append((
+                sentence,
+                u' '.join(text for text, _, _, _ in members[sentence.id]),
+                min(start for _, _, start, _ in members[sentence.id]),
+                max(end for _, _, _, end in members[sentence.id]),
+            ))
+    Sentence.objects.complete(completions)
+
+
+# ---------------------
+
+
+def system_editor():
+    """Return the user recorded as the editor of automatic changes."""
+    user, created = User.objects.get_or_create(
+        username=settings.TRANSCRIPT_SYSTEM_EDITOR_USERNAME)
+    if created:
+        user.set_unusable_password()
+        user.save()
+    return user
+
+
+def confident_pairings(stitch):
+    """Return pairings for the stitch if every suggestion is confident.
+
+    Returns None when a suggestion falls below
+    settings.TRANSCRIPT_AUTO_STITCH_THRESHOLD, when a sentence fragment is
+    suggested more than once, or when there is nothing to suggest.
+    """
+    suggestions = overlap.suggestions(
+        stitch.left.revisions.latest().sentence_fragments.all(),
+        stitch.right.revisions.latest().sentence_fragments.all(),
+    )
+    if not suggestions:
+        return None
+    if any(suggestion.score < settings.TRANSCRIPT_AUTO_STITCH_THRESHOLD
+           for suggestion in suggestions):
+        return None
+    lefts = set(suggestion.left for suggestion in suggestions)
+    rights = set(suggestion.right for suggestion in suggestions)
+    if len(lefts) != len(suggestions) or len(rights) != len(suggestions):
+        return None
+    return [(suggestion.left, suggestion.right) for suggestion in suggestions]
+
+
+def auto_stitch(stitch):
+    """Stitch and review a stitch as the system editor, if confident.
+
+    Returns True if the stitch was reviewed; otherwise it is left for people.
+    """
+    from .models import StitchTask, StitchTaskPairing
+
+    pairings = confident_pairings(stitch)
+    if pairings is None:
+        return False
+
+    editor = system_editor()
+    for is_review in [False, True]:
+        task = StitchTask.objects.create(
+            transcript=stitch.transcript,
+            is_review=is_review,
+            stitch=stitch,
+        )
+        try:
+            task.lock()
+        except locks.LockException:
+            task.delete()
+            return False
+        task.prepare()
+        task.assign_to(editor)
+        task.present()
+        StitchTaskPairing.objects.bulk_create([
+            StitchTaskPairing(task=task, left_id=left_id, right_id=right_id)
+            for left_id, right_id in pairings
+        ])
+        task.submit(process=False)
+        process_stitch(task)
+    return True
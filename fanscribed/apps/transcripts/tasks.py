@@ -1,21 +1,23 @@
 import logging
 log = logging.getLogger(__name__)
 
+import datetime
 from decimal import Decimal
-from hashlib import sha1
-from shutil import move
+import errno
 import os
-import random
-import time
 from uuid import uuid4
 
 from celery.app import shared_task
 from celery.exceptions import Reject
 from django.conf import settings
 from django.core.files import File
-from unipath import Path
+from django.core.files.base import ContentFile
+from django.utils.timezone import utc
+from django_redis import get_redis_connection
 
-from ..media import avlib, mp3splt
+from ... import locks
+from ..media import avlib, mp3frames
+from ..media.cache import MediaCache
 
 
 # ================================================================
@@ -25,9 +27,6 @@ from ..media import avlib, mp3splt
 
 def _get_task(task_class, pk):
     task = task_class.objects.get(pk=pk)
-    if task.state == 'presented':
-        time.sleep(0.1)  # wait for database to propagate
-        task = task_class.objects.get(pk=pk)
     if task.state != 'submitted':
         raise Reject('Task not in "submitted" state.')
     return task
@@ -39,6 +38,7 @@ def _get_task(task_class, pk):
 @shared_task
 def process_transcribe_task(pk):
 
+    from .equivalence import review_converged
     from .models import TranscribeTask, SentenceFragment
 
     task = _get_task(TranscribeTask, pk)
@@ -65,7 +65,8 @@ def process_transcribe_task(pk):
         # Compare revisions.
         last_revision = task.revision.fragment.revisions.get(
             sequence=task.revision.sequence - 1)
-        if task.revision.text != last_revision.text:
+        if not review_converged(
+                task.transcript, last_revision.text, task.revision.text):
             # They differ;
             # keep at transcribed to allow for further review.
             pass
@@ -82,114 +83,25 @@ def process_transcribe_task(pk):
 @shared_task
 def process_stitch_task(pk):
 
-    from .models import SentenceFragment, StitchTask
+    from .models import StitchTask
+    from .stitching import process_stitch
 
     task = _get_task(StitchTask, pk)
+    process_stitch(task)
 
-    left_fragment_revision = task.stitch.left.revisions.latest()
-    right_fragment_revision = task.stitch.right.revisions.latest()
-
-    old_pairings = set([
-        # (left_sentence_fragment_id, right_sentence_fragment_id),
-    ])
-
-    if task.is_review:
-        # Load prior pairings from previous task.
-        previous_completed_task = StitchTask.objects.filter(
-            state='valid',
-            stitch=task.stitch,
-        ).latest()
-        for previous_pairing in previous_completed_task.pairings.all():
-            old_pairings.add(
-                (previous_pairing.left.id, previous_pairing.right.id))
-
-    # Create new pairings.
-    new_pairings = set([
-        # (left_sentence_fragment_id, right_sentence_fragment_id),
-    ])
-    # Make sure every fragment has a sentence.
-    def _make_sentence(sentence_fragment):
-        if (sentence_fragment.candidate_sentences.count() == 0
-            and sentence_fragment.sentences.count() == 0
-            ):
-            s = task.transcript.sentences.create(
-                tf_start=sentence_fragment.revision.fragment,
-                tf_sequence=sentence_fragment.sequence,
-            )
-            s.add_candidates(sentence_fragment)
-    for sf in left_fragment_revision.sentence_fragments.all():
-        _make_sentence(sf)
-    right_is_at_end = (task.stitch.right.end == task.transcript.length)
-    if right_is_at_end:
-        # Special case when the right side is the last TranscriptFragment.
-        for sf in right_fragment_revision.sentence_fragments.all():
-            _make_sentence(sf)
-
-    for pairing in task.pairings.all():
-        new_pairings.add((pairing.left.id, pairing.right.id))
-
-    # Add new pairings.
-    for left_sf_id, right_sf_id in new_pairings - old_pairings:
-        left_sf = SentenceFragment.objects.get(id=left_sf_id)
-        right_sf = SentenceFragment.objects.get(id=right_sf_id)
-        if left_sf.candidate_sentences.count():
-            left_sf.candidate_sentences.first().add_candidates(right_sf)
-        elif right_sf.candidate_sentences.count():
-            right_sf.candidate_sentences.first().add_candidates(left_sf)
-        elif left_sf.sentences.count():
-            left_sf.sentences.first().add_candidates(right_sf)
-        else:
-            right_sf.sentences.first().add_candidates(left_sf)
-
-    # Delete removed pairings.
-    for left_sf_id, right_sf_id in old_pairings - new_pairings:
-        left_sf = SentenceFragment.objects.get(id=left_sf_id)
-        right_sf = SentenceFragment.objects.get(id=right_sf_id)
-        for sentence in left_sf.candidate_sentences.all():
-            sentence.remove_candidates(right_sf)
-            # Delete orphaned sentences.
-            if (sentence.fragments.count() == 0
-                and sentence.fragment_candidates.count() == 0
-                ):
-                sentence.delete()
-        if right_is_at_end:
-            for sentence in right_sf.candidate_sentences.all():
-                sentence.remove_candidates(left_sf)
-                # Delete orphaned sentences.
-                if (sentence.fragments.count() == 0
-                    and sentence.fragment_candidates.count() == 0
-                ):
-                    sentence.delete()
-        # Recreate sentences for orphaned fragments.
-        if right_sf.candidate_sentences.count() == 0:
-            _make_sentence(right_sf)
-        if left_sf.candidate_sentences.count() == 0:
-            _make_sentence(left_sf)
-
-    fragment_left = task.stitch.left
-    fragment_right = task.stitch.right
-    if not task.is_review:
-        # First time.
-        task.stitch.stitch()
-
-    elif task.is_review and old_pairings == new_pairings:
-        # No changes; commit sentence candidates.
-        for sf in left_fragment_revision.sentence_fragments.all():
-            if sf.revision.fragment == fragment_left:
-                for sentence in sf.candidate_sentences.all():
-                    sentence.commit_candidates(sf)
-        for sf in right_fragment_revision.sentence_fragments.all():
-            if sf.revision.fragment == fragment_right:
-                for sentence in sf.candidate_sentences.all():
-                    sentence.commit_candidates(sf)
-
-        task.stitch.review()
 
-    else:
-        # Changes detected; review one more time.
-        pass
+@shared_task
+def auto_stitch(stitch_pk):
 
-    task.validate()
+    from .models import TranscriptStitch
+    from .stitching import auto_stitch
+
+    stitch = TranscriptStitch.objects.get(pk=stitch_pk)
+    if stitch.state == 'unstitched' and stitch.lock_state == 'unlocked':
+        auto_stitch(stitch)
+    else:
+        log.info('auto_stitch SKIPPED %d: %s, %s',
+                 stitch.pk, stitch.state, stitch.lock_state)
 
 
 # ---------------------
@@ -294,6 +206,51 @@ def process_speaker_task(pk):
     task.validate()
 
 
+# ---------------------
+
+
+@shared_task
+def expire_lapsed_task_leases():
+    """Expire in-progress tasks whose locks were not renewed in time."""
+
+    from .models import TASK_MODEL
+
+    conn = get_redis_connection('default')
+    expired = 0
+    for task_class in TASK_MODEL.values():
+        in_progress = list(task_class.objects.filter(
+            state__in=['assigned', 'presented'],
+        ).select_related(task_class.LEASED_OBJECT))
+        held = locks.holds_model_locks(
+            conn, [task._leased_lock() for task in in_progress])
+        lapsed = [task.pk for task, holds in zip(in_progress, held) if not holds]
+        if lapsed:
+            expired += task_class.objects.expire_all(
+                task_class.objects.filter(pk__in=lapsed))
+    log.info('expire_lapsed_task_leases EXPIRED %d', expired)
+    return expired
+
+
+@shared_task
+def expire_stale_tasks():
+    """Expire tasks presented longer ago than TRANSCRIPT_TASK_MAX_AGE allows."""
+
+    from .models import TASK_MODEL
+
+    utcnow = datetime.datetime.utcnow().replace(tzinfo=utc)
+    expired = {}
+    for task_type, task_class in TASK_MODEL.items():
+        max_age = settings.TRANSCRIPT_TASK_MAX_AGE[task_type]
+        stale = task_class.objects.filter(
+            state='presented',
+            presented_at__lt=utcnow - datetime.timedelta(seconds=max_age),
+        )
+        expired[task_type] = task_class.objects.expire_all(stale)
+    for task_type, count in sorted(expired.items()):
+        log.info('expire_stale_tasks EXPIRED %d %s', count, task_type)
+    return sum(expired.values())
+
+
 # ================================================================
 #                            MEDIA
 # ================================================================
@@ -310,49 +267,19 @@ PROCESSED_MEDIA_AVCONV_SETTINGS = [
     '-f', 'mp2',
 ]
 
-CACHE_PATH = Path(settings.MEDIA_CACHE_PATH).absolute()
-CHUNK_SIZE = 262144
-
-
-def _local_cache_path(fieldfile):
-    """Return local cache path for this media file, fetching as needed."""
-
-    name_hash = sha1(fieldfile.name).hexdigest()
-    if not os.path.exists(CACHE_PATH):
-        os.makedirs(CACHE_PATH)
-    path = CACHE_PATH.child(name_hash)
-
-    # If it's already cached, touch it and use it.
-    if path.exists():
-        log.info('_local_cache_path HIT')
-        with open(path, 'a'):
-            os.utime(path, None)
-        return path
-
-    # Not cached; retrieve and store it.
-    log.info('_local_cache_path MISS')
-
-    # Start out with a temp file, to avoid one process clobbering another.
-    temp_path = '{}_{}'.format(path, random.randint(10000, 99999))
-
-    fieldfile.open()
-    with open(temp_path, 'wb') as out_file, fieldfile as in_file:
-        chunk = in_file.read(CHUNK_SIZE)
-        while chunk != '':
-            out_file.write(chunk)
-            chunk = in_file.read(CHUNK_SIZE)
-
-    move(temp_path, path)
-    log.info('_local_cache_path STORED')
+def _temp_path():
+    temp_dir = getattr(settings, 'TRANSCRIPT_PROCESSING_TEMP_DIR', None)
+    path = os.tempnam(temp_dir)
+    open(path, 'wb').close()
+    os.chmod(path, 0600)
     return path
 
 
-@shared_task
-def create_processed_transcript_media(transcript_media_pk):
+def _create_processed_media(raw_transcript_media):
+    """Return new processed media for raw media, or None if it exists."""
 
     from .models import TranscriptMedia
 
-    raw_transcript_media = TranscriptMedia.objects.get(pk=transcript_media_pk)
     transcript = raw_transcript_media.transcript
 
     # Fail if processed already.
@@ -372,83 +299,304 @@ def create_processed_transcript_media(transcript_media_pk):
         is_full_length=True,
         )
     if TranscriptMedia.objects.filter(**processed_media).exists():
-        return
+        return None
 
-    # Convert raw media to processed audio.
-    raw_path = _local_cache_path(raw_transcript_media.file)
     processed_media = TranscriptMedia.objects.create(
         transcript=transcript,
-        # file will be set below.
+        # file will be set by _finish_processed_media.
         is_processed=True,
         is_full_length=True,
         start=0.00,
-        # end will be set below.
+        # end will be set by _finish_processed_media.
     )
     processed_media.create_file()
+    return processed_media
 
-    temp_dir = getattr(settings, 'TRANSCRIPT_PROCESSING_TEMP_DIR', None)
-    processed_path = os.tempnam(temp_dir)
-    open(processed_path, 'wb').close()
-    os.chmod(processed_path, 0600)
 
-    avlib.convert(raw_path, processed_path, PROCESSED_MEDIA_AVCONV_SETTINGS)
+def _save_frame_index(processed_media, processed_path):
+    index = mp3frames.FrameIndex.from_file(processed_path)
+    frames_filename = '{}.frames'.format(
+        os.path.basename(processed_media.file.name))
+    processed_media.frames.save(
+        frames_filename, ContentFile(index.dumps()), save=False)
+
+
+@shared_task
+def index_processed_media(transcript_media_pk):
+    """Store the frame index of processed media stored without one."""
+
+    from .models import TranscriptMedia
+
+    processed_media = TranscriptMedia.objects.get(pk=transcript_media_pk)
+    if processed_media.frames:
+        return
+    with MediaCache().using(processed_media.file) as processed_path:
+        _save_frame_index(processed_media, processed_path)
+    TranscriptMedia.objects.filter(pk=processed_media.pk).update(
+        frames=processed_media.frames.name)
+
+
+def _finish_processed_media(raw_transcript_media, processed_media,
+                            raw_path, processed_path, raw_length=None):
+    """Store lengths and processed contents, then set up the transcript."""
+
+    from ..outbox.models import OutboxMessage
 
-    # Find length of raw media.
+    transcript = raw_transcript_media.transcript
+
+    # Find length of raw media, unless already known.
     raw_transcript_media.create_file()
-    raw_length = avlib.media_length(raw_path)
+    if raw_length is None:
+        raw_length = avlib.media_length(raw_path)
     raw_transcript_media.start = 0.00
     raw_transcript_media.end = raw_length
     raw_transcript_media.finish()
 
-    # Find length of processed media, and store contents and length.
+    # Find length of processed media, and store contents, length, and
+    # the frame index that task audio is sliced with.
     processed_media.end = avlib.media_length(processed_path)
+    uuid = uuid4().hex
     with open(processed_path, 'rb') as f:
-        uuid = uuid4().hex
         processed_filename = '{transcript.id}_processed_{uuid}.mp3'.format(**locals())
-        processed_media.file.save(processed_filename, File(f))
+        processed_media.file.save(processed_filename, File(f), save=False)
+    _save_frame_index(processed_media, processed_path)
     os.unlink(processed_path)
     processed_media.finish()
 
     # Set transcript's length based on processed media.
     transcript.set_length(processed_media.end)
 
+    if settings.TRANSCRIPT_PERSIST_MEDIA_SLICES:
+        OutboxMessage.objects.enqueue(pregenerate_transcript_media, transcript.id)
+
 
 @shared_task
-def create_transcript_media_file(transcript_media_pk):
+def create_processed_transcript_media(transcript_media_pk):
 
     from .models import TranscriptMedia
 
-    tm = TranscriptMedia.objects.get(pk=transcript_media_pk)
-    assert tm.is_full_length == False, 'Not intended for use on full length media.'
-    assert tm.is_processed == True, 'Not intended for use on raw media.'
-    assert tm.start is not None and tm.end is not None, 'Start and end must be given'
+    raw_transcript_media = TranscriptMedia.objects.get(pk=transcript_media_pk)
+    processed_media = _create_processed_media(raw_transcript_media)
+    if processed_media is None:
+        return
 
-    transcript = tm.transcript
+    # Convert raw media to processed audio, in parallel chunks if long.
+    processed_path = _temp_path()
+    try:
+        with MediaCache().using(raw_transcript_media.file) as raw_path:
+            raw_length = avlib.media_length(raw_path)
+            if raw_length > settings.TRANSCODE_CHUNK_LENGTH:
+                avlib.convert_chunked(
+                    raw_path, processed_path, PROCESSED_MEDIA_AVCONV_SETTINGS,
+                    raw_length, settings.TRANSCODE_CHUNK_LENGTH,
+                    settings.TRANSCODE_PROCESSES)
+            else:
+                returncode = avlib.convert(
+                    raw_path, processed_path, PROCESSED_MEDIA_AVCONV_SETTINGS)
+                if returncode != 0:
+                    raise avlib.MediaConversionError(
+                        'avconv exited with {}'.format(returncode))
+
+            _finish_processed_media(
+                raw_transcript_media, processed_media, raw_path, processed_path,
+                raw_length)
+    except Exception:
+        processed_media.delete()
+        _unlink_temp(processed_path)
+        raise
+
+
+def ingest_transcript_media(raw_transcript_media, raw_filename, chunks):
+    """Save new raw media from an iterable of chunks, processing it as it arrives.
+
+    Each chunk goes both to a local raw file and to avconv, so processed
+    media is ready as soon as the last chunk is. The raw file is then
+    saved to storage and kept in the media cache.
+
+    Processed media is only recorded once converted, so a failed ingest
+    can simply be run again.
+    """
+    raw_path = _temp_path()
+    processed_path = _temp_path()
+    try:
+        _convert_chunks(chunks, raw_path, processed_path)
+        with open(raw_path, 'rb') as f:
+            raw_transcript_media.file.save(raw_filename, File(f))
+    except Exception:
+        _unlink_temp(raw_path, processed_path)
+        raise
+
+    processed_media = _create_processed_media(raw_transcript_media)
+    if processed_media is None:
+        os.unlink(processed_path)
+    else:
+        try:
+            _finish_processed_media(
+                raw_transcript_media, processed_media, raw_path, processed_path)
+        except Exception:
+            processed_media.delete()
+            _unlink_temp(raw_path, processed_path)
+            raise
+    MediaCache().store(raw_transcript_media.file.name, raw_path)
+
+
+def _convert_chunks(chunks, raw_path, processed_path):
+    """Write chunks to raw_path while avconv converts them to processed_path."""
+    converter = avlib.start_convert(processed_path, PROCESSED_MEDIA_AVCONV_SETTINGS)
+    broken_pipe = False
+    try:
+        with open(raw_path, 'wb') as raw_file:
+            for chunk in chunks:
+                raw_file.write(chunk)
+                converter.stdin.write(chunk)
+    except IOError as e:
+        if e.errno != errno.EPIPE:
+            raise
+        # avconv exited early; its exit code tells why.
+        broken_pipe = True
+    finally:
+        try:
+            converter.stdin.close()
+        except IOError as e:
+            if e.errno != errno.EPIPE:
+                raise
+            broken_pipe = True
+        returncode = converter.wait()
+    if returncode != 0 or broken_pipe:
+        raise avlib.MediaConversionError(
+            'avconv exited with {} while reading input'.format(returncode))
+
+
+def _unlink_temp(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _extract_media_files(full_tm, media_list):
+    """Save the file of each TranscriptMedia in one pass over full_tm."""
+    storage = full_tm.file.storage
+    with MediaCache().using(full_tm.file) as full_path:
+        if full_tm.frames:
+            index = mp3frames.stored_frame_index(full_tm.frames)
+        else:
+            # Processed before frame indexes were stored.
+            index = mp3frames.frame_index(full_path)
+        full_file = open(full_path, 'rb')
+    with full_file:
+        for tm in media_list:
+            first_byte, end_byte = index.byte_range(tm.start, tm.end)
+            full_file.seek(first_byte)
+            data = full_file.read(end_byte - first_byte)
+            uuid = uuid4().hex
+            slice_filename = '{tm.transcript_id}_{tm.start}_{tm.end}_slice_{uuid}.mp3'.format(**locals())
+            tm.file.name = storage.save(
+                tm.file.field.generate_filename(tm, slice_filename),
+                ContentFile(data),
+            )
+            tm.finish()
 
-    full_tm = TranscriptMedia.objects.get(
-        transcript=transcript,
-        is_processed=True,
-        is_full_length=True,
-    )
-    assert full_tm.state == 'ready', 'Full-length media must be ready to create partial media.'
 
-    # Extract and save to field.
-    tm.create_file()
+@shared_task
+def pregenerate_transcript_media(transcript_pk):
+    """Create the media of every transcribe and stitch task ahead of time."""
+
+    from .models import Transcript
+
+    transcript = Transcript.objects.get(pk=transcript_pk)
+
+    items = []
+    for start, end in transcript.media_windows():
+        tm, created = transcript.media.get_or_create(
+            is_processed=True,
+            is_full_length=False,
+            start=start,
+            end=end,
+        )
+        if tm.claim_creation():
+            items.append((tm.pk, str(start), str(end)))
 
-    full_path = _local_cache_path(full_tm.file)
+    # Batches are queued in order of assignment, so the earliest are
+    # ready first.
+    batch_size = settings.TRANSCRIPT_MEDIA_BATCH_SIZE
+    for i in xrange(0, len(items), batch_size):
+        try:
+            extract_transcript_media_files.delay(items[i:i + batch_size])
+        except Exception:
+            _release_claims([pk for pk, start, end in items[i:]])
+            raise
+    log.info('pregenerate_transcript_media QUEUED %d', len(items))
 
-    slice_path = os.tempnam()
-    open(slice_path, 'wb').close()
-    os.chmod(slice_path, 0600)
 
-    log.info('create_transcript_media_file EXTRACTING')
-    mp3splt.extract_segment(full_path, slice_path, tm.start, tm.end)
-    with open(slice_path, 'rb') as f:
-        uuid = uuid4().hex
-        slice_filename = '{transcript.id}_{tm.start}_{tm.end}_slice_{uuid}.mp3'.format(**locals())
-        log.info('create_transcript_media_file SAVING')
-        tm.file.save(slice_filename, File(f))
-    os.unlink(slice_path)
+def _release_claims(transcript_media_pks):
+    """Let media claimed for creation, but not created, be claimed again."""
 
-    log.info('create_transcript_media_file FINISHED')
-    tm.finish()
+    from .models import TranscriptMedia
+
+    released = TranscriptMedia.objects.filter(
+        pk__in=transcript_media_pks,
+        state='creating',
+    ).update(state='empty')
+    if released:
+        log.info('media creation RELEASED %d', released)
+
+
+@shared_task
+def extract_transcript_media_files(items):
+    """Create the files of many partial TranscriptMedia at once.
+
+    :param items: List of (transcript_media_pk, start, end), with start
+        and end as strings. Each transcript's full-length media is read
+        once, in order of start.
+    """
+
+    from .models import TranscriptMedia
+
+    items = sorted(items, key=lambda item: (Decimal(item[1]), Decimal(item[2])))
+    media_by_pk = TranscriptMedia.objects.in_bulk([pk for pk, start, end in items])
+
+    try:
+        media_by_transcript = {}
+        utcnow = datetime.datetime.utcnow().replace(tzinfo=utc)
+        for pk, start, end in items:
+            tm = media_by_pk[pk]
+            assert tm.is_full_length == False, 'Not intended for use on full length media.'
+            assert tm.is_processed == True, 'Not intended for use on raw media.'
+            assert tm.start is not None and tm.end is not None, 'Start and end must be given'
+
+            if tm.state == 'ready':
+                continue
+            elif tm.state == 'creating':
+                # Claimed before queueing; report how long it waited.
+                queued = (utcnow - tm.modified).total_seconds()
+                log.info('extract_transcript_media_files QUEUED %.2fs', queued)
+            else:
+                tm.create_file()
+            media_by_transcript.setdefault(tm.transcript_id, []).append(tm)
+
+        for transcript_id, media_list in media_by_transcript.items():
+            full_tm = TranscriptMedia.objects.get(
+                transcript_id=transcript_id,
+                is_processed=True,
+                is_full_length=True,
+            )
+            assert full_tm.state == 'ready', 'Full-length media must be ready to create partial media.'
+
+            log.info('extract_transcript_media_files EXTRACTING %d', len(media_list))
+            _extract_media_files(full_tm, media_list)
+    except Exception:
+        # Those not finished can be claimed by the next request for them.
+        _release_claims([
+            pk for pk, tm in media_by_pk.items() if tm.state != 'ready'])
+        raise
+    log.info('extract_transcript_media_files FINISHED')
+
+
+@shared_task
+def create_transcript_media_file(transcript_media_pk):
+
+    from .models import TranscriptMedia
+
+    tm = TranscriptMedia.objects.get(pk=transcript_media_pk)
+    assert tm.start is not None and tm.end is not None, 'Start and end must be given'
+    extract_transcript_media_files([(tm.pk, str(tm.start), str(tm.end))])
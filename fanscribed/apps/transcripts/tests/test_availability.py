@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test.utils import override_settings
+
+from fanscribed.utils import refresh
+
+from .. import availability
+from .. import models as m
+from .base import BaseTaskTestCase
+
+
+class AvailabilityTestCase(BaseTaskTestCase):
+
+    def test_new_fragments_are_available_for_transcription(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        t = self.transcript
+        self.assertEqual(availability.count(t, 'transcribe', False), 3)
+        self.assertEqual(availability.count(t, 'transcribe', True), 0)
+        self.assertEqual(availability.count(t, 'stitch', False), 0)
+
+    def test_index_follows_fragment_and_stitch_transitions(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        t = self.transcript
+
+        task = self.transcribe(0, u'sentence 1', 1, submit=False)
+        self.assertEqual(availability.count(t, 'transcribe', False), 1)
+        self.submit(task)
+        self.assertEqual(availability.count(t, 'transcribe', False), 1)
+        self.assertEqual(availability.count(t, 'transcribe', True), 1)
+
+        self.transcribe(0, u'sentence 1', 2, is_review=True)
+        self.transcribe_and_review(1, u'sentence 2')
+        self.assertEqual(availability.count(t, 'transcribe', True), 0)
+        self.assertEqual(availability.count(t, 'stitch', False), 1)
+
+    def test_rebuild_matches_incremental_index(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        t = self.transcript
+        self.transcribe_and_review(0, u'sentence 1')
+        self.transcribe(1, u'sentence 2', 1)
+        before = [availability.count(t, task_type, is_review)
+                  for task_type, is_review in sorted(availability.AVAILABLE_WHEN)]
+        availability.rebuild(t)
+        after = [availability.count(t, task_type, is_review)
+                 for task_type, is_review in sorted(availability.AVAILABLE_WHEN)]
+        self.assertEqual(before, after)
+
+    def test_first_available_respects_queryset(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        t = self.transcript
+        first, second, third = self.tfragments
+        queryset = t.fragments.exclude(pk=first.pk)
+        self.assertEqual(
+            availability.first_available(queryset, t, 'transcribe', False),
+            second)
+
+    def test_sentences_are_indexed_in_sentence_order(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        t = self.transcript
+        self.transcribe_and_review(0, u'sentence 1\nsentence 2')
+        self.transcribe_and_review(1, u'sentence 3')
+        self.stitch(0, 1, [])
+        self.review_stitch(0, 1)
+        self.assertEqual(
+            availability.first_available(t.sentences.all(), t, 'clean', False),
+            t.sentences.all()[0])
+        t.sentences.filter(pk=t.sentences.all()[0].pk).update(
+            latest_start=Decimal('9.00'))
+        availability.rebuild(t)
+        self.assertEqual(
+            availability.first_available(t.sentences.all(), t, 'clean', False),
+            t.sentences.all()[0])
+
+    @override_settings(TRANSCRIPTS_REQUIRE_TEAMWORK=True)
+    def test_can_create_applies_teamwork_rules(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe(0, u'sentence 1', 1)
+        tasks = m.TranscribeTask.objects
+        self.assertEqual(availability.count(self.transcript, 'transcribe', True), 1)
+        self.assertFalse(tasks.can_create(self.user, self.transcript, True))
+        other = User.objects.create_user('other', 'other@other.other', 'other')
+        self.assertTrue(tasks.can_create(other, self.transcript, True))
+
+    def test_stale_entries_are_skipped(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        t = self.transcript
+        first, second, third = self.tfragments
+        # Changed without signals, as if by another transaction.
+        m.TranscriptFragment.objects.filter(pk=first.pk).update(lock_state='locked')
+        self.assertEqual(
+            availability.first_available(
+                t.fragments.filter(lock_state='unlocked'), t, 'transcribe', False),
+            second)
+
+    def test_query_when_candidates_are_exhausted(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        t = self.transcript
+        first, second, third = self.tfragments
+        queryset = t.fragments.exclude(pk__in=[first.pk, second.pk])
+        with self.windows(1, 1):
+            self.assertEqual(
+                availability.first_available(queryset, t, 'transcribe', False),
+                third)
+            self.assertNumQueries(
+                2, availability.first_available, queryset, t, 'transcribe', False)
+
+    def test_deferred_updates_follow_the_database(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        t = self.transcript
+        first, second, third = self.tfragments
+
+        def lock(fragment):
+            m.TranscriptFragment.objects.filter(pk=fragment.pk).update(lock_state='locked')
+            availability.update(refresh(fragment))
+
+        self.assertEqual(availability.count(t, 'transcribe', False), 3)
+        try:
+            with availability.deferred(), transaction.atomic():
+                lock(first)
+                self.assertEqual(availability.count(t, 'transcribe', False), 3)
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(availability.count(t, 'transcribe', False), 3)
+
+        with availability.deferred(), transaction.atomic():
+            lock(first)
+        self.assertEqual(availability.count(t, 'transcribe', False), 2)
+
+    @contextmanager
+    def windows(self, size, count):
+        saved = availability.CANDIDATE_WINDOW, availability.MAX_CANDIDATE_WINDOWS
+        availability.CANDIDATE_WINDOW, availability.MAX_CANDIDATE_WINDOWS = size, count
+        try:
+            yield
+        finally:
+            availability.CANDIDATE_WINDOW, availability.MAX_CANDIDATE_WINDOWS = saved
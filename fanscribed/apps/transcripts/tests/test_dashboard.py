@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from ..dashboard import TranscriptDashboard
+from .base import BaseTaskTestCase
+
+
+class TranscriptDashboardTestCase(BaseTaskTestCase):
+
+    def test_counts_match_querysets(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        self.transcribe_and_review(0, u'sentence 1')
+        self.transcribe(1, u'sentence 2', 1, submit=False)
+
+        t = self.transcript
+        data = TranscriptDashboard(t).compute()
+
+        tasks = data['tasks']['transcribe']
+        self.assertEqual(tasks['total'], t.transcribetask_set.count())
+        self.assertEqual(tasks['valid'], t.transcribetask_set.valid().count())
+        self.assertEqual(tasks['presented'], t.transcribetask_set.presented().count())
+        self.assertEqual(data['tasks']['stitch']['total'], 0)
+
+        fragments = data['fragments']
+        self.assertEqual(fragments['total'], 3)
+        self.assertEqual(fragments['reviewed'], 1)
+        self.assertEqual(fragments['empty'], 2)
+        self.assertEqual(fragments['locked'], 1)
+        self.assertEqual(fragments['unlocked'], 2)
+
+        stitches = data['stitches']
+        self.assertEqual(stitches['total'], 2)
+        self.assertEqual(stitches['notready'], 2)
+
+    def test_cached_data_is_refreshed_after_transitions(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        dashboard = TranscriptDashboard(self.transcript)
+        self.assertEqual(dashboard.data()['fragments']['empty'], 2)
+        self.transcribe(0, u'sentence 1', 1)
+        self.assertEqual(dashboard.data()['fragments']['empty'], 1)
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from fanscribed.utils import refresh
+
+from .. import equivalence
+from .base import BaseTaskTestCase
+
+
+class NormalizedEquivalenceTestCase(SimpleTestCase):
+
+    def test_ignores_case_punctuation_and_spacing(self):
+        self.assertTrue(equivalence.normalized(
+            u"It's Sunday,  December 23rd.\nWelcome!",
+            u"its sunday december 23rd\n\nwelcome"))
+
+    def test_line_changes_are_not_equivalent(self):
+        self.assertFalse(equivalence.normalized(
+            u'one sentence\nanother sentence',
+            u'one sentence another sentence'))
+
+    def test_word_changes_are_not_equivalent(self):
+        self.assertFalse(equivalence.normalized(
+            u'they went over there', u'they went over their'))
+
+    def test_small_differences_in_long_lines_are_tolerated(self):
+        line = u'this is a rather long line of transcribed speech ' * 3
+        with self.settings(TRANSCRIPT_REVIEW_TOLERANCE=0.01):
+            self.assertTrue(equivalence.normalized(line, line.replace('rather', 'rathr', 1)))
+        with self.settings(TRANSCRIPT_REVIEW_TOLERANCE=0):
+            self.assertFalse(equivalence.normalized(line, line.replace('rather', 'rathr', 1)))
+
+
+class ReviewConvergenceTestCase(BaseTaskTestCase):
+
+    def test_equivalent_transcribe_review_finishes_and_is_counted(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe(0, u'Hello, there.\nHow are you?', 1)
+        self.transcribe(0, u'hello there\nhow are you', 2, is_review=True)
+
+        self.assertState(refresh(self.tfragments[0]), 'reviewed')
+        self.assertEqual(
+            refresh(self.transcript.progress_counts).review_cycles_saved, 1)
+
+    def test_changed_transcribe_review_needs_another_review(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe(0, u'hello there', 1)
+        self.transcribe(0, u'hello their', 2, is_review=True)
+
+        self.assertState(refresh(self.tfragments[0]), 'transcribed')
+        self.assertEqual(
+            refresh(self.transcript.progress_counts).review_cycles_saved, 0)
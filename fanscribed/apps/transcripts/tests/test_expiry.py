@@ -0,0 +1,115 @@
+import datetime
+from decimal import Decimal
+
+from django.test.utils import override_settings
+from django.utils.timezone import utc
+from django_redis import get_redis_connection
+
+from fanscribed.utils import refresh
+
+from .. import availability
+from .. import models as m
+from ..tasks import expire_stale_tasks
+from .base import BaseTaskTestCase
+
+
+MAX_AGE = dict(transcribe=600, stitch=600, clean=600, boundary=600, speaker=600)
+
+
+@override_settings(TRANSCRIPT_TASK_MAX_AGE=MAX_AGE)
+class ExpireStaleTasksTestCase(BaseTaskTestCase):
+
+    def age(self, task, seconds):
+        presented_at = (datetime.datetime.utcnow().replace(tzinfo=utc)
+                        - datetime.timedelta(seconds=seconds))
+        type(task).objects.filter(pk=task.pk).update(presented_at=presented_at)
+
+    def present_clean(self, sentence, is_review):
+        task = self.transcript.cleantask_set.create(
+            is_review=is_review, sentence=sentence, text=sentence.text)
+        task.lock()
+        task.prepare()
+        task.assign_to(self.user)
+        task.present()
+        return task
+
+    def test_expires_stale_transcribe_tasks(self):
+        self.setup_transcript()
+        stale = self.transcribe(0, '', 1, submit=False)
+        fresh = self.transcribe(1, '', 1, submit=False)
+        self.age(stale, 601)
+        self.age(fresh, 599)
+
+        self.assertEqual(expire_stale_tasks(), 1)
+
+        stale = refresh(stale)
+        self.assertState(stale, 'expired')
+        self.assertIsNone(stale.revision)
+        self.assertFalse(stale.fragment.revisions.exists())
+        fragment = refresh(stale.fragment)
+        self.assertEqual(fragment.lock_state, 'unlocked')
+        self.assertIsNone(fragment.lock_id)
+        self.assertFalse(get_redis_connection('default').exists(fragment._lockname))
+        self.assertEqual(
+            availability.first_available(
+                self.transcript.fragments.all(), self.transcript, 'transcribe', False),
+            fragment)
+        self.assertEqual(refresh(self.transcript.progress_counts).tasks_expired, 1)
+
+        self.assertState(refresh(fresh), 'presented')
+        self.assertEqual(refresh(fresh.fragment).lock_state, 'locked')
+        self.assertEqual(m.existing_transcript_task(self.transcript, self.user), fresh)
+
+    def test_rolled_back_expiry_keeps_locks(self):
+        self.setup_transcript()
+        stale = self.transcribe(0, '', 1, submit=False)
+        self.age(stale, 601)
+        adjust = m.TranscriptProgress.objects.adjust
+
+        def fail(*args, **kwargs):
+            raise RuntimeError()
+        m.TranscriptProgress.objects.adjust = fail
+        try:
+            self.assertRaises(RuntimeError, expire_stale_tasks)
+        finally:
+            m.TranscriptProgress.objects.adjust = adjust
+
+        self.assertState(refresh(stale), 'presented')
+        fragment = refresh(stale.fragment)
+        self.assertEqual(fragment.lock_state, 'locked')
+        self.assertEqual(
+            get_redis_connection('default').get(fragment._lockname), fragment.lock_id)
+        self.assertNotEqual(
+            availability.first_available(
+                self.transcript.fragments.all(), self.transcript, 'transcribe', False),
+            fragment)
+
+    def test_restores_sentence_states(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'sentence 1')
+        self.transcribe_and_review(1, u'sentence 2')
+        self.stitch(0, 1, [])
+        self.review_stitch(0, 1)
+        s0, s1 = self.transcript.sentences.all()
+        self.submit(self.present_clean(s0, is_review=False))
+
+        review = self.present_clean(refresh(s0), is_review=True)
+        edit = self.present_clean(s1, is_review=False)
+        self.assertEqual(refresh(s0).clean_state, 'reviewing')
+        self.assertEqual(refresh(s1).clean_state, 'editing')
+        self.age(review, 601)
+        self.age(edit, 601)
+
+        self.assertEqual(expire_stale_tasks(), 2)
+
+        s0, s1 = refresh(s0), refresh(s1)
+        self.assertEqual(s0.clean_state, 'edited')
+        self.assertEqual(s1.clean_state, 'untouched')
+        self.assertIsNone(s0.clean_lock_id)
+        self.assertIsNone(s1.clean_lock_id)
+        progress = refresh(self.transcript.progress_counts)
+        self.assertEqual(progress.sentences_clean_edited, 1)
+        self.assertEqual(progress.tasks_expired, 2)
+        self.assertEqual(availability.count(self.transcript, 'clean', True), 1)
+        self.assertEqual(availability.count(self.transcript, 'clean', False), 1)
+        self.assertIsNone(m.existing_transcript_task(self.transcript, self.user))
@@ -0,0 +1,41 @@
+from shutil import rmtree
+from subprocess import PIPE, Popen
+from tempfile import mkdtemp
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ...media import avlib
+from .. import models as m
+from ..tasks import ingest_transcript_media
+
+
+def failing_convert(processed_file, avconv_settings):
+    # Exits at once, so writes to it fail with a broken pipe.
+    return Popen(['sh', '-c', 'exit 1'], stdin=PIPE)
+
+
+class IngestTestCase(TestCase):
+
+    def setUp(self):
+        self.media_root = mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.start_convert = avlib.start_convert
+        avlib.start_convert = failing_convert
+        self.transcript = m.Transcript.objects.create(title='test transcript')
+
+    def tearDown(self):
+        avlib.start_convert = self.start_convert
+        self.settings_override.disable()
+        rmtree(self.media_root)
+
+    def test_failed_conversion_records_no_processed_media(self):
+        raw_media = m.TranscriptMedia(
+            transcript=self.transcript,
+            is_processed=False,
+            is_full_length=True,
+        )
+        with self.assertRaises(avlib.MediaConversionError):
+            ingest_transcript_media(raw_media, 'raw.mp3', ['x' * 65536] * 16)
+        self.assertFalse(self.transcript.media.exists())
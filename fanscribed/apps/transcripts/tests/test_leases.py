@@ -0,0 +1,81 @@
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django_redis import get_redis_connection
+
+from fanscribed.utils import refresh
+
+from ..tasks import expire_lapsed_task_leases
+from .base import BaseTaskTestCase
+
+
+LEASES = dict(transcribe=60, stitch=60, clean=60, boundary=60, speaker=60)
+
+
+@override_settings(TRANSCRIPT_TASK_LEASES=LEASES)
+class LeaseTestCase(BaseTaskTestCase):
+
+    def setUp(self):
+        super(LeaseTestCase, self).setUp()
+        self.conn = get_redis_connection('default')
+        self.setup_transcript()
+        self.task = self.transcribe(0, '', 1, submit=False)
+        self.lockname = self.task.fragment._lockname
+
+    def lapse(self):
+        self.conn.delete(self.lockname)
+
+    def test_lock_lasts_for_lease(self):
+        self.assertTrue(self.task.holds_lease())
+        self.assertGreater(self.conn.ttl(self.lockname), 50)
+
+    def test_renew_lease(self):
+        self.conn.expire(self.lockname, 5)
+        self.assertTrue(self.task.renew_lease())
+        self.assertGreater(self.conn.ttl(self.lockname), 50)
+
+        self.lapse()
+        self.assertFalse(self.task.holds_lease())
+        self.assertFalse(self.task.renew_lease())
+
+    def test_reaper_expires_lapsed_tasks(self):
+        other = self.transcribe(1, '', 1, submit=False)
+        self.lapse()
+
+        self.assertEqual(expire_lapsed_task_leases(), 1)
+        self.assertState(refresh(self.task), 'expired')
+        self.assertEqual(refresh(self.task.fragment).lock_state, 'unlocked')
+        self.assertState(refresh(other), 'presented')
+        self.assertEqual(refresh(other.fragment).lock_state, 'locked')
+
+    def test_reaper_expires_tasks_whose_lock_was_taken(self):
+        self.conn.set(self.lockname, 'someone else')
+
+        self.assertEqual(expire_lapsed_task_leases(), 1)
+        self.assertState(refresh(self.task), 'expired')
+
+    def test_heartbeat(self):
+        url = reverse('transcripts:task_heartbeat', kwargs=dict(
+            transcript_pk=self.transcript.id,
+            type=self.task.TASK_TYPE,
+            pk=self.task.id,
+        ))
+        self.client.login(username='user', password='user')
+        self.conn.expire(self.lockname, 5)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.conn.ttl(self.lockname), 50)
+
+        self.lapse()
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 409)
+
+    def test_heartbeat_for_unknown_type(self):
+        url = reverse('transcripts:task_heartbeat', kwargs=dict(
+            transcript_pk=self.transcript.id,
+            type='nonsense',
+            pk=self.task.id,
+        ))
+        self.client.login(username='user', password='user')
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+from django_redis import get_redis_connection
+
+from .... import locks
+
+
+class LockTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.conn = get_redis_connection('default')
+        self.names = ['lock:test:1', 'lock:test:2', 'lock:test:3']
+        self.conn.delete(*self.names)
+        self.addCleanup(self.conn.delete, *self.names)
+
+    def test_acquire_and_release(self):
+        name = self.names[0]
+        self.assertEqual(locks.acquire_lock(self.conn, name, 'a', atime=0), 'a')
+        self.assertFalse(locks.acquire_lock(self.conn, name, 'b', atime=0))
+        self.assertLessEqual(self.conn.pttl(name), 10000)
+
+        self.assertFalse(locks.release_lock(self.conn, name, 'b'))
+        self.assertTrue(locks.release_lock(self.conn, name, 'a'))
+        self.assertFalse(self.conn.exists(name))
+
+    def test_acquire_waits_for_expiry(self):
+        name = self.names[0]
+        locks.acquire_lock(self.conn, name, 'a', ltime=0.05)
+        self.assertEqual(locks.acquire_lock(self.conn, name, 'b', atime=1), 'b')
+
+    def test_renew(self):
+        name = self.names[0]
+        locks.acquire_lock(self.conn, name, 'a', ltime=1)
+        self.assertTrue(locks.renew_lock(self.conn, name, 'a', ltime=60))
+        self.assertGreater(self.conn.pttl(name), 50000)
+        self.assertFalse(locks.renew_lock(self.conn, name, 'b', ltime=60))
+
+    def test_acquire_all_or_none(self):
+        locks.acquire_lock(self.conn, self.names[2], 'a')
+        self.assertFalse(locks.acquire_locks(self.conn, self.names, 'b', atime=0))
+        self.assertFalse(self.conn.exists(self.names[0]))
+
+        locks.release_lock(self.conn, self.names[2], 'a')
+        self.assertEqual(locks.acquire_locks(self.conn, self.names, 'b', atime=0), 'b')
+        self.assertEqual(self.conn.mget(self.names), ['b', 'b', 'b'])
+        self.assertEqual(locks.release_locks(self.conn, self.names, 'b'), 3)
+
+    def test_release_each(self):
+        locks.acquire_lock(self.conn, self.names[0], 'a')
+        locks.acquire_lock(self.conn, self.names[1], 'b')
+        locks.acquire_lock(self.conn, self.names[2], 'c')
+        held = [(self.names[0], 'a'), (self.names[1], 'b'), (self.names[2], 'x')]
+        self.assertEqual(locks.release_each(self.conn, held), 2)
+        self.assertEqual(self.conn.mget(self.names), [None, None, 'c'])
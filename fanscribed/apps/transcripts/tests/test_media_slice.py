@@ -0,0 +1,118 @@
+from decimal import Decimal
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ...media import mp3frames
+from ...media.mp3frames import FrameIndex
+from ...media.tests.base import CONVERTED_NOAGENDA_MEDIA_PATH
+from .. import models as m
+from ..tasks import extract_transcript_media_files
+
+
+class MediaSliceTestCase(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('user', 'user@user.user', 'user')
+        self.client.login(username='user', password='user')
+
+        self.cache_path = mkdtemp()
+        self.media_root = mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_CACHE_PATH=self.cache_path, MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.transcript = m.Transcript.objects.create(
+            title='test transcript', length=Decimal('300.00'))
+        self.full_media = self.transcript.media.create(
+            state='ready',
+            is_processed=True,
+            is_full_length=True,
+            start=Decimal('0.00'),
+            end=Decimal('300.00'),
+        )
+        # Store the processed file and its index as processing would.
+        with open(CONVERTED_NOAGENDA_MEDIA_PATH, 'rb') as f:
+            self.full_media.file.save('full.mp3', File(f), save=False)
+        index = FrameIndex.from_file(CONVERTED_NOAGENDA_MEDIA_PATH)
+        self.full_media.frames.save('full.mp3.frames', ContentFile(index.dumps()))
+
+        self.url = reverse('transcripts:media_slice',
+                           kwargs=dict(pk=self.transcript.id))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        rmtree(self.cache_path)
+        rmtree(self.media_root)
+
+    def get(self, start, end, **headers):
+        return self.client.get(self.url, dict(start=start, end=end), **headers)
+
+    def test_whole_slice(self):
+        response = self.get('66.60', '77.70')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+        data = ''.join(response.streaming_content)
+        self.assertEqual(len(data), int(response['Content-Length']))
+        self.assertAlmostEqual(FrameIndex.from_data(data).duration, 11.1, delta=0.06)
+
+    def test_byte_range(self):
+        whole = ''.join(self.get('66.60', '77.70').streaming_content)
+        response = self.get('66.60', '77.70', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response['Content-Range'], 'bytes 100-199/{}'.format(len(whole)))
+        self.assertEqual(''.join(response.streaming_content), whole[100:200])
+
+    def test_unsatisfiable_range(self):
+        response = self.get('66.60', '77.70', HTTP_RANGE='bytes=999999-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_bad_times(self):
+        self.assertEqual(self.get('77.70', '66.60').status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_media_without_index(self):
+        m.TranscriptMedia.objects.filter(pk=self.full_media.pk).update(frames='')
+        response = self.get('66.60', '77.70')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        # Indexed by a worker (here, right away).
+        self.assertTrue(m.TranscriptMedia.objects.get(pk=self.full_media.pk).frames)
+        self.assertEqual(self.get('66.60', '77.70').status_code, 200)
+
+    def test_persisted_slices_use_stored_index(self):
+        tm = self.transcript.media.create(
+            is_processed=True,
+            is_full_length=False,
+            start=Decimal('66.60'),
+            end=Decimal('77.70'),
+        )
+        from_file = FrameIndex.__dict__['from_file']
+
+        def scan(filename):
+            raise AssertionError('scanned {}'.format(filename))
+        FrameIndex.from_file = staticmethod(scan)
+        mp3frames._index_cache.clear()
+        try:
+            extract_transcript_media_files([(tm.pk, '66.60', '77.70')])
+        finally:
+            FrameIndex.from_file = from_file
+
+        tm = m.TranscriptMedia.objects.get(pk=tm.pk)
+        self.assertEqual(tm.state, 'ready')
+        tm.file.open('rb')
+        try:
+            data = tm.file.read()
+        finally:
+            tm.file.close()
+        self.assertAlmostEqual(FrameIndex.from_data(data).duration, 11.1, delta=0.06)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+from django.test import SimpleTestCase
+
+from .. import overlap
+
+
+def brute_force_overlaps(left_text, right_text):
+    """The original suffix-by-suffix comparison."""
+    left_words = overlap.normify(left_text).split(' ')
+    right_norm = overlap.normify(right_text)
+    for i in range(len(left_words)):
+        if right_norm.startswith(' '.join(left_words[i:])):
+            return True
+    return False
+
+
+class OverlapTestCase(SimpleTestCase):
+
+    def test_normify(self):
+        self.assertEqual(overlap.normify(u'  Café, au   LAIT!  '), u'cafe au lait')
+
+    def test_overlap_counts_words(self):
+        self.assertEqual(
+            overlap.overlap(overlap.words(u'and then we went to the'),
+                            overlap.words(u'We went to the store.')),
+            4)
+        self.assertEqual(
+            overlap.overlap(overlap.words(u'one two'),
+                            overlap.words(u'three four')),
+            0)
+
+    def test_last_word_may_be_cut_off(self):
+        self.assertEqual(
+            overlap.overlap(overlap.words(u'we went to the sto'),
+                            overlap.words(u'the store was closed')),
+            2)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        vocabulary = [u'a', u'an', u'and', u'the', u'then', u'to', u'']
+        for _ in range(2000):
+            left = u' '.join(rng.choice(vocabulary)
+                             for _ in range(rng.randint(0, 6)))
+            right = u' '.join(rng.choice(vocabulary)
+                              for _ in range(rng.randint(0, 6)))
+            self.assertEqual(
+                bool(overlap.overlap(overlap.words(left), overlap.words(right))),
+                brute_force_overlaps(left, right),
+                (left, right))
+
+
+class FuzzyScoreTestCase(SimpleTestCase):
+
+    def score(self, left, right):
+        return overlap.score(overlap.words(left), overlap.words(right))
+
+    def test_exact_overlaps_score_by_length(self):
+        self.assertEqual(self.score(u'we went to the', u'went to the store'), 1.0)
+        self.assertAlmostEqual(self.score(u'it was the', u'the end'), 1.0 / 3)
+        self.assertEqual(self.score(u'one two', u'three four'), 0.0)
+
+    def test_misheard_words_still_score(self):
+        exact = self.score(u'media assassination episode',
+                           u'media assassination episode 472')
+        misheard = self.score(u'media assasination episode',
+                              u'media assassination episodes 472')
+        inserted = self.score(u'media assassination episode',
+                              u'media uh assassination episode 472')
+        self.assertEqual(exact, 1.0)
+        self.assertTrue(0.6 <= misheard < exact, misheard)
+        self.assertTrue(0.6 <= inserted < exact, inserted)
+
+
+class SentenceFragment(object):
+
+    def __init__(self, id, text):
+        self.id = id
+        self.text = text
+
+
+# (left fragment lines, right fragment lines, expected (left, right) pairs),
+# from test_task_stitch, followed by versions with the overlaps misheard.
+SUGGESTION_FIXTURES = [
+    (
+        [u'stellar, stellar', u':)', u'[m] adam curry, john c. dvorak',
+         u"it's sunday december"],
+        [u'[m] john c. dvorak', u"it's sunday december 23rd 2012",
+         u'time for your gitmo nation media assassination episode'],
+        [(2, 0), (3, 1)],
+    ),
+    (
+        [u'[m] john c. dvorak', u"it's sunday december 23rd 2012",
+         u'time for your gitmo nation media assassination episode'],
+        [u'assassination episode 472', u'[m] this is no agenda',
+         u'welcome to the'],
+        [(0, 1), (2, 0)],
+    ),
+    (
+        [u'stellar, stellar', u':)', u'[m] adam curry, john c. dvorak',
+         u"it's sunday december"],
+        [u'[m] john c. dvorak', u'its sunday decembr 23rd 2012',
+         u'time for your gitmo nation media assassination episode'],
+        [(2, 0), (3, 1)],
+    ),
+    (
+        [u'[m] john c. dvorak', u"it's sunday december 23rd 2012",
+         u'time for your gitmo nation media assassination episode'],
+        [u'media assasination episode 472', u'[m] this is no agenda',
+         u'welcome to the'],
+        [(0, 1), (2, 0)],
+    ),
+]
+
+
+class SuggestionBenchmarkTestCase(SimpleTestCase):
+
+    def test_short_exact_overlaps_are_suggested(self):
+        def suggested(left_text, right_text):
+            return overlap.suggestions(
+                [SentenceFragment(1, left_text)], [SentenceFragment(2, right_text)])
+        with self.settings(TRANSCRIPT_STITCH_SUGGESTION_THRESHOLD=0.6):
+            # One word, and one cut off at the edge of the media.
+            for left_text, right_text in [(u'and so', u'so what'),
+                                          (u'we went to the sto', u'store was closed')]:
+                suggestions = suggested(left_text, right_text)
+                self.assertEqual([(s.left, s.right) for s in suggestions], [(1, 2)])
+                self.assertAlmostEqual(suggestions[0].score, 1.0 / 3)
+            self.assertEqual(suggested(u'one two', u'three four'), [])
+
+    def evaluate(self, suggest):
+        """Return (true positives, false positives, false negatives)."""
+        tp = fp = fn = 0
+        for left_lines, right_lines, expected in SUGGESTION_FIXTURES:
+            left = [SentenceFragment(n, text) for n, text in enumerate(left_lines)]
+            right = [SentenceFragment(n, text) for n, text in enumerate(right_lines)]
+            suggested = set(suggest(left, right))
+            tp += len(suggested & set(expected))
+            fp += len(suggested - set(expected))
+            fn += len(set(expected) - suggested)
+        return tp, fp, fn
+
+    def test_fuzzy_suggestions_find_every_fixture_pair(self):
+        def suggest(left, right):
+            return [(s.left, s.right) for s in overlap.suggestions(left, right)]
+        with self.settings(TRANSCRIPT_STITCH_SUGGESTION_THRESHOLD=0.6):
+            self.assertEqual(self.evaluate(suggest), (8, 0, 0))
+
+    def test_exact_overlap_misses_misheard_pairs(self):
+        def suggest(left, right):
+            return [
+                (L.id, R.id) for L in left for R in right
+                if (L.text.startswith('[m]') and R.text.startswith('[m]'))
+                or overlap.overlap(overlap.words(L.text), overlap.words(R.text))
+            ]
+        tp, fp, fn = self.evaluate(suggest)
+        self.assertEqual((tp, fn), (6, 2))
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from fanscribed.utils import refresh
+
+from .. import models as m
+from .base import BaseTaskTestCase
+
+
+COUNTER_NAMES = [
+    field.name for field in m.TranscriptProgress._meta.fields
+    if field.name not in ('id', 'transcript')
+]
+
+
+class TranscriptProgressTestCase(BaseTaskTestCase):
+
+    def assertCountersMatchRebuild(self):
+        progress = refresh(self.transcript.progress_counts)
+        counted = [getattr(progress, name) for name in COUNTER_NAMES]
+        progress.rebuild()
+        rebuilt = [getattr(progress, name) for name in COUNTER_NAMES]
+        self.assertEqual(dict(zip(COUNTER_NAMES, counted)),
+                         dict(zip(COUNTER_NAMES, rebuilt)))
+
+    def test_counters_follow_transcription_and_stitching(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        progress = self.transcript.progress_counts
+        self.assertEqual(progress.fragments_total, 3)
+        self.assertEqual(progress.stitches_total, 2)
+
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe(1, u'B2\nC', 1)
+        self.assertCountersMatchRebuild()
+
+        self.transcribe(1, u'B2\nC', 2, is_review=True)
+        self.transcribe_and_review(2, u'D')
+        self.stitch(0, 1, [(1, 0)])
+        self.assertCountersMatchRebuild()
+
+        self.review_stitch(0, 1)
+        self.stitch(1, 2, [])
+        self.review_stitch(1, 2)
+        self.assertCountersMatchRebuild()
+
+        stats = refresh(self.transcript).stats
+        self.assertEqual(stats['transcribe'], 100)
+        self.assertEqual(stats['stitch'], 100)
+        self.assertEqual(stats['clean'], 0)
+
+    def test_counters_follow_sentence_task_states(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'sentence 1')
+        self.transcribe_and_review(1, u'sentence 2')
+        self.stitch(0, 1, [])
+        self.review_stitch(0, 1)
+
+        s0 = self.transcript.sentences.all()[0]
+        task = self.transcript.cleantask_set.create(
+            is_review=False, sentence=s0, text=s0.text)
+        task.lock()
+        task.prepare()
+        task.assign_to(self.user)
+        task.present()
+        self.assertCountersMatchRebuild()
+        self.submit(task)
+        self.assertCountersMatchRebuild()
+        self.assertEqual(
+            refresh(self.transcript.progress_counts).sentences_clean_edited, 1)
@@ -4,6 +4,7 @@ from django.contrib.auth.models import Group, Permission, User
 from django.test import TestCase
 
 from ....utils import refresh
+from .. import availability
 from .. import models as m
 
 
@@ -97,3 +98,28 @@ class RequireTeamworkTestCase(TestCase):
             # user1 can review user2's review.
             task3b = m.assign_next_transcript_task(t, u1, 'transcribe_review')
             self.assertEqual(task1.fragment, task3b.fragment)
+
+    def test_assignment_reads_index_once_per_type(self):
+        t = self.transcript
+        u1, u2 = self.users
+        first_available = availability.first_available
+        calls = []
+
+        def counting(*args, **kwargs):
+            calls.append(args[2:])
+            return first_available(*args, **kwargs)
+        availability.first_available = counting
+        try:
+            with self._settings():
+                task1 = m.assign_next_transcript_task(t, u1, 'transcribe')
+                self._submitted_transcribe_task(task1, 'text1')
+                del calls[:]
+                self.assertIsNone(
+                    m.assign_next_transcript_task(t, u1, 'transcribe_review'))
+                self.assertEqual(calls, [('transcribe', True)])
+                del calls[:]
+                self.assertIsNotNone(
+                    m.assign_next_transcript_task(t, u2, 'transcribe_review'))
+                self.assertEqual(calls, [('transcribe', True)])
+        finally:
+            availability.first_available = first_available
@@ -0,0 +1,217 @@
+from decimal import Decimal
+
+from celery import current_app
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django_fsm.db.fields.fsmfield import TransitionNotAllowed
+from waffle.models import Switch
+
+from fanscribed.utils import refresh
+
+from ...outbox.models import OutboxMessage
+from ..stitching import StitchEngine, merge_sentences, system_editor
+from ..tasks import auto_stitch
+from .base import BaseTaskTestCase
+
+
+class StitchEngineTestCase(BaseTaskTestCase):
+
+    def count_engine_queries(self, task):
+        """Return the number of queries, and of sentences created."""
+        engine = StitchEngine(task)
+        sentences = self.transcript.sentences.count()
+        with CaptureQueriesContext(connection) as queries:
+            engine.load()
+            engine.apply_pairings()
+            engine.save()
+        return len(queries), self.transcript.sentences.count() - sentences
+
+    def count_create_queries(self):
+        """Return the number of queries it takes to create one sentence."""
+        fragment = self.tfragments[2]
+        with CaptureQueriesContext(connection) as queries:
+            self.transcript.sentences.create(
+                state='partial', tf_start=fragment, tf_sequence=1)
+        return len(queries)
+
+    def test_query_count_grows_only_with_sentences_created(self):
+        self.setup_transcript(Decimal('15.00'), 3)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        few, few_created = self.count_engine_queries(
+            self.stitch(0, 1, [(1, 0)], submit=False))
+
+        self.setup_transcript(Decimal('15.00'), 3)
+        self.transcribe_and_review(
+            0, u'\n'.join(u'sentence {}'.format(n) for n in range(20)))
+        self.transcribe_and_review(
+            1, u'\n'.join(u'sentence {}'.format(n) for n in range(20, 40)))
+        many, many_created = self.count_engine_queries(
+            self.stitch(0, 1, [(19, 0)], submit=False))
+
+        self.assertEqual(
+            many - few,
+            (many_created - few_created) * self.count_create_queries())
+
+    def test_cannot_add_candidates_to_completed_sentence(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        self.stitch(0, 1, [])
+        self.review_stitch(0, 1)
+        self.assertState(self.transcript.sentences.all()[1], 'completed')
+
+        # A later review pairs B1 with B2 after all.
+        engine = StitchEngine(self.stitch(0, 1, [(1, 0)], submit=False))
+        engine.load()
+        with self.assertRaises(TransitionNotAllowed):
+            engine.apply_pairings()
+
+    def test_removed_pairing_recreates_sentence(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        self.stitch(0, 1, [(1, 0)])
+        self.check_sentences([
+            (u'partial', [u'A'], []),
+            (u'partial', [u'B1', u'B2'], []),
+            (u'partial', [u'C'], []),
+        ])
+
+        self.review_stitch(0, 1, alter=[])
+        self.check_sentences([
+            (u'partial', [u'A'], []),
+            (u'partial', [u'B1'], []),
+            (u'partial', [u'B2'], []),
+            (u'partial', [u'C'], []),
+        ])
+
+    def test_completed_sentences_get_text_and_bounds(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        self.stitch(0, 1, [(1, 0)])
+        self.review_stitch(0, 1)
+
+        sentences = list(self.transcript.sentences.completed())
+        self.assertEqual(
+            [(s.latest_text, s.latest_start, s.latest_end) for s in sentences],
+            [
+                (u'A', Decimal('0.00'), Decimal('5.00')),
+                (u'B1 B2', Decimal('0.00'), Decimal('10.00')),
+                (u'C', Decimal('5.00'), Decimal('10.00')),
+            ])
+        self.assertEqual(
+            [s.revisions.get().text for s in sentences],
+            [u'A', u'B1 B2', u'C'])
+
+    def test_merge_sentences_sharing_a_fragment(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        left = self.tfragments[0].revisions.latest().sentence_fragments.all()
+        right = self.tfragments[1].revisions.latest().sentence_fragments.all()
+
+        first = self.transcript.sentences.create(
+            tf_start=self.tfragments[0], tf_sequence=2)
+        first.add_candidates(left[1], right[0])
+        second = self.transcript.sentences.create(
+            tf_start=self.tfragments[1], tf_sequence=1)
+        second.add_candidates(right[0], right[1])
+
+        merge_sentences(self.transcript.stitches.get())
+        self.check_sentences([
+            (u'partial', [u'B1', u'B2', u'C'], []),
+        ])
+
+    def test_merge_query_count_is_fixed(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'A\nB1')
+        self.transcribe_and_review(1, u'B2\nC')
+        left = self.tfragments[0].revisions.latest().sentence_fragments.all()
+        right = self.tfragments[1].revisions.latest().sentence_fragments.all()
+
+        first = self.transcript.sentences.create(
+            tf_start=self.tfragments[0], tf_sequence=2)
+        first.add_candidates(left[1], right[0])
+        for sequence, candidates in [(1, [right[0]]), (1, right[:2])]:
+            sentence = self.transcript.sentences.create(
+                tf_start=self.tfragments[1], tf_sequence=sequence)
+            sentence.add_candidates(*candidates)
+        total = refresh(self.transcript.progress_counts).sentences_total
+
+        # Two sentences are absorbed, in as many queries as one would be.
+        with self.assertNumQueries(15):
+            merge_sentences(self.transcript.stitches.get())
+        self.check_sentences([
+            (u'partial', [u'B1', u'B2', u'C'], []),
+        ])
+        self.assertEqual(
+            refresh(self.transcript.progress_counts).sentences_total, total - 2)
+
+
+class AutoStitchTestCase(BaseTaskTestCase):
+
+    def setUp(self):
+        super(AutoStitchTestCase, self).setUp()
+        Switch.objects.create(name='auto_stitch', active=True)
+
+    def setup_auto_stitched_transcript(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcript.auto_stitch = True
+        self.transcript.save()
+
+    def test_confident_stitch_is_reviewed_without_people(self):
+        self.setup_auto_stitched_transcript()
+        self.transcribe_and_review(0, u'hello there\nthis is the start of a')
+        self.transcribe_and_review(1, u'start of a long sentence\ngoodbye')
+
+        stitch = refresh(self.tstitches[0])
+        self.assertState(stitch, 'reviewed')
+        self.assertEqual(stitch.last_editor, system_editor())
+        self.check_sentences([
+            (u'completed', [], [u'hello there']),
+            (u'completed', [],
+             [u'this is the start of a', u'start of a long sentence']),
+            (u'completed', [], [u'goodbye']),
+        ])
+
+    def test_unsure_stitch_is_left_for_people(self):
+        self.setup_auto_stitched_transcript()
+        self.transcribe_and_review(0, u'hello there\nit was the')
+        self.transcribe_and_review(1, u'the end')
+
+        self.assertState(refresh(self.tstitches[0]), 'unstitched')
+        self.assertFalse(self.transcript.stitchtask_set.exists())
+
+    def test_transcripts_are_not_auto_stitched_by_default(self):
+        self.setup_transcript(Decimal('10.00'), 2)
+        self.transcribe_and_review(0, u'this is the start of a')
+        self.transcribe_and_review(1, u'start of a long sentence')
+
+        self.assertState(refresh(self.tstitches[0]), 'unstitched')
+
+    def test_auto_stitch_is_queued_with_the_transaction(self):
+        self.setup_auto_stitched_transcript()
+        self.transcribe_and_review(0, u'this is the start of a')
+        self.transcribe(1, u'start of a long sentence', 1)
+        stitch = self.tstitches[0]
+        eager = current_app.conf.CELERY_ALWAYS_EAGER
+        current_app.conf.CELERY_ALWAYS_EAGER = False
+        try:
+            try:
+                with transaction.atomic():
+                    # Readies the stitch.
+                    refresh(self.tfragments[1]).review()
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+            self.assertFalse(OutboxMessage.objects.exists())
+
+            refresh(self.tfragments[1]).review()
+            self.assertState(refresh(stitch), 'unstitched')
+            self.assertEqual(
+                list(OutboxMessage.objects.values_list('task_name', 'object_pk')),
+                [(auto_stitch.name, stitch.pk)])
+        finally:
+            current_app.conf.CELERY_ALWAYS_EAGER = eager
@@ -0,0 +1,72 @@
+import datetime
+import json
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django.utils.timezone import utc
+
+from fanscribed.utils import refresh
+
+from .. import models as m
+from .base import BaseTaskTestCase
+
+
+class TaskAudioTestCase(BaseTaskTestCase):
+
+    def setUp(self):
+        super(TaskAudioTestCase, self).setUp()
+        self.setup_transcript()
+        self.task = self.transcribe(0, '', 1, submit=False)
+        self.task.media = self.transcript.media.create(
+            is_processed=True,
+            is_full_length=False,
+            start=self.task.start,
+            end=self.task.end,
+        )
+        self.task.media_start = self.task.start
+        self.task.media_end = self.task.end
+        self.task.save()
+        self.url = reverse('transcripts:task_audio', kwargs=dict(
+            transcript_pk=self.transcript.id,
+            type=self.task.TASK_TYPE,
+            pk=self.task.id,
+        ))
+        self.client.login(username='user', password='user')
+
+    def test_redirects_to_slice(self):
+        response = self.client.get(self.url)
+        slice_url = reverse('transcripts:media_slice',
+                            kwargs=dict(pk=self.transcript.id))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(slice_url, response['Location'])
+        self.assertIn('start=0.00', response['Location'])
+        self.assertIn('end=5.00', response['Location'])
+
+    @override_settings(TRANSCRIPT_PERSIST_MEDIA_SLICES=True,
+                       TRANSCRIPT_MEDIA_FILE_WAIT=0)
+    def test_pending_slice_file(self):
+        media = self.task.media
+        # Another request has already queued the file.
+        m.TranscriptMedia.objects.filter(pk=media.pk).update(state='creating')
+        self.assertIsNone(refresh(media).create_file_task())
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response['Location'].endswith(self.url))
+        status = json.loads(response.content)
+        self.assertEqual(status['state'], 'creating')
+        self.assertEqual(status['status_url'], self.url)
+        self.assertGreaterEqual(status['queued_seconds'], 0)
+
+    @override_settings(TRANSCRIPT_MEDIA_CREATION_TIMEOUT=600)
+    def test_stale_creation_is_claimed_again(self):
+        media = self.task.media
+        self.assertTrue(media.claim_creation())
+        self.assertFalse(media.claim_creation())
+
+        # The worker creating it was lost.
+        modified = (datetime.datetime.utcnow().replace(tzinfo=utc)
+                    - datetime.timedelta(seconds=601))
+        m.TranscriptMedia.objects.filter(pk=media.pk).update(modified=modified)
+        self.assertTrue(media.claim_creation())
+        self.assertEqual(refresh(media).state, 'creating')
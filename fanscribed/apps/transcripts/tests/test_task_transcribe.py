@@ -37,8 +37,10 @@ class TranscribeTaskTestCase(TestCase):
             is_review=False,
         )
 
-        self.assertEqual(task.media.start, Decimal('0.00'))
-        self.assertEqual(task.media.end, Decimal('6.50'))
+        self.assertEqual(task.media_start, Decimal('0.00'))
+        self.assertEqual(task.media_end, Decimal('6.50'))
+        # Streamed from the full media, so no slice is kept.
+        self.assertIsNone(task.media)
 
     def test_valid_task(self):
         task = self._submitted_task(
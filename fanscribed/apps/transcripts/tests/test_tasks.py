@@ -1,5 +1,9 @@
+from django.test.utils import override_settings
+
 from fanscribed.utils import refresh
 
+from .. import models as m
+from ..tasks import extract_transcript_media_files
 from .base import BaseTaskTestCase
 
 
@@ -137,3 +141,28 @@ class TaskTestCase(BaseTaskTestCase):
 
         self.transcript = refresh(self.transcript)
         self.assertState(self.transcript, 'finished')
+
+    @override_settings(TESTING=False)
+    def test_submitted_task_is_processed_once_saved(self):
+        self.setup_transcript('10.00', 2)
+        task = self.transcribe(0, 'sentence 1', 1, submit=False)
+        # Processed eagerly; it would be rejected if still presented.
+        task.submit()
+        self.assertState(refresh(task), 'valid')
+        self.assertState(refresh(task.fragment), 'transcribed')
+
+    def test_failed_extraction_releases_claimed_media(self):
+        self.setup_transcript()
+        tm = self.transcript.media.create(
+            is_processed=True,
+            is_full_length=False,
+            start='0.00',
+            end='5.00',
+        )
+        self.assertTrue(tm.claim_creation())
+
+        # There is no full-length media to extract from.
+        with self.assertRaises(m.TranscriptMedia.DoesNotExist):
+            extract_transcript_media_files([(tm.pk, '0.00', '5.00')])
+        self.assertState(refresh(tm), 'empty')
+        self.assertTrue(tm.claim_creation())
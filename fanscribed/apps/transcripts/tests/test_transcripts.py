@@ -53,6 +53,18 @@ class TranscriptsTestCase(TestCase):
         self.assertEqual(s1.right, f2)
         self.assertEqual(s1.state, 'notready')
 
+    def test_media_windows_in_order_of_assignment(self):
+        t = Transcript.objects.create(title='test')
+        t.set_length('15.00')
+        D = Decimal
+        self.assertEqual(t.media_windows(), [
+            (D('0.00'), D('6.50')),     # fragment 0
+            (D('3.50'), D('11.50')),    # fragment 1
+            (D('0.00'), D('11.50')),    # stitch 0-1
+            (D('8.50'), D('15.00')),    # fragment 2
+            (D('3.50'), D('15.00')),    # stitch 1-2
+        ])
+
 
 if os.environ.get('FAST_TEST') != '1':
 
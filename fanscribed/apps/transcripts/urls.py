@@ -29,6 +29,16 @@ urlpatterns = patterns(
         view=views.TaskAudioView.as_view(),
         kwargs=LOGGED_IN_USER),
 
+    url(r'^(?P<transcript_pk>\d+)/tasks/(?P<type>\w+)/(?P<pk>\d+)/heartbeat/$',
+        name='task_heartbeat',
+        view=views.TaskHeartbeatView.as_view(),
+        kwargs=LOGGED_IN_USER),
+
+    url(r'^(?P<pk>\d+)/audio/$',
+        name='media_slice',
+        view=views.MediaSliceView.as_view(),
+        kwargs=LOGGED_IN_USER),
+
     url(r'^(?P<pk>\d+)/tasks/assign/$',
         name='task_assign',
         view=views.TaskAssignView.as_view(),
@@ -1,17 +1,28 @@
-from decimal import Decimal
+import datetime
+from decimal import Decimal, InvalidOperation
 import json
+import time
 
+from django.conf import settings
 from django.contrib import messages
 from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect,
+    JsonResponse)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
 from django.utils.text import slugify
+from django.utils.timezone import utc
 import vanilla
 from waffle import flag_is_active
 
 from ...utils import refresh
+from ..media import mp3frames
+from ..media.ranges import stored_range_response
 from . import forms as f
 from . import models as m
+from .dashboard import TranscriptDashboard
 
 # -----------------------------
 
@@ -38,6 +49,8 @@ class TranscriptDetailView(vanilla.DetailView):
                 in transcript.completed_sentences.values('id', 'latest_start', 'latest_end')
             )
         )
+        if self.request.user.is_staff and 'stats' in self.request.GET:
+            data['dashboard'] = TranscriptDashboard(transcript).data()
         return data
 
 
@@ -176,28 +189,115 @@ class TaskAudioView(vanilla.DetailView):
             start = max(start, Decimal(0))
             end = min(end, task.transcript.length)
 
-            # Get or create a new media object.
-            media, created = task.transcript.media.get_or_create(
-                is_processed=True,
-                is_full_length=False,
-                start=start,
-                end=end,
-            )
-            task.media = media
-
             # Update the task in case the page is reloaded.
             task.start = start
             task.end = end
+            fields = type(task).objects.media_fields(task.transcript, start, end)
+            for name, value in fields.items():
+                setattr(task, name, value)
 
             task.save()
         else:
-            media = task.media
+            start, end = task.media_start, task.media_end
 
+        if not settings.TRANSCRIPT_PERSIST_MEDIA_SLICES:
+            url = reverse('transcripts:media_slice',
+                          kwargs=dict(pk=task.transcript.id))
+            query = urlencode(dict(start=start, end=end))
+            return HttpResponseRedirect('{url}?{query}'.format(**locals()))
+
+        media = task.media
         if not media.file:
-            result = media.create_file_task()
-            # Wait for it before continuing.
-            result.get()
-            media = refresh(media)
+            media.create_file_task()
+            media = self._wait_for_file(media)
+            if not media.file:
+                return self._pending_response(media)
 
         media.record_download()
         return HttpResponseRedirect(media.file.url)
+
+    def _wait_for_file(self, media):
+        """Poll briefly for the media's file, returning the latest media."""
+        deadline = time.time() + settings.TRANSCRIPT_MEDIA_FILE_WAIT
+        media = refresh(media)
+        while not media.file and time.time() < deadline:
+            time.sleep(settings.TRANSCRIPT_MEDIA_FILE_POLL_INTERVAL)
+            media = refresh(media)
+        return media
+
+    def _pending_response(self, media):
+        """Tell the client to come back to this URL once the file is ready."""
+        utcnow = datetime.datetime.utcnow().replace(tzinfo=utc)
+        queued = (utcnow - media.modified).total_seconds()
+        # Start and end are saved on the task, so the plain URL will do.
+        status_url = self.request.path
+        response = JsonResponse(
+            dict(
+                state=media.state,
+                status_url=status_url,
+                queued_seconds=round(queued, 2),
+            ),
+            status=202,
+        )
+        response['Location'] = status_url
+        response['Retry-After'] = 1
+        return response
+
+
+class TaskHeartbeatView(vanilla.GenericModelView):
+    """Extend the lease on the lock of a task still being worked on."""
+
+    def get_queryset(self):
+        task_type = self.kwargs['type']
+        model = m.TASK_MODEL.get(task_type)
+        if model is None:
+            raise Http404('No such task type')
+        return model.objects.filter(assignee=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        task = self.get_object()
+        if task.state == 'presented' and task.renew_lease():
+            return JsonResponse(dict(lease=task.lease_length))
+        else:
+            # Expired, or about to be; the page should stop working on it.
+            return JsonResponse(dict(lease=0), status=409)
+
+
+class MediaSliceView(vanilla.DetailView):
+    """Stream part of a transcript's processed media, in whole frames.
+
+    Frames are found with the index stored at processing time, and only
+    their bytes are read from storage.
+    """
+
+    model = m.Transcript
+
+    def render_to_response(self, context):
+        transcript = context['object']
+
+        full_media = get_object_or_404(
+            transcript.media,
+            is_processed=True,
+            is_full_length=True,
+            state='ready',
+        )
+        if not full_media.frames:
+            # Processed before frame indexes were stored.
+            full_media.index_frames_task()
+            response = HttpResponse(status=503)
+            response['Retry-After'] = settings.TRANSCRIPT_MEDIA_INDEX_RETRY_AFTER
+            return response
+
+        try:
+            start = max(Decimal(self.request.GET['start']), Decimal(0))
+            end = min(Decimal(self.request.GET['end']), transcript.length)
+            index = mp3frames.stored_frame_index(full_media.frames)
+            first_byte, end_byte = index.byte_range(start, end)
+        except (KeyError, InvalidOperation, ValueError):
+            return HttpResponseBadRequest('start and end must give a time range')
+
+        response = stored_range_response(
+            self.request, full_media.file, first_byte, end_byte, 'audio/mpeg')
+        patch_cache_control(
+            response, private=True, max_age=settings.TRANSCRIPT_MEDIA_SLICE_MAX_AGE)
+        return response
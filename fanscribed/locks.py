@@ -1,54 +1,122 @@
 """Redis-based resource locking.
 
-http://www.dr-josiah.com/2012/01/creating-lock-with-redis.html
+Each lock is a key holding a random identifier, set only if absent and
+with an expiry (SET NX PX), so a crashed holder's lock always expires.
+Renewal and release are Lua scripts that compare the identifier and act in
+one round trip. Several keys can be locked at once, all or none.
+
+http://redis.io/topics/distlock
 """
 
 import contextlib
 import time
 import uuid
 
-import redis.exceptions
+from redis.client import Script
 
 
 class LockException(Exception):
     pass
 
 
-def acquire_lock(conn, lockname, identifier, atime=10, ltime=10):
+# Longest pause between attempts to acquire a contended lock.
+MAX_RETRY_DELAY = 0.05
+
+_RENEW = Script(None, """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+_RELEASE = Script(None, """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[1] then
+        released = released + redis.call('del', key)
+    end
+end
+return released
+""")
+
+_ACQUIRE_ALL = Script(None, """
+for _, key in ipairs(KEYS) do
+    if redis.call('exists', key) == 1 then
+        return 0
+    end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('set', key, ARGV[1], 'PX', ARGV[2])
+end
+return 1
+""")
+
+
+def _milliseconds(seconds):
+    return int(seconds * 1000)
+
+
+def _retry(attempt, atime):
+    """Call attempt until it succeeds or atime seconds pass; return success."""
     end = time.time() + atime
-    once = (atime == 0)  # Make sure we try at least once even if atime is 0.
-    while end > time.time() or once:
-        once = False
-        if conn.setnx(lockname, identifier):
-            conn.expire(lockname, ltime)
-            return identifier
-        elif not conn.ttl(lockname):
-            conn.expire(lockname, ltime)
-        time.sleep(.001)
-    return False
+    delay = 0.001
+    while True:
+        if attempt():
+            return True
+        if time.time() + delay > end:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_RETRY_DELAY)
+
+
+def acquire_lock(conn, lockname, identifier, atime=10, ltime=10):
+    acquired = _retry(
+        lambda: conn.set(lockname, identifier, px=_milliseconds(ltime), nx=True),
+        atime,
+    )
+    return identifier if acquired else False
+
+
+def acquire_locks(conn, locknames, identifier, atime=10, ltime=10):
+    """Acquire every lock, or none of them."""
+    acquired = _retry(
+        lambda: _ACQUIRE_ALL(
+            keys=locknames, args=[identifier, _milliseconds(ltime)], client=conn),
+        atime,
+    )
+    return identifier if acquired else False
 
 
 def release_lock(conn, lockname, identifier):
-    pipe = conn.pipeline(True)
-    while True:
-        try:
-            pipe.watch(lockname)
-            if pipe.get(lockname) == identifier:
-                pipe.multi()
-                pipe.delete(lockname)
-                pipe.execute()
-                return True
-            pipe.unwatch()
-            break
-        except redis.exceptions.WatchError:
-            pass
-    # We lost the lock.
-    return False
-
-
-def acquire_model_lock(conn, instance, lockname, lockid_field):
+    # False if we lost the lock.
+    return bool(_RELEASE(keys=[lockname], args=[identifier], client=conn))
+
+
+def release_locks(conn, locknames, identifier):
+    """Release the locks still held; return how many were."""
+    return _RELEASE(keys=locknames, args=[identifier], client=conn)
+
+
+def release_each(conn, held):
+    """Release each of (lockname, identifier) still held, in one round trip.
+
+    Returns how many were.
+    """
+    pipe = conn.pipeline(transaction=False)
+    for lockname, identifier in held:
+        _RELEASE(keys=[lockname], args=[identifier], client=pipe)
+    return sum(pipe.execute())
+
+
+def renew_lock(conn, lockname, identifier, ltime=10):
+    # False if we lost the lock.
+    return bool(_RENEW(
+        keys=[lockname], args=[identifier, _milliseconds(ltime)], client=conn))
+
+
+def acquire_model_lock(conn, instance, lockname, lockid_field, ltime=10):
     identifier = uuid.uuid4().hex
-    lock = acquire_lock(conn, lockname, identifier, atime=0, ltime=10)
+    lock = acquire_lock(conn, lockname, identifier, atime=0, ltime=ltime)
     if not lock:
         raise LockException('{lockname} already locked'.format(**locals()))
     else:
@@ -63,6 +131,32 @@ def release_model_lock(conn, instance, lockname, lockid_field):
     return released
 
 
+def renew_model_lock(conn, instance, lockname, lockid_field, ltime=10):
+    lockid = getattr(instance, lockid_field)
+    return lockid is not None and renew_lock(conn, lockname, lockid, ltime)
+
+
+def holds_model_lock(conn, instance, lockname, lockid_field):
+    lockid = getattr(instance, lockid_field)
+    return lockid is not None and conn.get(lockname) == lockid
+
+
+def holds_model_locks(conn, leased):
+    """Check each of (instance, lockname, lockid_field) in one round trip.
+
+    Returns a list of booleans, in the same order.
+    """
+    leased = list(leased)
+    if not leased:
+        return []
+    held = conn.mget([lockname for instance, lockname, lockid_field in leased])
+    return [
+        getattr(instance, lockid_field) is not None
+        and lockid == getattr(instance, lockid_field)
+        for (instance, lockname, lockid_field), lockid in zip(leased, held)
+    ]
+
+
 @contextlib.contextmanager
 def redis_lock(conn, lockname, atime=10, ltime=10):
     identifier = str(uuid.uuid4())
@@ -0,0 +1,91 @@
+from timeit import default_timer
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django_redis import get_redis_connection
+import redis.exceptions
+
+from ... import locks
+
+
+def _legacy_acquire_lock(conn, lockname, identifier, ltime=10):
+    # SETNX, EXPIRE, then TTL, as locks.acquire_lock used to.
+    if conn.setnx(lockname, identifier):
+        conn.expire(lockname, ltime)
+        return identifier
+    elif not conn.ttl(lockname):
+        conn.expire(lockname, ltime)
+    return False
+
+
+def _legacy_release_lock(conn, lockname, identifier):
+    # WATCH/MULTI, as locks.release_lock used to.
+    pipe = conn.pipeline(True)
+    while True:
+        try:
+            pipe.watch(lockname)
+            if pipe.get(lockname) == identifier:
+                pipe.multi()
+                pipe.delete(lockname)
+                pipe.execute()
+                return True
+            pipe.unwatch()
+            break
+        except redis.exceptions.WatchError:
+            pass
+    return False
+
+
+class Command(BaseCommand):
+
+    args = '[<iterations>] [<locks per acquisition>]'
+    help = "Compare the latency of Redis locking with the former SETNX locks"
+
+    def handle(self, *args, **options):
+        try:
+            iterations, width = [int(arg) for arg in args] + [1000, 5][len(args):]
+        except ValueError:
+            raise CommandError('Give iterations and locks per acquisition as numbers.')
+
+        conn = get_redis_connection('default')
+        prefix = 'lock:bench:{}:'.format(uuid.uuid4().hex)
+        names = [prefix + str(i) for i in xrange(width)]
+
+        def legacy_one():
+            identifier = uuid.uuid4().hex
+            _legacy_acquire_lock(conn, names[0], identifier)
+            _legacy_release_lock(conn, names[0], identifier)
+
+        def lua_one():
+            identifier = uuid.uuid4().hex
+            locks.acquire_lock(conn, names[0], identifier, atime=0)
+            locks.release_lock(conn, names[0], identifier)
+
+        def legacy_many():
+            identifier = uuid.uuid4().hex
+            for name in names:
+                _legacy_acquire_lock(conn, name, identifier)
+            for name in names:
+                _legacy_release_lock(conn, name, identifier)
+
+        def lua_many():
+            identifier = uuid.uuid4().hex
+            locks.acquire_locks(conn, names, identifier, atime=0)
+            locks.release_locks(conn, names, identifier)
+
+        try:
+            for label, run in [
+                ('SETNX, 1 lock', legacy_one),
+                ('SET NX PX, 1 lock', lua_one),
+                ('SETNX, {} locks'.format(width), legacy_many),
+                ('SET NX PX, {} locks'.format(width), lua_many),
+            ]:
+                started = default_timer()
+                for _ in xrange(iterations):
+                    run()
+                elapsed = default_timer() - started
+                self.stdout.write(
+                    u'{label}: {microseconds:.0f} us per acquire and release'
+                    .format(microseconds=elapsed / iterations * 1e6, **locals()))
+        finally:
+            conn.delete(*names)
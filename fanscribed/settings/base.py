@@ -1,5 +1,6 @@
 """Common settings and globals."""
 
+from datetime import timedelta
 from decimal import Decimal
 from os import environ, getenv
 from os.path import abspath, basename, dirname, join, normpath
@@ -280,9 +281,29 @@ BROKER_URL = getenv('BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = 'djcelery.backends.database:DatabaseBackend'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERYBEAT_SCHEDULE = {
+    'expire-lapsed-task-leases': {
+        'task': 'fanscribed.apps.transcripts.tasks.expire_lapsed_task_leases',
+        'schedule': timedelta(minutes=1),
+    },
+    'expire-stale-tasks': {
+        'task': 'fanscribed.apps.transcripts.tasks.expire_stale_tasks',
+        'schedule': timedelta(minutes=5),
+    },
+}
+
+# Jobs queued by models wait in the outbox table until relay_outbox
+# sends them, up to this many at a time. It checks again after the minimum
+# interval (seconds) while jobs keep arriving, doubling it up to the
+# maximum while the outbox stays empty.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_RELAY_MIN_INTERVAL = 0.01
+OUTBOX_RELAY_MAX_INTERVAL = 0.2
 
 # Used for local caching of media files for faster processing.
 MEDIA_CACHE_PATH = join(PACKAGE_ROOT, '..', '.mediafile-cache')
+# Least-recently-used files are evicted beyond this many bytes.
+MEDIA_CACHE_MAX_BYTES = int(getenv('MEDIA_CACHE_MAX_BYTES', 10 * 1024 ** 3))
 
 
 # WAFFLE
@@ -324,6 +345,61 @@ TRANSCRIPT_FRAGMENT_LENGTH = Decimal('5.00')
 TRANSCRIPT_FRAGMENT_OVERLAP = Decimal('1.00')
 TRANSCRIPTS_REQUIRE_TEAMWORK = True
 
+# Minimum confidence, from 0 to 1, for suggesting a stitch pairing.
+TRANSCRIPT_STITCH_SUGGESTION_THRESHOLD = 0.6
+
+# Minimum confidence for every pairing of an automatically-stitched stitch,
+# and the user recorded as its editor.
+TRANSCRIPT_AUTO_STITCH_THRESHOLD = 0.9
+TRANSCRIPT_SYSTEM_EDITOR_USERNAME = 'fanscribed'
+
+# How reviews decide that text is unchanged, and how many edits per
+# character of normalized text the default checker tolerates.
+TRANSCRIPT_REVIEW_EQUIVALENCE = 'fanscribed.apps.transcripts.equivalence.normalized'
+TRANSCRIPT_REVIEW_TOLERANCE = 0.01
+
+# Seconds a task keeps its lock without a heartbeat from the task page.
+# Tasks whose locks lapse are expired by expire_lapsed_task_leases.
+TRANSCRIPT_TASK_LEASES = {
+    'transcribe': 5 * 60,
+    'stitch': 5 * 60,
+    'clean': 10 * 60,
+    'boundary': 5 * 60,
+    'speaker': 5 * 60,
+}
+
+# Seconds after being presented that a task is expired, even if its
+# lease is still being renewed, by expire_stale_tasks.
+TRANSCRIPT_TASK_MAX_AGE = {
+    'transcribe': 60 * 60,
+    'stitch': 60 * 60,
+    'clean': 2 * 60 * 60,
+    'boundary': 60 * 60,
+    'speaker': 60 * 60,
+}
+
+# Task audio is streamed from byte ranges of the full-length processed
+# media, and may be cached by browsers this many seconds. Set
+# TRANSCRIPT_PERSIST_MEDIA_SLICES to store a file for each slice instead.
+TRANSCRIPT_MEDIA_SLICE_MAX_AGE = 24 * 60 * 60
+TRANSCRIPT_PERSIST_MEDIA_SLICES = False
+
+# Seconds a client is asked to wait for the frame index of media processed
+# before indexes were stored, while a worker builds it.
+TRANSCRIPT_MEDIA_INDEX_RETRY_AFTER = 5
+
+# When a persisted slice has no file yet, how many seconds a request waits
+# for it, and how often it checks, before answering 202 to be polled.
+TRANSCRIPT_MEDIA_FILE_WAIT = 2.0
+TRANSCRIPT_MEDIA_FILE_POLL_INTERVAL = 0.25
+
+# Seconds after which a slice file still being created is assumed lost,
+# and its creation is queued again.
+TRANSCRIPT_MEDIA_CREATION_TIMEOUT = 10 * 60
+
+# How many persisted slices each pre-generation task cuts and uploads.
+TRANSCRIPT_MEDIA_BATCH_SIZE = 50
+
 
 # TESTING
 # -------
@@ -336,17 +412,20 @@ TESTING = False
 
 if sys.platform == 'linux2':
 
-    MP3SPLT_PATH = getenv('MP3SPLT_PATH', '/usr/bin/mp3splt')
     AVPROBE_PATH = getenv('AVPROBE_PATH', '/usr/bin/avprobe')
     AVCONV_PATH = getenv('AVCONV_PATH', '/usr/bin/avconv')
 
 elif sys.platform == 'darwin':
 
-    # $ brew install mp3splt ffmpeg
-    MP3SPLT_PATH = getenv('MP3SPLT_PATH', '/usr/local/bin/mp3splt')
+    # $ brew install ffmpeg
     AVPROBE_PATH = getenv('AVPROBE_PATH', '/usr/local/bin/ffprobe')
     AVCONV_PATH = getenv('AVCONV_PATH', '/usr/local/bin/ffmpeg')
 
+# Media longer than this many seconds is converted in chunks of this
+# length, this many at a time.
+TRANSCODE_CHUNK_LENGTH = int(getenv('TRANSCODE_CHUNK_LENGTH', 600))
+TRANSCODE_PROCESSES = int(getenv('TRANSCODE_PROCESSES', 4))
+
 
 # ANALYTICS
 # ---------
@@ -433,6 +512,7 @@ LOCAL_APPS += (
     'fanscribed',                   # Templates and static files.
     'fanscribed.apps.mailinglist',  # Mailing list subscriptions.
     'fanscribed.apps.media',        # Media file handling.
+    'fanscribed.apps.outbox',       # Celery jobs queued with transactions.
     'fanscribed.apps.podcasts',     # Podcasts and episodes.
     'fanscribed.apps.profiles',     # Accounts and profiles.
     'fanscribed.apps.robots',       # robots.txt management.
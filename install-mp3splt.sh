@@ -1,116 +0,0 @@
-#!/bin/bash -ex
-
-if [ "${VIRTUAL_ENV}" == "" ]; then
-    echo "Must be in a virtualenv"
-    exit 1
-fi
-
-TMP_INSTALL=$VIRTUAL_ENV/tmp-install-mp3splt
-mkdir -p $TMP_INSTALL
-cp -v patched-libmad-0.15.1b-configure $TMP_INSTALL/
-cd $TMP_INSTALL
-
-LIBDIR=${VIRTUAL_ENV}/lib
-export LD_LIBRARY_PATH=${LIBDIR}
-export LDFLAGS=-L${LIBDIR}
-export PKG_CONFIG_PATH=${LIBDIR}/pkgconfig
-
-(
-    if ! [ -f libmad-0.15.1b.tar.gz ]; then
-        wget -O libmad-0.15.1b.tar.gz http://sourceforge.net/projects/mad/files/libmad/0.15.1b/libmad-0.15.1b.tar.gz/download
-    fi
-    if ! [ -d libmad-0.15.1b ]; then
-        tar xzvf libmad-0.15.1b.tar.gz
-    fi
-    cp patched-libmad-0.15.1b-configure libmad-0.15.1b/configure
-    cd libmad-0.15.1b
-    ./configure --prefix=${VIRTUAL_ENV}
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f libogg-1.3.0.tar.gz ]; then
-        wget -O libogg-1.3.0.tar.gz http://downloads.xiph.org/releases/ogg/libogg-1.3.0.tar.gz
-    fi
-    if ! [ -d libogg-1.3.0 ]; then
-        tar xzvf libogg-1.3.0.tar.gz
-    fi
-    cd libogg-1.3.0
-    ./configure --prefix=${VIRTUAL_ENV}
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f libvorbis-1.3.2.tar.bz2 ]; then
-        wget -O libvorbis-1.3.2.tar.bz2 http://downloads.xiph.org/releases/vorbis/libvorbis-1.3.2.tar.bz2
-    fi
-    if ! [ -d libvorbis-1.3.2 ]; then
-        tar xjvf libvorbis-1.3.2.tar.bz2
-    fi
-    cd libvorbis-1.3.2
-    ./configure --prefix=${VIRTUAL_ENV}
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f libid3tag-0.15.1b.tar.gz ]; then
-        wget -O libid3tag-0.15.1b.tar.gz http://sourceforge.net/projects/mad/files/libid3tag/0.15.1b/libid3tag-0.15.1b.tar.gz/download
-    fi
-    if ! [ -d libid3tag-0.15.1b ]; then
-        tar xzvf libid3tag-0.15.1b.tar.gz
-    fi
-    cd libid3tag-0.15.1b
-    ./configure --prefix=${VIRTUAL_ENV}
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f pcre-8.21.tar.bz2 ]; then
-        wget -O pcre-8.21.tar.bz2 http://sourceforge.net/projects/pcre/files/pcre/8.21/pcre-8.21.tar.bz2/download
-    fi
-    if ! [ -d pcre-8.21 ]; then
-        tar xjvf pcre-8.21.tar.bz2
-    fi
-    cd pcre-8.21
-    ./configure --prefix=${VIRTUAL_ENV}
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f libmp3splt-0.8.2.tar.gz ]; then
-        wget -O libmp3splt-0.8.2.tar.gz http://prdownloads.sourceforge.net/mp3splt/libmp3splt-0.8.2.tar.gz
-    fi
-    if ! [ -d libmp3splt-0.8.2 ]; then
-        tar xzvf libmp3splt-0.8.2.tar.gz
-    fi
-    cd libmp3splt-0.8.2
-    ./configure --prefix=${VIRTUAL_ENV} --with-mad=${VIRTUAL_ENV} --with-id3=${VIRTUAL_ENV} --with-ogg=${VIRTUAL_ENV} --with-vorbis=${VIRTUAL_ENV} --enable-ltdl-install
-    make -j16
-    make install
-)
-
-(
-    if ! [ -f mp3splt-2.5.2.tar.gz ]; then
-        wget -O mp3splt-2.5.2.tar.gz http://prdownloads.sourceforge.net/mp3splt/mp3splt-2.5.2.tar.gz
-    fi
-    if ! [ -d mp3splt-2.5.2 ]; then
-        tar xzvf mp3splt-2.5.2.tar.gz
-    fi
-    cd mp3splt-2.5.2
-    ./configure --prefix=${VIRTUAL_ENV} CFLAGS=-I${VIRTUAL_ENV}/include
-    make -j16
-    make install
-)
-
-cd ${VIRTUAL_ENV}/bin
-mv mp3splt _mp3splt
-cat > mp3splt <<EOF
-#!/bin/bash
-LD_LIBRARY_PATH=${VIRTUAL_ENV}/lib ${VIRTUAL_ENV}/bin/_mp3splt \$@
-EOF
-chmod +x mp3splt